@@ -0,0 +1,117 @@
+"""Builds a MeshBVH over an OBJ model and times single and batched ray casts,
+checking the hits against a brute force test over all triangles.
+
+Usage: python benchmarks/bvh_raycast.py [model.obj] [rays]
+"""
+import os, sys, time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from pygex.vmath import Vector3, Matrix4, Ray
+from pygex.rendering.bvh import MeshBVH, SceneBVH
+
+DEFAULT_MODEL = os.path.join(ROOT, 'examples', 'pbr', 'assets', 'dragon.obj')
+
+def load_positions(path: str):
+    """Positions and fan triangulated faces, enough for picking (no GL context needed)."""
+    positions, triangles = [], []
+    with open(path, 'r') as fp:
+        for line in fp:
+            tok = line.split()
+            if not tok:
+                continue
+            if tok[0] == 'v':
+                positions.append([float(v) for v in tok[1:4]])
+            elif tok[0] == 'f':
+                face = [int(v.split('/')[0]) for v in tok[1:]]
+                face = [i - 1 if i > 0 else len(positions) + i for i in face]
+                for i in range(1, len(face) - 1):
+                    triangles.append((face[0], face[i], face[i + 1]))
+    return np.array(positions, dtype=np.float32), np.array(triangles, dtype=np.int64)
+
+def brute_force(positions, triangles, origin, direction):
+    corners = positions[triangles].astype(np.float64)
+    v0 = corners[:, 0]
+    e1 = corners[:, 1] - v0
+    e2 = corners[:, 2] - v0
+    p = np.cross(direction, e2)
+    det = np.einsum('ij,ij->i', e1, p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1.0 / det
+        s = origin - v0
+        u = np.einsum('ij,ij->i', s, p) * inv
+        q = np.cross(s, e1)
+        v = (q @ direction) * inv
+        t = np.einsum('ij,ij->i', e2, q) * inv
+        ok = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return t[ok].min() if ok.any() else np.inf
+
+def random_rays(lo, hi, count, rng):
+    center = (lo + hi) * 0.5
+    radius = float(np.linalg.norm(hi - lo))
+    dirs = rng.normal(size=(count, 3))
+    dirs /= np.linalg.norm(dirs, axis=1)[:, None]
+    origins = center - dirs * radius
+    targets = lo + rng.random((count, 3)) * (hi - lo)
+    directions = targets - origins
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    return origins, directions
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODEL
+    ray_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = np.random.default_rng(7)
+
+    positions, triangles = load_positions(path)
+    start = time.perf_counter()
+    bvh = MeshBVH(positions, triangles)
+    build = time.perf_counter() - start
+    print(f'{os.path.basename(path)}: {len(triangles)} triangles, {bvh.node_count} nodes, build {build * 1000.0:.1f} ms')
+
+    lo, hi = positions.min(axis=0).astype(np.float64), positions.max(axis=0).astype(np.float64)
+    origins, directions = random_rays(lo, hi, ray_count, rng)
+
+    # correctness against brute force on a few rays
+    distances, _, _ = bvh.intersect(origins, directions)
+    for i in range(min(50, ray_count)):
+        expected = brute_force(positions, triangles, origins[i], directions[i])
+        if not np.isclose(distances[i], expected, rtol=1e-5, atol=1e-6) and not (np.isinf(distances[i]) and np.isinf(expected)):
+            raise SystemExit(f'ray {i}: bvh {distances[i]} != brute force {expected}')
+    print(f'hits: {np.isfinite(distances).sum()}/{ray_count}, matches brute force')
+
+    ray = Ray(Vector3(*origins[0].tolist()), Vector3(*directions[0].tolist()))
+    single = timeit(lambda: bvh.raycast(ray), 200)
+    brute = timeit(lambda: brute_force(positions, triangles, origins[0], directions[0]), 5)
+    batch = timeit(lambda: bvh.intersect(origins, directions), 5)
+    print(f'single ray:  {single * 1e6:9.1f} us (brute force {brute * 1e6:.1f} us)')
+    print(f'{ray_count} rays: {batch * 1000.0:9.2f} ms ({batch / ray_count * 1e6:.2f} us/ray)')
+
+    # top level: a grid of instances, one of them moving
+    scene = SceneBVH()
+    transforms = []
+    for i in range(64):
+        m = Matrix4.from_translation(Vector3((i % 8) * 4.0, 0.0, (i // 8) * 4.0))
+        transforms.append(m)
+        scene.add(bvh, m)
+    start = time.perf_counter()
+    scene.build()
+    print(f'scene: 64 instances, build {(time.perf_counter() - start) * 1000.0:.2f} ms')
+
+    transforms[9].set_translation(Vector3(4.0, 2.0, 4.0))
+    refit = timeit(scene.refit, 1)
+    scene_ray = Ray(Vector3(4.0, 50.0, 4.0) + Vector3(*((lo + hi) * 0.5).tolist()), Vector3(0.0, -1.0, 0.0))
+    hit = scene.raycast(scene_ray)
+    print(f'refit {refit * 1e6:.1f} us, pick -> object {hit.object if hit else None}')
+    print(f'scene pick: {timeit(lambda: scene.raycast(scene_ray), 100) * 1e6:.1f} us')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Packs the padded glyph rectangles Font would make into atlas pages of several sizes
+and reports the page count, packing efficiency and texture memory. Sorted is how a
+Font packs its charset up front, incremental inserts in charset order like glyphs
+added at runtime by lazy fonts. No GL context needed.
+
+Usage: python benchmarks/font_atlas.py [font.ttf] [--spread N] [--encodings cp1252,cp1251]
+"""
+import os, sys, time, argparse
+
+import freetype as ft
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from pygex.rendering.font import get_all_chars
+from pygex.rendering.rect_pack import SkylinePacker
+
+DEFAULT_FONT = os.path.join(ROOT, 'examples', 'snake', 'assets', 'allegro.ttf')
+PAGE_SIZES = (512, 1024, 2048, 4096)
+
+def glyph_sizes(path: str, chars, padding: int, height: int=80):
+    """(width, height) of the padded tile of every glyph with a bitmap."""
+    face = ft.Face(path)
+    face.set_pixel_sizes(0, height)
+    sizes = []
+    for c in chars:
+        face.load_char(c)
+        bitmap = face.glyph.bitmap
+        if bitmap.width * bitmap.rows > 0:
+            sizes.append((bitmap.width + padding * 2, bitmap.rows + padding * 2))
+    return sizes
+
+def pack(sizes, page_size: int):
+    """Fills pages the way Font._place does, returns the packers."""
+    packers = []
+    for w, h in sizes:
+        for packer in packers:
+            if packer.insert(w, h) is not None:
+                break
+        else:
+            packers.append(SkylinePacker(page_size, page_size))
+            packers[-1].insert(w, h)
+    return packers
+
+def main():
+    parser = argparse.ArgumentParser(description='font atlas packing benchmark')
+    parser.add_argument('font', nargs='?', default=DEFAULT_FONT)
+    parser.add_argument('--spread', type=int, default=16)
+    parser.add_argument('--encodings', default='cp1252,cp1251,cp1253', help='comma separated, their characters make the charset')
+    args = parser.parse_args()
+
+    chars = list(dict.fromkeys(c for encoding in args.encodings.split(',') for c in get_all_chars(encoding)))
+    sizes = glyph_sizes(args.font, chars, int(args.spread * 1.5))
+    area = sum(w * h for w, h in sizes)
+    print(f'{os.path.basename(args.font)}: {len(sizes)} glyphs ({args.encodings}), {area / 1e6:.2f} Mpixel of padded tiles')
+    print(f'{"page":>6s} {"order":>12s} {"pages":>6s} {"efficiency":>11s} {"last page":>10s} {"texture MB":>11s} {"ms":>8s}')
+    for page_size in PAGE_SIZES:
+        if max(max(w, h) for w, h in sizes) > page_size:
+            continue
+        for order, ordered in (('sorted', sorted(sizes, key=lambda s: s[1], reverse=True)), ('incremental', sizes)):
+            start = time.perf_counter()
+            packers = pack(ordered, page_size)
+            elapsed = time.perf_counter() - start
+            # efficiency: glyph area over the texture memory of all pages
+            efficiency = area / (len(packers) * page_size * page_size)
+            memory = len(packers) * page_size * page_size / (1024.0 * 1024.0)
+            print(f'{page_size:6d} {order:>12s} {len(packers):6d} {efficiency:11.1%} {packers[-1].occupancy:10.1%} {memory:11.1f} {elapsed * 1000.0:8.1f}')
+
+if __name__ == '__main__':
+    main()
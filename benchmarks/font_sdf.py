@@ -0,0 +1,117 @@
+"""Times the distance field stage of Font: the NumPy transform over padded glyph tiles
+(one thread and a thread pool) against the compute shader over the whole atlas.
+Both run on the same glyphs and layout and the outputs are compared.
+
+The compute shader column needs a GL 4.6 context (a hidden pygame window), it is
+skipped when none can be made. Without a display, SDL_VIDEODRIVER=offscreen with
+PYOPENGL_PLATFORM=egl works on Mesa.
+
+Usage: python benchmarks/font_sdf.py [font.ttf] [--spread N] [--atlas-size N] [--workers N]
+"""
+import os, sys, time, argparse
+
+import numpy as np
+import freetype as ft
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from pygex.rendering.font import get_all_chars
+from pygex.rendering.sdf import signed_distance_fields
+
+DEFAULT_FONT = os.path.join(ROOT, 'examples', 'snake', 'assets', 'allegro.ttf')
+
+def glyph_tiles(path: str, padding: int, height: int=80):
+    """Coverage bitmaps of the cp1252 glyphs with Font's padding around them."""
+    face = ft.Face(path)
+    face.set_pixel_sizes(0, height)
+    tiles = []
+    for c in get_all_chars('cp1252'):
+        face.load_char(c)
+        bitmap = face.glyph.bitmap
+        if bitmap.width * bitmap.rows <= 0:
+            continue
+        tile = np.zeros((bitmap.rows + padding * 2, bitmap.width + padding * 2), dtype=np.uint8)
+        tile[padding:-padding, padding:-padding] = np.array(bitmap.buffer, dtype=np.uint8).reshape((bitmap.rows, bitmap.width))
+        tiles.append(tile)
+    return tiles
+
+def shelf_layout(tiles: list, size: int):
+    """Tile positions in rows, tallest first, like a simple atlas packer."""
+    order = sorted(range(len(tiles)), key=lambda i: -tiles[i].shape[0])
+    positions = [None] * len(tiles)
+    x = y = shelf = 0
+    for i in order:
+        h, w = tiles[i].shape
+        if x + w > size:
+            x, y, shelf = 0, y + shelf, 0
+        if y + h > size:
+            raise ValueError('glyphs do not fit in the atlas, use a larger --atlas-size')
+        positions[i] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+    return positions
+
+def gl_context():
+    """A hidden GL 4.6 window, None (and the reason) when the platform has none."""
+    try:
+        import pygame
+        pygame.display.init()
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MAJOR_VERSION, 4)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MINOR_VERSION, 6)
+        pygame.display.set_mode((16, 16), pygame.OPENGL | pygame.HIDDEN)
+        from OpenGL.GL import glGetString, GL_RENDERER
+        return glGetString(GL_RENDERER).decode(), None
+    except Exception as e:
+        return None, e
+
+def best_of(fn, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description='font SDF benchmark')
+    parser.add_argument('font', nargs='?', default=DEFAULT_FONT)
+    parser.add_argument('--spread', type=int, default=16)
+    parser.add_argument('--atlas-size', type=int, default=2048)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='thread pool size of the pooled column')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    spread, size = float(args.spread), args.atlas_size
+    tiles = glyph_tiles(args.font, int(args.spread * 1.5))
+    positions = shelf_layout(tiles, size)
+    area = sum(tile.size for tile in tiles)
+    print(f'{os.path.basename(args.font)}: {len(tiles)} glyphs, {area / 1e6:.2f} Mpixel of tiles in a {size}x{size} atlas, spread {args.spread}')
+
+    single, fields = best_of(lambda: signed_distance_fields(tiles, spread, workers=1), args.repeat)
+    pooled, _ = best_of(lambda: signed_distance_fields(tiles, spread, workers=args.workers), args.repeat)
+    print(f'{"numpy, 1 thread":28s} {single * 1000.0:10.1f} ms')
+    print(f'{f"numpy, pool of {args.workers}":28s} {pooled * 1000.0:10.1f} ms')
+
+    renderer, error = gl_context()
+    if renderer is None:
+        print(f'{"compute shader":28s} {"skipped":>10s} ({error})')
+        return
+
+    from pygex.rendering.font import Font
+    atlas = np.zeros((size, size), dtype=np.uint8)
+    for tile, (x, y) in zip(tiles, positions):
+        atlas[y:y + tile.shape[0], x:x + tile.shape[1]] = tile
+    gpu, out = best_of(lambda: Font._render_sdf(atlas, size, size, spread=spread), args.repeat)
+    out = np.asarray(out, dtype=np.uint8).reshape((size, size))
+    diff = max(
+        int(np.abs(out[y:y + field.shape[0], x:x + field.shape[1]].astype(np.int16) - field).max())
+        for field, (x, y) in zip(fields, positions)
+    )
+    print(f'{"compute shader":28s} {gpu * 1000.0:10.1f} ms ({renderer})')
+    print(f'largest difference to the compute shader: {diff} / 255')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Counts vmath objects allocated per frame by the GameObject.own_transform path.
+
+Usage: python benchmarks/game_object_allocations.py [depth] [frames]
+"""
+import os, sys, time, tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pygex import vmath
+from pygex.core import GameObject
+from pygex.vmath import Vector3, Quaternion
+
+VMATH_FILE = vmath.__file__
+
+def count_vmath_allocations(fn):
+    """Runs fn and returns how many vmath objects were constructed while it ran."""
+    count = 0
+
+    def profiler(frame, event, arg):
+        nonlocal count
+        if event == 'call' and frame.f_code.co_name == '__init__' and frame.f_code.co_filename == VMATH_FILE:
+            count += 1
+
+    sys.setprofile(profiler)
+    try:
+        fn()
+    finally:
+        sys.setprofile(None)
+    return count
+
+def build_chain(depth: int):
+    root = GameObject()
+    nodes = []
+    parent = root
+    for _ in range(depth):
+        ob = GameObject()
+        ob.transform.translation.z = 2.5
+        parent.add_child(ob)
+        nodes.append(ob)
+        parent = ob
+    return root, nodes
+
+def legacy_to_matrix4(t: vmath.Transform):
+    # Transform.to_matrix4 before Matrix4.set_from_transform
+    axis_x, axis_y, axis_z = t.rotation.to_matrix3()
+    axis_x *= t.scale.x
+    axis_y *= t.scale.y
+    axis_z *= t.scale.z
+    translation = t.translation
+    return vmath.Matrix4(axis_x.x, axis_x.y, axis_x.z, 0.0, axis_y.x, axis_y.y, axis_y.z, 0.0,
+        axis_z.x, axis_z.y, axis_z.z, 0.0, translation.x, translation.y, translation.z, 1.0)
+
+_legacy_snapshots = {}
+
+def legacy_has_changed(t: vmath.Transform):
+    # Transform.has_changed before versioning, copy and compare against snapshots
+    old_translation, old_rotation, old_scale = _legacy_snapshots.get(id(t), (None, None, None))
+    changed = False
+    if old_translation is None or t.translation != old_translation:
+        changed = True
+        old_translation = t.translation.copy()
+    if old_scale is None or t.scale != old_scale:
+        changed = True
+        old_scale = t.scale.copy()
+    if t.rotation != old_rotation:
+        changed = True
+        old_rotation = t.rotation.copy()
+    _legacy_snapshots[id(t)] = (old_translation, old_rotation, old_scale)
+    return changed
+
+def legacy_own_transform(ob: GameObject):
+    # GameObject.own_transform/parent_transform before the in-place API
+    parent_transform = ob._parent_transform
+    if ob.parent and legacy_has_changed(ob.parent.transform):
+        parent_transform = legacy_own_transform(ob.parent)
+    return parent_transform * legacy_to_matrix4(ob.transform)
+
+def run(depth: int, frames: int):
+    root, nodes = build_chain(depth)
+    angle = [0.0]
+
+    def animate():
+        angle[0] += 0.01
+        for ob in nodes:
+            ob.transform.rotation = Quaternion.from_angle_axis(angle[0], Vector3(0, 1, 0))
+
+    def frame_own_transform():
+        for ob in nodes:
+            ob.own_transform
+
+    def frame_legacy():
+        for ob in nodes:
+            legacy_own_transform(ob)
+
+    results = {}
+    for name, fn in (('legacy', frame_legacy), ('own_transform', frame_own_transform)):
+        allocations = 0
+        elapsed = 0.0
+        peak = 0
+        for _ in range(frames):
+            animate()
+            allocations += count_vmath_allocations(fn)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            fn()
+            elapsed += time.perf_counter() - start
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        results[name] = (allocations / frames, elapsed / frames * 1e3, peak)
+
+    # world matrix cache: one animated node at the middle of the chain vs. a static chain
+    GameObject.end_frame()
+    root.update_world_transforms()
+    GameObject.end_frame()
+    root.update_world_transforms()
+    GameObject.end_frame()
+    static_stats = (GameObject.last_frame_recomputed, GameObject.last_frame_reused)
+    nodes[depth // 2].transform.translation.x += 1.0
+    root.update_world_transforms()
+    GameObject.end_frame()
+    moved_stats = (GameObject.last_frame_recomputed, GameObject.last_frame_reused)
+
+    print(f'depth={depth} frames={frames}')
+    print(f'{"path":<16}{"allocs/frame":>14}{"ms/frame":>12}{"peak bytes":>12}')
+    for name, (allocations, ms, peak) in results.items():
+        print(f'{name:<16}{allocations:>14.1f}{ms:>12.4f}{peak:>12}')
+    print(f'world matrices (recomputed, reused): static {static_stats}, one node moved {moved_stats}')
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    depth = int(args[0]) if len(args) > 0 else 8
+    frames = int(args[1]) if len(args) > 1 else 200
+    run(depth, frames)
@@ -0,0 +1,32 @@
+"""Reports the post-transform cache efficiency of the bundled assets before and after
+mesh_tools.optimize_mesh, and how long the pass takes.
+
+Usage: python benchmarks/mesh_optimize.py [--cache-size N] [file.obj ...]
+"""
+import os, sys, glob, time, argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from pygex.rendering.wavefront import load_wavefront
+from pygex.rendering.mesh_tools import optimize_mesh, CACHE_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description='vertex cache optimizer report')
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='simulated FIFO cache size')
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(ROOT, 'examples', '*', 'assets', '*.obj')))
+    print(f'{"object":32s} {"triangles":>9s} {"ACMR":>6s} {"->":>6s} {"ATVR":>6s} {"->":>6s} {"ms":>8s}')
+    for path in files:
+        for obj in load_wavefront(path, cache=False):
+            start = time.perf_counter()
+            _, _, report = optimize_mesh(obj.vertices, obj.indices, cache_size=args.cache_size)
+            elapsed = time.perf_counter() - start
+            label = f'{os.path.basename(path)}:{obj.name}'[:32]
+            print(f'{label:32s} {len(obj.indices) // 3:9d} {report.acmr_before:6.3f} {report.acmr_after:6.3f} '
+                f'{report.atvr_before:6.3f} {report.atvr_after:6.3f} {elapsed * 1000.0:8.1f}')
+
+if __name__ == '__main__':
+    main()
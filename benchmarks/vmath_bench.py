@@ -0,0 +1,343 @@
+"""Micro benchmarks for the pygex.vmath hot paths, scalar and batched.
+
+Reports ns/op and vmath objects allocated per op, writes the results as JSON and
+compares them against a stored baseline. Any case slower than the baseline by more
+than the tolerance, or allocating more objects per op, is reported as a regression
+and the script exits with status 1.
+
+Usage:
+    python benchmarks/vmath_bench.py                      # run and compare with vmath_baseline.json
+    python benchmarks/vmath_bench.py --output out.json    # also write the results
+    python benchmarks/vmath_bench.py --update-baseline    # store the results as the new baseline
+    python benchmarks/vmath_bench.py --filter Matrix4     # only cases containing 'Matrix4'
+
+Timings are normalized by a pure Python calibration loop run each time, which absorbs
+most of the drift in machine speed; still refresh the baseline when switching hardware
+or Python version.
+"""
+import os, sys, json, math, timeit, argparse, platform
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pygex import vmath
+from pygex.vmath import (
+    Vector3, Quaternion, Matrix4, Transform,
+    Vector3Array, QuaternionArray, Matrix4Array,
+)
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vmath_baseline.json')
+VMATH_FILE = vmath.__file__
+BATCH = 1024
+
+CASES = []
+
+def case(name: str, items: int=1):
+    """Registers a setup function returning the callable to time. items is the number
+    of elements one call processes, ns/op is reported per call and per item.
+    """
+    def register(setup):
+        CASES.append((name, items, setup))
+        return setup
+    return register
+
+def _random_unit(rng):
+    v = rng.normal(size=3)
+    return v / np.linalg.norm(v)
+
+def _random_quaternion(rng):
+    q = rng.normal(size=4)
+    q /= np.linalg.norm(q)
+    return Quaternion(*q.tolist())
+
+# scalar
+
+@case('Vector3.normalize')
+def _(rng):
+    v = Vector3(1.0, 2.0, 3.0)
+    return v.normalize
+
+@case('Vector3.cross')
+def _(rng):
+    a, b = Vector3(1.0, 2.0, 3.0), Vector3(-2.0, 0.5, 1.0)
+    return lambda: a.cross(b)
+
+@case('Vector3.cross_into')
+def _(rng):
+    a, b, out = Vector3(1.0, 2.0, 3.0), Vector3(-2.0, 0.5, 1.0), Vector3()
+    return lambda: Vector3.cross_into(a, b, out)
+
+@case('Matrix4.__mul__')
+def _(rng):
+    a = Matrix4.from_angle_axis(0.3, Vector3(*_random_unit(rng).tolist()))
+    b = Matrix4.from_translation(Vector3(1.0, 2.0, 3.0))
+    return lambda: a * b
+
+@case('Matrix4.mul_into')
+def _(rng):
+    a = Matrix4.from_angle_axis(0.3, Vector3(*_random_unit(rng).tolist()))
+    b = Matrix4.from_translation(Vector3(1.0, 2.0, 3.0))
+    out = Matrix4()
+    return lambda: Matrix4.mul_into(a, b, out)
+
+@case('Matrix4.transform_point')
+def _(rng):
+    m = Matrix4.from_angle_axis(0.3, Vector3(0.0, 1.0, 0.0))
+    p = Vector3(1.0, 2.0, 3.0)
+    return lambda: m.transform_point(p)
+
+@case('Matrix4.inverse (uncached)')
+def _(rng):
+    m = Matrix4.from_perspective(math.radians(60.0), 1.5, 0.1, 100.0)
+    return lambda: m.inverse(cache=False)
+
+@case('Quaternion.__mul__')
+def _(rng):
+    a, b = _random_quaternion(rng), _random_quaternion(rng)
+    return lambda: a * b
+
+@case('Quaternion.slerp')
+def _(rng):
+    a, b = _random_quaternion(rng), _random_quaternion(rng)
+    return lambda: a.slerp(b, 0.35)
+
+@case('Quaternion.from_matrix3')
+def _(rng):
+    m = Matrix4.from_angle_axis(0.7, Vector3(*_random_unit(rng).tolist()))
+    axes = (
+        Vector3(m.m00, m.m01, m.m02),
+        Vector3(m.m10, m.m11, m.m12),
+        Vector3(m.m20, m.m21, m.m22),
+    )
+    return lambda: Quaternion.from_matrix3(axes)
+
+@case('Transform.to_matrix4 (dirty)')
+def _(rng):
+    t = Transform(Vector3(1.0, 2.0, 3.0), _random_quaternion(rng), Vector3(1.0, 2.0, 1.0))
+    translation = t.translation
+
+    def run():
+        translation.x += 1.0
+        return t.to_matrix4()
+    return run
+
+@case('Transform.to_matrix4 (cached)')
+def _(rng):
+    t = Transform(Vector3(1.0, 2.0, 3.0), _random_quaternion(rng), Vector3(1.0, 2.0, 1.0))
+    return t.to_matrix4
+
+# batched
+
+@case('Vector3Array.normalize', BATCH)
+def _(rng):
+    a = Vector3Array(rng.normal(size=(BATCH, 3)))
+    return a.normalize
+
+@case('Vector3Array.cross', BATCH)
+def _(rng):
+    a = Vector3Array(rng.normal(size=(BATCH, 3)))
+    b = Vector3Array(rng.normal(size=(BATCH, 3)))
+    return lambda: a.cross(b)
+
+@case('QuaternionArray.slerp', BATCH)
+def _(rng):
+    a = QuaternionArray(rng.normal(size=(BATCH, 4))).normalize()
+    b = QuaternionArray(rng.normal(size=(BATCH, 4))).normalize()
+    return lambda: a.slerp(b, 0.35)
+
+@case('QuaternionArray.to_matrix4', BATCH)
+def _(rng):
+    a = QuaternionArray(rng.normal(size=(BATCH, 4))).normalize()
+    return a.to_matrix4
+
+@case('Matrix4Array.__mul__', BATCH)
+def _(rng):
+    a = Matrix4Array.from_trs(rng.normal(size=(BATCH, 3)), QuaternionArray(rng.normal(size=(BATCH, 4))).normalize(), np.ones((BATCH, 3)))
+    b = Matrix4Array.from_translations(rng.normal(size=(BATCH, 3)))
+    return lambda: a * b
+
+@case('Matrix4Array.from_trs', BATCH)
+def _(rng):
+    t = rng.normal(size=(BATCH, 3))
+    r = QuaternionArray(rng.normal(size=(BATCH, 4))).normalize()
+    s = np.ones((BATCH, 3))
+    return lambda: Matrix4Array.from_trs(t, r, s)
+
+@case('Matrix4Array.transform_point', BATCH)
+def _(rng):
+    m = Matrix4Array.from_translations(rng.normal(size=(BATCH, 3)))
+    p = Vector3Array(rng.normal(size=(BATCH, 3)))
+    return lambda: m.transform_point(p)
+
+def count_allocations(fn, calls: int):
+    """vmath objects constructed per call, nested super().__init__ calls count once."""
+    count = 0
+
+    def profiler(frame, event, arg):
+        nonlocal count
+        code = frame.f_code
+        if event != 'call' or code.co_name != '__init__' or code.co_filename != VMATH_FILE:
+            return
+        caller = frame.f_back
+        if caller and caller.f_code.co_name == '__init__' and caller.f_code.co_filename == VMATH_FILE \
+                and caller.f_locals.get('self') is frame.f_locals.get('self'):
+            return
+        count += 1
+
+    sys.setprofile(profiler)
+    try:
+        for _ in range(calls):
+            fn()
+    finally:
+        sys.setprofile(None)
+    return count / calls
+
+def measure(fn, repeat: int, min_time: float):
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat, number))
+    return best / number * 1e9
+
+def calibrate(repeat: int, min_time: float):
+    """Time of a fixed pure Python workload, used to cancel out the overall speed of
+    the machine (CPU frequency, load) when comparing with a baseline.
+    """
+    values = tuple(float(i) for i in range(64))
+
+    def workload():
+        total = 0.0
+        for v in values:
+            total += v * 0.5
+        return total
+    return measure(workload, repeat, min_time)
+
+def run(filter_text: str=None, repeat: int=5, min_time: float=0.05, names=None):
+    results = {}
+    for name, items, setup in CASES:
+        if filter_text and filter_text not in name:
+            continue
+        if names is not None and name not in names:
+            continue
+        fn = setup(np.random.default_rng(1234))
+        fn()
+        ns = measure(fn, repeat, min_time)
+        allocs = count_allocations(fn, 100)
+        results[name] = {
+            'ns_per_op': round(ns, 1),
+            'ns_per_item': round(ns / items, 2),
+            'allocs_per_op': allocs,
+            'items': items,
+        }
+        print(f'{name:34s} {ns:12.1f} ns/op {ns / items:10.2f} ns/item {allocs:6.2f} allocs/op')
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float, speeds: dict):
+    """Returns {case: [messages]} for the cases regressing against the baseline. Timings
+    are scaled by speeds[case], the calibration time of the baseline over the one of the
+    run that measured the case.
+    """
+    regressions = {}
+    print()
+    print(f'{"case":34s} {"baseline":>12s} {"now":>12s} {"change":>8s}')
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f'{name:34s} {"-":>12s} {now["ns_per_op"]:12.1f}      new')
+            continue
+        ratio = now['ns_per_op'] * speeds[name] / before['ns_per_op']
+        flag = ''
+        if ratio > 1.0 + tolerance:
+            flag = '  SLOWER'
+            regressions.setdefault(name, []).append(f'{name}: {before["ns_per_op"]:.1f} -> {now["ns_per_op"]:.1f} ns/op ({ratio:.2f}x normalized)')
+        if now['allocs_per_op'] > before['allocs_per_op'] + 1e-9:
+            flag += '  MORE ALLOCS'
+            regressions.setdefault(name, []).append(f'{name}: {before["allocs_per_op"]:.2f} -> {now["allocs_per_op"]:.2f} allocs/op')
+        print(f'{name:34s} {before["ns_per_op"]:12.1f} {now["ns_per_op"]:12.1f} {(ratio - 1.0) * 100.0:+7.1f}%{flag}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='pygex.vmath micro benchmarks')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline JSON to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='allowed slowdown, 0.3 = 30%%')
+    parser.add_argument('--filter', help='only run cases containing this text')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--retries', type=int, default=2, help='re-measure regressing cases this many times before failing')
+    args = parser.parse_args()
+
+    calibration = calibrate(args.repeat, 0.05)
+    print(f'{"calibration":34s} {calibration:12.1f} ns')
+    results = run(args.filter, args.repeat)
+    document = {
+        'meta': {
+            'calibration_ns': round(calibration, 1),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(document, fp, indent=2)
+        print(f'\nwrote {args.output}')
+
+    if args.update_baseline:
+        if os.path.exists(args.baseline) and args.filter:
+            # keep the cases that were not run
+            with open(args.baseline, 'r') as fp:
+                previous = json.load(fp)['results']
+            previous.update(results)
+            document['results'] = previous
+        with open(args.baseline, 'w') as fp:
+            json.dump(document, fp, indent=2)
+        print(f'\nbaseline updated: {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'\nno baseline at {args.baseline}, run with --update-baseline to create one')
+        return 0
+
+    with open(args.baseline, 'r') as fp:
+        baseline = json.load(fp)
+    baseline_calibration = baseline['meta'].get('calibration_ns') or calibration
+    speed = baseline_calibration / calibration
+    print(f'\nmachine speed vs baseline: {1.0 / speed:.2f}x the time, timings normalized')
+    speeds = dict.fromkeys(results, speed)
+    regressions = compare(results, baseline['results'], args.tolerance, speeds)
+
+    # a slower case is measured again to rule out a noisy run, keeping its best normalized time
+    for attempt in range(args.retries):
+        if not regressions:
+            break
+        print(f'\nre-measuring {len(regressions)} case(s), attempt {attempt + 1}/{args.retries}')
+        retry_speed = baseline_calibration / calibrate(args.repeat, 0.05)
+        retry = run(repeat=args.repeat, names=set(regressions))
+        for name, result in retry.items():
+            if result['ns_per_op'] * retry_speed < results[name]['ns_per_op'] * speeds[name]:
+                results[name] = result
+                speeds[name] = retry_speed
+        regressions = compare(results, baseline['results'], args.tolerance, speeds)
+
+    if regressions:
+        messages = [message for lines in regressions.values() for message in lines]
+        print('\n' + '!' * 72)
+        print(f'VMATH PERFORMANCE REGRESSION ({len(messages)}), tolerance {args.tolerance * 100.0:.0f}%:')
+        for line in messages:
+            print('  ' + line)
+        print('!' * 72)
+        return 1
+    print(f'\nno regressions (tolerance {args.tolerance * 100.0:.0f}%)')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
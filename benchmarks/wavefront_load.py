@@ -0,0 +1,54 @@
+"""Times OBJ import (parse + vertex buffer build, no GL upload) over the bundled assets
+and reports the vertex and byte counts before and after welding. The cached column is
+a load through the binary mesh cache, which is written next to each asset on first use,
+the parallel column an uncached load on a process pool.
+
+Usage: python benchmarks/wavefront_load.py [--workers N] [file.obj ...]
+"""
+import os, sys, glob, time, argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from pygex.rendering.wavefront import load_wavefront
+
+def bundled_assets():
+    return sorted(glob.glob(os.path.join(ROOT, 'examples', '*', 'assets', '*.obj')))
+
+def best_of(fn, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description='OBJ import benchmark')
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='process pool size of the parallel column')
+    args = parser.parse_args()
+
+    files = args.files or bundled_assets()
+    total = cached_total = parallel_total = 0.0
+    print(f'{"file":24s} {"MB":>7s} {"objects":>8s} {"corners":>9s} {"vertices":>9s} {"KB before":>10s} {"KB after":>9s} {"ms":>9s} {"MB/s":>7s} {"cached ms":>10s} {"parallel ms":>12s}')
+    for path in files:
+        size = os.path.getsize(path) / (1024.0 * 1024.0)
+        elapsed, objects = best_of(lambda: load_wavefront(path, cache=False), 3)
+        total += elapsed
+        load_wavefront(path)
+        cached, _ = best_of(lambda: load_wavefront(path), 3)
+        cached_total += cached
+        parallel, _ = best_of(lambda: load_wavefront(path, cache=False, workers=args.workers), 3)
+        parallel_total += parallel
+        corners = sum(obj.corner_count for obj in objects)
+        vertices = sum(obj.vertex_count for obj in objects)
+        before = sum(obj.unwelded_nbytes for obj in objects) / 1024.0
+        after = sum(obj.nbytes for obj in objects) / 1024.0
+        print(f'{os.path.basename(path):24s} {size:7.2f} {len(objects):8d} {corners:9d} {vertices:9d} {before:10.1f} {after:9.1f} {elapsed * 1000.0:9.1f} {size / elapsed:7.1f} {cached * 1000.0:10.2f} {parallel * 1000.0:12.1f}')
+    print(f'{"total":24s} {"":7s} {"":8s} {"":9s} {"":9s} {"":10s} {"":9s} {total * 1000.0:9.1f} {"":7s} {cached_total * 1000.0:10.2f} {parallel_total * 1000.0:12.1f}')
+    print(f'parallel column: {args.workers} workers')
+
+if __name__ == '__main__':
+    main()
@@ -82,7 +82,7 @@ class DeferredRenderer(Renderer):
         self.gbuffer_shader.set_uniform_vector('uProjection', self.projection_matrix)
         self.gbuffer_shader.set_uniform_vector('uView', self.view_matrix.inverse())
 
-        for model in self._models:
+        for model in self.visible_models:
             self.gbuffer_shader.set_uniform_vector('uModel', model.transform)
             model.material.on_apply(self.gbuffer_shader)
 
@@ -116,7 +116,7 @@ class DeferredRenderer(Renderer):
     def _pass_lighting(self):
         Utils.push_enable_state([ GL_BLEND ])
 
-        glBindVertexArray(Utils.get_dummy_vao())
+        Utils.bind_vertex_array(Utils.get_dummy_vao())
 
         self.lighting_shader.use()
 
@@ -164,7 +164,7 @@ class DeferredRenderer(Renderer):
             glDrawArrays(GL_TRIANGLES, 0, 6)
         
         Utils.pop_enable_state()
-        glBindVertexArray(0)
+        Utils.bind_vertex_array(0)
 
         if self.env_map:
             Utils.push_enable_state([ GL_CULL_FACE, GL_DEPTH_TEST ])
@@ -187,6 +187,7 @@ class DeferredRenderer(Renderer):
             Utils.pop_enable_state()
 
     def render(self):
+        self.cull()
         self._pass_gbuffer()
         self._pass_lighting()
         self.flush()
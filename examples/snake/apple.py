@@ -32,7 +32,7 @@ class Apple:
     def draw(self, shader: Shader):
         Apple.apple_tex.bind(0)
         model = self.transform.to_matrix4()
-        shader.set_uniform('uModel', *model.raw)
+        shader.set_uniform_vector('uModel', model)
         Apple.apple_mesh.draw()
 
     def update(self, dt: float):
@@ -29,7 +29,7 @@ class App(Application):
 
         self.apple_mesh = Mesh.from_wavefront(f'{pyge_import.assets_folder}/apple.obj')['mesh']
 
-        self.level_meshes = Mesh.from_wavefront(f'{pyge_import.assets_folder}/level.obj')
+        self.level_meshes = Mesh.from_wavefront(f'{pyge_import.assets_folder}/level.obj', pooled=True)
         print(self.level_meshes.keys())
 
         self.snake_tex = Texture2D.from_image_file(f'{pyge_import.assets_folder}/snake.png')
@@ -169,8 +169,8 @@ class App(Application):
         lightMatrix = lightProj * self.light.to_matrix4().inverse()
 
         self.shader.use()
-        self.shader.set_uniform('lightDir', *self.light.transform_vector(Vector3(0, 0, 1)).raw)
-        self.shader.set_uniform('uLightMatrix', *lightMatrix.raw)
+        self.shader.set_uniform_vector('lightDir', self.light.transform_vector(Vector3(0, 0, 1)))
+        self.shader.set_uniform_vector('uLightMatrix', lightMatrix)
         self.shader.set_uniform('shadowMap', 1)
 
         self.shadow_sample.bind(1)
@@ -213,21 +213,21 @@ class App(Application):
 
     def draw_level(self, shader: Shader, view: Matrix4, proj: Matrix4):
         shader.use()
-        shader.set_uniform('uView', *view.raw)
-        shader.set_uniform('uProj', *proj.raw)
+        shader.set_uniform_vector('uView', view)
+        shader.set_uniform_vector('uProj', proj)
         shader.set_uniform('tex', 0)
 
         self.level_tex.bind(0)
         self.sample.bind(0)
 
         for mesh in self.level_meshes.values():
-            shader.set_uniform('uModel', *self.ground.to_matrix4().raw)
+            shader.set_uniform_vector('uModel', self.ground.to_matrix4())
             mesh.draw()
 
     def draw_apples(self, shader: Shader, view: Matrix4, proj: Matrix4):
         shader.use()
-        shader.set_uniform('uView', *view.raw)
-        shader.set_uniform('uProj', *proj.raw)
+        shader.set_uniform_vector('uView', view)
+        shader.set_uniform_vector('uProj', proj)
         shader.set_uniform('tex', 0)
 
         self.apple_tex.bind(0)
@@ -238,8 +238,8 @@ class App(Application):
 
     def draw_snake(self, shader: Shader, view: Matrix4, proj: Matrix4):
         shader.use()
-        shader.set_uniform('uView', *view.raw)
-        shader.set_uniform('uProj', *proj.raw)
+        shader.set_uniform_vector('uView', view)
+        shader.set_uniform_vector('uProj', proj)
         shader.set_uniform('tex', 0)
 
         self.snake_tex.bind(0)
@@ -248,7 +248,7 @@ class App(Application):
         i = 0
         for xform in self.snake_body:
             model = xform.to_matrix4()
-            shader.set_uniform('uModel', *model.raw)
+            shader.set_uniform_vector('uModel', model)
 
             if i == 0:
                 self.snake_head_mesh.draw()
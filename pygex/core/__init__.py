@@ -1 +1,2 @@
-from .game_object import GameObject
\ No newline at end of file
+from .game_object import GameObject
+from .scene import FlatScene
@@ -7,6 +7,7 @@ from pygame.event import Event
 from OpenGL.GL import *
 
 from .input import InputHandler
+from .game_object import GameObject
 
 class Application:
     """Base application adapter. Your game should inherit from it."""
@@ -76,6 +77,7 @@ class Application:
                 self.on_draw()
                 pygame.display.flip()
                 self._frames += 1
+                GameObject.end_frame()
 
         pygame.quit()
 
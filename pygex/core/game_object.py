@@ -7,6 +7,13 @@ from ..rendering.renderer import Renderer
 
 
 class GameObject:
+    # world matrices recomputed/found up to date in the current frame, see end_frame
+    world_transforms_recomputed = 0
+    world_transforms_reused = 0
+    # counts of the last finished frame
+    last_frame_recomputed = 0
+    last_frame_reused = 0
+
     def __init__(self):
         self._initialized = False
         self._dead = False
@@ -16,6 +23,19 @@ class GameObject:
         
         self._parent_transform = Matrix4()
 
+        # world matrix cache, valid while the transform (and its version) and the
+        # parent's world stamp match what it was computed from
+        self._world_transform = Matrix4()
+        self._world_source: Transform = None
+        self._world_version = -1
+        self._world_parent_stamp = -1
+        self._world_stamp = 0
+
+        # set while the object is part of a FlatScene
+        self._scene = None
+        self._scene_index = -1
+        self._scene_frame = -1
+
         self._parent: GameObject = None
         self._children: List[GameObject] = []
 
@@ -34,6 +54,8 @@ class GameObject:
             return
         self._children.append(obj)
         obj.set_parent(self)
+        if self._scene:
+            self._scene.invalidate()
 
     def remove_child(self, obj: GameObject):
         if obj not in self._children:
@@ -43,23 +65,81 @@ class GameObject:
     def set_parent(self, obj: GameObject):
         if self._parent:
             self._parent.remove_child(self)
-        obj.add_child(self)
+        if obj:
+            obj.add_child(self)
         self._parent = obj
+        self._world_source = None
+        if self._scene:
+            self._scene.invalidate()
 
     def destroy(self, time_out: float=0):
         self._life = time_out
 
     @property
     def own_transform(self) -> Matrix4:
-        xform = self.transform.to_matrix4()
-        return self.parent_transform * xform
+        """World matrix of this object, only recomputed when this object or one of its
+        parents moved. The returned matrix is reused between calls, copy it if you need to keep it.
+        """
+        if self._scene:
+            return self._scene.get_world_transform(self)
+        if self._parent:
+            # make sure the chain above is up to date
+            self._parent.own_transform
+        self._refresh_world_transform()
+        return self._world_transform
 
     @property
     def parent_transform(self) -> Matrix4:
-        if self._parent and self._parent.transform.has_changed():
-            self._parent_transform = self._parent.own_transform
+        if self._parent:
+            return self._parent.own_transform
         return self._parent_transform
 
+    def update_world_transforms(self):
+        """Brings the world matrices of this object and its subtree up to date in one top-down pass."""
+        if not self._refresh_world_transform():
+            GameObject.world_transforms_reused += 1
+        for child in self._children:
+            child.update_world_transforms()
+
+    def _refresh_world_transform(self) -> bool:
+        # assumes the parent's world matrix is up to date
+        transform = self.transform
+        version = transform.version
+        parent = self._parent
+        parent_stamp = parent._world_stamp if parent else 0
+        if (transform is self._world_source and version == self._world_version
+            and parent_stamp == self._world_parent_stamp):
+            return False
+
+        local = transform.to_matrix4()
+        if parent:
+            Matrix4.mul_into(parent._world_transform, local, self._world_transform)
+        else:
+            self._world_transform.copy_from(local)
+
+        self._world_source = transform
+        self._world_version = version
+        self._world_parent_stamp = parent_stamp
+        # children compare against this to know their parent moved
+        self._world_stamp += 1
+        GameObject.world_transforms_recomputed += 1
+        return True
+
+    @staticmethod
+    def reset_world_transform_stats():
+        """Returns (recomputed, reused) since the last reset and resets the counters, see end_frame."""
+        stats = (GameObject.world_transforms_recomputed, GameObject.world_transforms_reused)
+        GameObject.world_transforms_recomputed = 0
+        GameObject.world_transforms_reused = 0
+        return stats
+
+    @staticmethod
+    def end_frame():
+        """Moves the current frame's counts to last_frame_recomputed/last_frame_reused and
+        starts counting the next frame. Application.run calls it after every drawn frame.
+        """
+        GameObject.last_frame_recomputed, GameObject.last_frame_reused = GameObject.reset_world_transform_stats()
+
     @property
     def parent(self):
         return self._parent
@@ -92,8 +172,13 @@ class GameObject:
         for child in children_to_remove:
             child._parent = None
             self._children.remove(child)
+        if children_to_remove and self._scene:
+            self._scene.invalidate()
     
     def render(self, renderer: Renderer):
+        # parents render before their children, so this is the top-down world matrix pass
+        if not self._scene and not self._refresh_world_transform():
+            GameObject.world_transforms_reused += 1
         self.on_render(renderer)
         
         # process children
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+
+from ..vmath import Matrix4Array
+from ..rendering.renderer import Renderer
+from .game_object import GameObject
+
+
+class FlatScene:
+    """Optional flattened store for large GameObject hierarchies.
+
+    Local translation/rotation/scale live in NumPy arrays sorted by depth with parent
+    indices, and world matrices are computed one hierarchy level at a time with batched
+    matrix products. The GameObjects stay the API: registered objects act as handles into
+    the arrays, their transform changes are picked up through Transform.version and their
+    own_transform reads back from `world`.
+
+    World matrices are refreshed by update_world_transforms() (render() calls it), so
+    own_transform returns the matrices of the last refresh, like a once-per-frame transform system.
+    """
+
+    def __init__(self):
+        self.roots: List[GameObject] = []
+        self.objects: List[GameObject] = []
+
+        self.parents = np.zeros(0, dtype=np.int32)
+        self.translations = np.zeros((0, 3), dtype=np.float32)
+        self.rotations = np.zeros((0, 4), dtype=np.float32)
+        self.scales = np.zeros((0, 3), dtype=np.float32)
+        self.local = Matrix4Array.identity(0)
+        self.world = Matrix4Array.identity(0)
+
+        # (start, end) of each depth level in `objects`
+        self._levels: List[tuple] = []
+        self._sources = []
+        self._versions = []
+        self._structure_dirty = False
+        self._frame = 0
+
+        # rows recomputed/reused by the last update_world_transforms
+        self.recomputed = 0
+        self.reused = 0
+
+    def add(self, root: GameObject):
+        """Registers root and its whole subtree (including children added later)."""
+        if root in self.roots:
+            return
+        self.roots.append(root)
+        self.invalidate()
+
+    def remove(self, root: GameObject):
+        if root not in self.roots:
+            return
+        self.roots.remove(root)
+        self.invalidate()
+
+    def invalidate(self):
+        """Marks the hierarchy as changed, the arrays are rebuilt on the next update."""
+        self._structure_dirty = True
+
+    def __len__(self):
+        return len(self.objects)
+
+    def _rebuild(self):
+        objects: List[GameObject] = []
+        parents = []
+        levels = []
+
+        level = [ (root, -1) for root in self.roots ]
+        while level:
+            start = len(objects)
+            next_level = []
+            for obj, parent_index in level:
+                index = len(objects)
+                objects.append(obj)
+                parents.append(parent_index)
+                # reparented objects stay in their old parent's list, skip them there
+                next_level.extend((child, index) for child in obj._children if child._parent is obj)
+            levels.append((start, len(objects)))
+            level = next_level
+
+        for obj in self.objects:
+            obj._scene = None
+        for index, obj in enumerate(objects):
+            obj._scene = self
+            obj._scene_index = index
+            obj._scene_frame = -1
+
+        count = len(objects)
+        self.objects = objects
+        self.parents = np.array(parents, dtype=np.int32)
+        self.translations = np.zeros((count, 3), dtype=np.float32)
+        self.rotations = np.zeros((count, 4), dtype=np.float32)
+        self.scales = np.zeros((count, 3), dtype=np.float32)
+        self.local = Matrix4Array.identity(count)
+        self.world = Matrix4Array.identity(count)
+
+        self._levels = levels
+        self._sources = [None] * count
+        self._versions = [-1] * count
+        self._structure_dirty = False
+
+    def _sync(self) -> np.ndarray:
+        """Copies the transforms that changed since the last sync into the arrays."""
+        sources = self._sources
+        versions = self._versions
+
+        changed = []
+        translations = []
+        rotations = []
+        scales = []
+        for index, obj in enumerate(self.objects):
+            xform = obj.transform
+            version = xform.version
+            if xform is sources[index] and version == versions[index]:
+                continue
+            sources[index] = xform
+            versions[index] = version
+
+            t = xform.translation
+            r = xform.rotation
+            s = xform.scale
+            changed.append(index)
+            translations.append((t.x, t.y, t.z))
+            rotations.append((r.w, r.x, r.y, r.z))
+            scales.append((s.x, s.y, s.z))
+
+        dirty = np.zeros(len(self.objects), dtype=bool)
+        if changed:
+            dirty[changed] = True
+            self.translations[changed] = translations
+            self.rotations[changed] = rotations
+            self.scales[changed] = scales
+        return dirty
+
+    def update_world_transforms(self):
+        if self._structure_dirty:
+            self._rebuild()
+
+        self._frame += 1
+        dirty = self._sync()
+
+        changed = np.nonzero(dirty)[0]
+        if changed.size:
+            self.local.data[changed] = Matrix4Array.from_trs(
+                self.translations[changed], self.rotations[changed], self.scales[changed]
+            ).data
+
+        local = self.local.data
+        world = self.world.data
+        parents = self.parents
+        for depth, (start, end) in enumerate(self._levels):
+            level_dirty = dirty[start:end]
+            if depth > 0:
+                # a moved parent moves the whole subtree below it
+                level_dirty |= dirty[parents[start:end]]
+            rows = start + np.nonzero(level_dirty)[0]
+            if rows.size == 0:
+                continue
+            if depth == 0:
+                world[rows] = local[rows]
+            else:
+                # parent * local, stored column major
+                world[rows] = np.matmul(local[rows], world[parents[rows]])
+
+        self.recomputed = int(np.count_nonzero(dirty))
+        self.reused = len(self.objects) - self.recomputed
+
+    def get_world_transform(self, obj: GameObject):
+        if obj._scene_frame != self._frame:
+            self.world.get_into(obj._scene_index, obj._world_transform)
+            obj._scene_frame = self._frame
+        return obj._world_transform
+
+    def update(self, delta_time: float):
+        for root in list(self.roots):
+            root.update(delta_time)
+
+    def render(self, renderer: Renderer):
+        """Updates the world matrices and calls on_render on every object, parents first, without recursion."""
+        self.update_world_transforms()
+        for obj in self.objects:
+            obj.on_render(renderer)
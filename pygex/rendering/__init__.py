@@ -1,6 +1,8 @@
 from .shader import Shader, ShaderCache
-from .geometry import Mesh, VertexFormat
-from .texture import Sampler, Texture1D, Texture2D, TextureCubeMap
+from .geometry import Mesh, VertexFormat, GeometryPool, PooledMesh
+from .bvh import MeshBVH, SceneBVH, RayHit
+from .mesh_tools import generate_tangents, fill_tangents, optimize_mesh, vertex_cache_stats
+from .texture import Sampler, Texture1D, Texture2D, Texture2DArray, TextureCubeMap
 from .texture_generators import *
 from .render_target import RenderTarget
 from .utils import Utils
@@ -0,0 +1,487 @@
+from typing import List
+
+import numpy as np
+
+from ..vmath import Vector3, Matrix4, Ray
+
+__all__ = ['RayHit', 'MeshBVH', 'SceneBVH']
+
+def _safe_reciprocal(directions: np.ndarray):
+    # keeps the slab test free of 0 * inf
+    tiny = np.where(directions < 0.0, -1e-12, 1e-12)
+    return 1.0 / np.where(np.abs(directions) < 1e-12, tiny, directions)
+
+def _surface_area(lo: np.ndarray, hi: np.ndarray):
+    d = hi - lo
+    return d[..., 0] * d[..., 1] + d[..., 1] * d[..., 2] + d[..., 2] * d[..., 0]
+
+def _cross(a: np.ndarray, b: np.ndarray):
+    # np.cross has a large fixed cost on the small batches traversal produces
+    out = np.empty_like(a)
+    out[:, 0] = a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1]
+    out[:, 1] = a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2]
+    out[:, 2] = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+    return out
+
+def _ray_arrays(origins, directions):
+    origins = np.asarray(origins, dtype=np.float64).reshape((-1, 3))
+    directions = np.asarray(directions, dtype=np.float64).reshape((-1, 3))
+    return origins, directions
+
+
+class _Hierarchy:
+    """Binned SAH hierarchy over primitive bounds, stored in flat arrays.
+
+    A node is a leaf when count > 0 and covers order[start:start + count],
+    otherwise its children are the nodes start and start + 1.
+    """
+
+    def __init__(self, mins: np.ndarray, maxs: np.ndarray, leaf_size: int=4, bins: int=16):
+        self.leaf_size = max(1, leaf_size)
+        self.bins = max(2, bins)
+        self._build(mins, maxs)
+
+    def _build(self, mins: np.ndarray, maxs: np.ndarray):
+        """Splits all nodes of a depth level together, so the NumPy call count grows
+        with the tree depth rather than with the number of nodes.
+        """
+        count = len(mins)
+        bins = self.bins
+        capacity = max(1, 2 * count - 1)
+        centroids = (mins + maxs) * 0.5
+        order = np.arange(count, dtype=np.int64)
+
+        self.node_min = np.zeros((capacity, 3), dtype=np.float64)
+        self.node_max = np.zeros((capacity, 3), dtype=np.float64)
+        self.node_start = np.zeros(capacity, dtype=np.int64)
+        self.node_count = np.zeros(capacity, dtype=np.int64)
+        depth = np.zeros(capacity, dtype=np.int64)
+
+        nodes = np.zeros(1 if count else 0, dtype=np.int64)
+        begins = np.zeros(len(nodes), dtype=np.int64)
+        lengths = np.full(len(nodes), count, dtype=np.int64)
+        allocated = len(nodes)
+        level = 0
+
+        while nodes.size:
+            offsets = np.cumsum(lengths) - lengths
+            segment = np.repeat(np.arange(len(nodes)), lengths)
+            positions = np.repeat(begins, lengths) + np.arange(int(lengths.sum())) - offsets[segment]
+            prims = order[positions]
+
+            self.node_min[nodes] = np.minimum.reduceat(mins[prims], offsets, axis=0)
+            self.node_max[nodes] = np.maximum.reduceat(maxs[prims], offsets, axis=0)
+            depth[nodes] = level
+
+            leaf = lengths <= self.leaf_size
+            self.node_start[nodes[leaf]] = begins[leaf]
+            self.node_count[nodes[leaf]] = lengths[leaf]
+
+            # keep only the nodes that split
+            split = ~leaf
+            if not split.any():
+                break
+            kept = split[segment]
+            nodes, begins, lengths = nodes[split], begins[split], lengths[split]
+            segments = len(nodes)
+            offsets = np.cumsum(lengths) - lengths
+            segment = np.repeat(np.arange(segments), lengths)
+            positions, prims = positions[kept], prims[kept]
+            c = centroids[prims]
+
+            lo = np.minimum.reduceat(c, offsets, axis=0)
+            extent = np.maximum.reduceat(c, offsets, axis=0) - lo
+            scale = bins / np.where(extent > 0.0, extent, 1.0)
+            ids = ((c - lo[segment]) * scale[segment]).astype(np.int64)
+            np.clip(ids, 0, bins - 1, out=ids)
+
+            # flat bin index is (segment * 3 + axis) * bins + bin
+            keys = ((segment[:, None] * 3 + np.arange(3)) * bins + ids).ravel()
+            bin_count = np.bincount(keys, minlength=segments * 3 * bins).reshape((segments, 3, bins))
+            bin_min = np.full((segments * 3 * bins, 3), np.inf)
+            bin_max = np.full((segments * 3 * bins, 3), -np.inf)
+            np.minimum.at(bin_min, keys, np.repeat(mins[prims], 3, axis=0))
+            np.maximum.at(bin_max, keys, np.repeat(maxs[prims], 3, axis=0))
+            bin_min = bin_min.reshape((segments, 3, bins, 3))
+            bin_max = bin_max.reshape((segments, 3, bins, 3))
+
+            left_min = np.minimum.accumulate(bin_min, axis=2)[:, :, :-1]
+            left_max = np.maximum.accumulate(bin_max, axis=2)[:, :, :-1]
+            right_min = np.minimum.accumulate(bin_min[:, :, ::-1], axis=2)[:, :, ::-1][:, :, 1:]
+            right_max = np.maximum.accumulate(bin_max[:, :, ::-1], axis=2)[:, :, ::-1][:, :, 1:]
+            left_count = np.cumsum(bin_count, axis=2)[:, :, :-1]
+            right_count = lengths[:, None, None] - left_count
+
+            with np.errstate(invalid='ignore'):
+                cost = _surface_area(left_min, left_max) * left_count + _surface_area(right_min, right_max) * right_count
+            cost[(left_count == 0) | (right_count == 0) | (extent[:, :, None] <= 0.0)] = np.inf
+
+            cost = cost.reshape((segments, -1))
+            best = np.argmin(cost, axis=1)
+            best_axis, best_bin = np.divmod(best, bins - 1)
+            go_left = ids[np.arange(len(prims)), best_axis[segment]] <= best_bin[segment]
+
+            # coincident centroids, split the range in half
+            degenerate = ~np.isfinite(cost[np.arange(segments), best])
+            if degenerate.any():
+                half = degenerate[segment]
+                go_left[half] = (positions[half] - begins[segment[half]]) < lengths[segment[half]] // 2
+
+            # stable partition inside each node's range
+            permutation = np.argsort(segment * 2 + ~go_left, kind='stable')
+            order[positions] = prims[permutation]
+
+            left_lengths = np.bincount(segment, weights=go_left, minlength=segments).astype(np.int64)
+            children = allocated + 2 * np.arange(segments)
+            allocated += 2 * segments
+            self.node_start[nodes] = children
+
+            nodes = np.stack((children, children + 1), axis=1).ravel()
+            begins = np.stack((begins, begins + left_lengths), axis=1).ravel()
+            lengths = np.stack((left_lengths, lengths - left_lengths), axis=1).ravel()
+            level += 1
+
+        self.order = order
+        self.node_min = self.node_min[:allocated]
+        self.node_max = self.node_max[:allocated]
+        self.node_start = self.node_start[:allocated]
+        self.node_count = self.node_count[:allocated]
+        depth = depth[:allocated]
+
+        # refit helpers: leaves sorted by their range, inner nodes grouped by depth
+        leaves = np.nonzero(self.node_count > 0)[0]
+        self._leaves = leaves[np.argsort(self.node_start[leaves])]
+        inner = np.nonzero(self.node_count == 0)[0]
+        self._inner_levels = [inner[depth[inner] == d] for d in range(int(depth.max(initial=0)), -1, -1)]
+
+    def refit(self, mins: np.ndarray, maxs: np.ndarray):
+        """Recomputes node bounds for moved primitives, keeping the topology."""
+        if not len(self.node_min):
+            return
+        starts = self.node_start[self._leaves]
+        self.node_min[self._leaves] = np.minimum.reduceat(mins[self.order], starts, axis=0)
+        self.node_max[self._leaves] = np.maximum.reduceat(maxs[self.order], starts, axis=0)
+        for nodes in self._inner_levels:
+            children = self.node_start[nodes]
+            self.node_min[nodes] = np.minimum(self.node_min[children], self.node_min[children + 1])
+            self.node_max[nodes] = np.maximum(self.node_max[children], self.node_max[children + 1])
+
+    def traverse(self, origins: np.ndarray, inv_directions: np.ndarray, best: np.ndarray, test_leaf):
+        """Walks all rays down the tree one level at a time. test_leaf(rays, primitives) gets
+        every (ray, primitive) pair reaching a leaf and is expected to lower `best` on hits,
+        which prunes the nodes behind the closest hit so far.
+        """
+        if not len(self.node_min):
+            return
+        rays = np.arange(len(origins))
+        nodes = np.zeros(len(origins), dtype=np.int64)
+
+        while rays.size:
+            o = origins[rays]
+            inv = inv_directions[rays]
+            t0 = (self.node_min[nodes] - o) * inv
+            t1 = (self.node_max[nodes] - o) * inv
+            near = np.maximum(np.minimum(t0, t1).max(axis=1), 0.0)
+            far = np.maximum(t0, t1).min(axis=1)
+            keep = (near <= far) & (near < best[rays])
+            rays = rays[keep]
+            nodes = nodes[keep]
+
+            counts = self.node_count[nodes]
+            leaf = counts > 0
+            if leaf.any():
+                leaf_counts = counts[leaf]
+                total = int(leaf_counts.sum())
+                offsets = np.arange(total) - np.repeat(np.cumsum(leaf_counts) - leaf_counts, leaf_counts)
+                prims = self.order[np.repeat(self.node_start[nodes[leaf]], leaf_counts) + offsets]
+                test_leaf(np.repeat(rays[leaf], leaf_counts), prims)
+
+            # expand two levels at once, inner children are replaced by their own children
+            # without testing their box, which is conservative and halves the iterations
+            inner = ~leaf
+            first = self.node_start[nodes[inner]]
+            rays = np.concatenate((rays[inner], rays[inner]))
+            nodes = np.concatenate((first, first + 1))
+            deep = self.node_count[nodes] == 0
+            if deep.any():
+                grand = self.node_start[nodes[deep]]
+                deep_rays = rays[deep]
+                rays = np.concatenate((rays[~deep], deep_rays, deep_rays))
+                nodes = np.concatenate((nodes[~deep], grand, grand + 1))
+
+
+class RayHit:
+    __slots__ = ('distance', 'point', 'triangle', 'barycentric', 'object', 'user_data')
+
+    def __init__(self, distance: float, point: Vector3, triangle: int, barycentric: tuple, object: int=-1, user_data=None):
+        self.distance = distance
+        self.point = point
+        self.triangle = triangle
+        self.barycentric = barycentric
+        self.object = object
+        self.user_data = user_data
+
+    def __repr__(self):
+        return 'RayHit({}, {}, triangle={}, object={})'.format(self.distance, self.point, self.triangle, self.object)
+
+
+class MeshBVH:
+    """Bounding volume hierarchy over the triangles of a mesh, in object space.
+
+    Rays are cast in batches: intersect() takes (n, 3) origins and directions and
+    returns the closest hit of every ray. Call refit() after moving vertices, or
+    build a new MeshBVH when the triangles change.
+    """
+
+    def __init__(self, positions: np.ndarray, indices: np.ndarray, leaf_size: int=4, bins: int=16):
+        self.positions = np.asarray(positions, dtype=np.float64).reshape((-1, 3))
+        self.triangles = np.asarray(indices, dtype=np.int64).reshape((-1, 3))
+        self._update_triangles()
+        self._tree = _Hierarchy(self._triangle_min, self._triangle_max, leaf_size, bins)
+
+    @staticmethod
+    def from_mesh(mesh, leaf_size: int=4, bins: int=16):
+        if mesh.positions is None or mesh.indices is None:
+            raise ValueError('Mesh has no CPU side positions, update it with float3 positions first')
+        return MeshBVH(mesh.positions, mesh.indices, leaf_size, bins)
+
+    @property
+    def triangle_count(self):
+        return len(self.triangles)
+
+    @property
+    def node_count(self):
+        return len(self._tree.node_min)
+
+    @property
+    def aabb_min(self):
+        return Vector3(*self._tree.node_min[0].tolist()) if self.node_count else Vector3()
+
+    @property
+    def aabb_max(self):
+        return Vector3(*self._tree.node_max[0].tolist()) if self.node_count else Vector3()
+
+    def _update_triangles(self):
+        corners = self.positions[self.triangles]
+        self._v0 = corners[:, 0]
+        self._e1 = corners[:, 1] - corners[:, 0]
+        self._e2 = corners[:, 2] - corners[:, 0]
+        self._triangle_min = corners.min(axis=1)
+        self._triangle_max = corners.max(axis=1)
+
+    def refit(self, positions: np.ndarray=None):
+        """Updates the bounds after the vertices moved. The tree keeps its topology, so
+        rebuild when the mesh deforms a lot.
+        """
+        if positions is not None:
+            self.positions = np.asarray(positions, dtype=np.float64).reshape((-1, 3))
+        self._update_triangles()
+        self._tree.refit(self._triangle_min, self._triangle_max)
+
+    def intersect(self, origins, directions, max_distance=np.inf):
+        """Closest hits of a batch of rays (both-sided triangles).
+
+        Returns (distances, triangles, barycentrics): distances are in units of the
+        direction length and inf on a miss, triangles is -1 on a miss and barycentrics
+        holds (u, v) of the hit point.
+        """
+        origins, directions = _ray_arrays(origins, directions)
+        count = len(origins)
+        best = np.empty(count, dtype=np.float64)
+        best[:] = max_distance
+        triangles = np.full(count, -1, dtype=np.int64)
+        barycentrics = np.zeros((count, 2), dtype=np.float64)
+
+        def test_leaf(rays, tris):
+            d = directions[rays]
+            e1 = self._e1[tris]
+            e2 = self._e2[tris]
+            p = _cross(d, e2)
+            det = np.einsum('ij,ij->i', e1, p)
+            valid = np.abs(det) > 1e-12
+            inv_det = 1.0 / np.where(valid, det, 1.0)
+
+            s = origins[rays] - self._v0[tris]
+            u = np.einsum('ij,ij->i', s, p) * inv_det
+            q = _cross(s, e1)
+            v = np.einsum('ij,ij->i', d, q) * inv_det
+            t = np.einsum('ij,ij->i', e2, q) * inv_det
+
+            valid &= (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t >= 0.0) & (t < best[rays])
+            if not valid.any():
+                return
+            rays, tris, t, u, v = rays[valid], tris[valid], t[valid], u[valid], v[valid]
+
+            np.minimum.at(best, rays, t)
+            closest = t == best[rays]
+            rays = rays[closest]
+            triangles[rays] = tris[closest]
+            barycentrics[rays, 0] = u[closest]
+            barycentrics[rays, 1] = v[closest]
+
+        self._tree.traverse(origins, _safe_reciprocal(directions), best, test_leaf)
+        best[triangles < 0] = np.inf
+        return best, triangles, barycentrics
+
+    def raycast(self, ray: Ray, max_distance: float=np.inf):
+        distances, triangles, barycentrics = self.intersect(
+            (ray.position.x, ray.position.y, ray.position.z),
+            (ray.direction.x, ray.direction.y, ray.direction.z),
+            max_distance
+        )
+        if triangles[0] < 0:
+            return None
+        distance = float(distances[0])
+        return RayHit(distance, ray.position + ray.direction * distance, int(triangles[0]), tuple(barycentrics[0].tolist()))
+
+
+class SceneBVH:
+    """Top level hierarchy over mesh BVH instances placed by world matrices.
+
+    Instances keep a reference to their Matrix4 (or to a GameObject, whose own_transform is
+    read), refit() picks up the ones whose matrix changed since the last build or refit.
+    Refitting keeps the tree topology, call build() again after large rearrangements.
+    """
+
+    def __init__(self, leaf_size: int=2, bins: int=16):
+        self.leaf_size = leaf_size
+        self.bins = bins
+
+        self._meshes: List[MeshBVH] = []
+        self._sources = []
+        self._user_data = []
+        self._stamps = []
+
+        self._world_min = np.zeros((0, 3), dtype=np.float64)
+        self._world_max = np.zeros((0, 3), dtype=np.float64)
+        self._inverses = np.zeros((0, 4, 4), dtype=np.float64)
+        self._tree: _Hierarchy = None
+
+    def __len__(self):
+        return len(self._meshes)
+
+    def add(self, bvh: MeshBVH, transform: Matrix4, user_data=None):
+        """Adds an instance, returns its index. The tree is rebuilt on the next query."""
+        self._meshes.append(bvh)
+        self._sources.append(transform)
+        self._user_data.append(user_data)
+        self._stamps.append(None)
+        self._tree = None
+        return len(self._meshes) - 1
+
+    def add_object(self, obj, bvh: MeshBVH):
+        """Adds a GameObject instance, placed by its own_transform."""
+        return self.add(bvh, obj, obj)
+
+    def set_transform(self, index: int, transform: Matrix4):
+        self._sources[index] = transform
+        self._stamps[index] = None
+
+    def _matrix(self, index: int) -> Matrix4:
+        source = self._sources[index]
+        return source if isinstance(source, Matrix4) else source.own_transform
+
+    def _update_instances(self, indices):
+        if len(self._world_min) != len(self._meshes):
+            count = len(self._meshes)
+            self._world_min = np.resize(self._world_min, (count, 3))
+            self._world_max = np.resize(self._world_max, (count, 3))
+            self._inverses = np.resize(self._inverses, (count, 4, 4))
+        if not len(indices):
+            return
+
+        matrices = np.empty((len(indices), 4, 4), dtype=np.float64)
+        corners = np.empty((len(indices), 8, 4), dtype=np.float64)
+        corners[:, :, 3] = 1.0
+        for i, index in enumerate(indices):
+            matrix = self._matrix(index)
+            matrices[i] = matrix.buffer.reshape((4, 4))
+            self._inverses[index] = matrix.inverse().buffer.reshape((4, 4))
+            self._stamps[index] = (matrix, matrix.version)
+
+            mesh = self._meshes[index]
+            lo = mesh._tree.node_min[0] if mesh.node_count else np.zeros(3)
+            hi = mesh._tree.node_max[0] if mesh.node_count else np.zeros(3)
+            for c in range(8):
+                corners[i, c, 0] = hi[0] if c & 1 else lo[0]
+                corners[i, c, 1] = hi[1] if c & 2 else lo[1]
+                corners[i, c, 2] = hi[2] if c & 4 else lo[2]
+
+        # column major storage: world = p @ M
+        world = np.einsum('kci,kij->kcj', corners, matrices)[:, :, :3]
+        self._world_min[indices] = world.min(axis=1)
+        self._world_max[indices] = world.max(axis=1)
+
+    def build(self):
+        self._update_instances(list(range(len(self._meshes))))
+        self._tree = _Hierarchy(self._world_min, self._world_max, self.leaf_size, self.bins)
+
+    def refit(self):
+        """Refits the tree for instances whose matrix changed, returns how many moved."""
+        if self._tree is None:
+            self.build()
+            return len(self._meshes)
+
+        moved = []
+        for index, stamp in enumerate(self._stamps):
+            matrix = self._matrix(index)
+            if stamp is None or stamp[0] is not matrix or stamp[1] != matrix.version:
+                moved.append(index)
+        if moved:
+            self._update_instances(moved)
+            self._tree.refit(self._world_min, self._world_max)
+        return len(moved)
+
+    def intersect(self, origins, directions, max_distance=np.inf):
+        """Closest hits of a batch of world space rays.
+
+        Returns (distances, objects, triangles, barycentrics), objects and triangles are
+        -1 on a miss. Uses the instance placement of the last build() or refit().
+        """
+        if self._tree is None:
+            self.build()
+
+        origins, directions = _ray_arrays(origins, directions)
+        count = len(origins)
+        best = np.empty(count, dtype=np.float64)
+        best[:] = max_distance
+        objects = np.full(count, -1, dtype=np.int64)
+        triangles = np.full(count, -1, dtype=np.int64)
+        barycentrics = np.zeros((count, 2), dtype=np.float64)
+
+        def test_leaf(rays, instances):
+            for index in np.unique(instances):
+                # every ray reaches an instance at most once
+                selected = rays[instances == index]
+                inverse = self._inverses[index]
+                local_origins = origins[selected] @ inverse[:3, :3] + inverse[3, :3]
+                local_directions = directions[selected] @ inverse[:3, :3]
+
+                # the parameter t is preserved by affine maps, so distances compare directly
+                t, tris, bary = self._meshes[index].intersect(local_origins, local_directions, best[selected])
+                hit = tris >= 0
+                selected = selected[hit]
+                best[selected] = t[hit]
+                objects[selected] = index
+                triangles[selected] = tris[hit]
+                barycentrics[selected] = bary[hit]
+
+        self._tree.traverse(origins, _safe_reciprocal(directions), best, test_leaf)
+        best[objects < 0] = np.inf
+        return best, objects, triangles, barycentrics
+
+    def raycast(self, ray: Ray, max_distance: float=np.inf):
+        distances, objects, triangles, barycentrics = self.intersect(
+            (ray.position.x, ray.position.y, ray.position.z),
+            (ray.direction.x, ray.direction.y, ray.direction.z),
+            max_distance
+        )
+        if objects[0] < 0:
+            return None
+        distance = float(distances[0])
+        index = int(objects[0])
+        return RayHit(
+            distance, ray.position + ray.direction * distance,
+            int(triangles[0]), tuple(barycentrics[0].tolist()),
+            index, self._user_data[index]
+        )
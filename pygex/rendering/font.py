@@ -1,4 +1,4 @@
-from functools import wraps
+from functools import wraps, lru_cache
 from typing import Dict, List, Tuple
 
 import freetype as ft
@@ -14,21 +14,24 @@ import OpenGL.images as images
 
 from pygex.vmath import Matrix4
 from .geometry import Mesh, VertexFormat
-from .texture import Texture2D, Sampler
+from .texture import Texture2D, Texture2DArray, Sampler
 from .shader import Shader, ShaderCache
+from .sdf import signed_distance_field, signed_distance_fields
+from .rect_pack import SkylinePacker
+from . import font_cache
 
 # from PIL import Image, ImageDraw
 
 vs = """
 #version 330 core
 layout (location=0) in vec3 vPos;
-layout (location=1) in vec2 vTex;
+layout (location=1) in vec3 vTex;
 layout (location=2) in vec4 vCol;
 
 uniform mat4 uProj;
 uniform mat4 uModel;
 
-out vec2 oTex;
+out vec3 oTex;
 out vec4 oCol;
 
 void main() {
@@ -42,9 +45,9 @@ fs = """
 #version 330 core
 out vec4 fragColor;
 
-uniform sampler2D uFont;
+uniform sampler2DArray uFont;
 
-in vec2 oTex;
+in vec3 oTex;
 in vec4 oCol;
 
 const float smoothing = 1.0/16.0;
@@ -57,7 +60,16 @@ void main() {
 }
 """
 
-def get_all_chars(encoding) -> List[str]:
+_identity = Matrix4()
+
+# glyphs rasterized up front by lazy fonts
+DEFAULT_CHARSET = ''.join(chr(c) for c in range(32, 127))
+
+@lru_cache(maxsize=None)
+def get_all_chars(encoding) -> Tuple[str, ...]:
+    """Every character the encoding can represent. The scan covers all of Unicode and
+    takes seconds, the result is cached per encoding.
+    """
     chars = []
     for x in range(sys.maxunicode):
         u = chr(x)
@@ -66,7 +78,7 @@ def get_all_chars(encoding) -> List[str]:
         except:
             continue
         chars.append(u)
-    return chars
+    return tuple(chars)
 
 def map_range(val: float, in_min: float, in_max: float, out_min: float, out_max: float) -> float:
     norm = (val - in_min) / (in_max - in_min)
@@ -78,6 +90,7 @@ class Character:
     atlas_y: int
     size: Tuple[int, int]
     pack_rect: Tuple[int, int, int, int]
+    page: int
     bearing: Tuple[int, int]
     advance: int
     buffer: npt.NDArray
@@ -88,15 +101,30 @@ class BasicAtlas:
         self.width = width
         self.height = height
     
-    def blit(self, x: int, y: int, data: npt.NDArray, data_width: int, data_height: int):
-        for dy in range(data_height):
-            for dx in range(data_width):
-                nx = x + dx; ny = y + dy
-                if dx < data_width and dy < data_height and nx < self.width and ny < self.height:
-                    self.data[ny, nx] = data[dx, dy]
+    def blit(self, x: int, y: int, data: npt.NDArray):
+        """Copies a (rows, columns) tile with its top left corner at x, y, clipped to the atlas."""
+        h = min(data.shape[0], self.height - y)
+        w = min(data.shape[1], self.width - x)
+        if w > 0 and h > 0:
+            self.data[y:y + h, x:x + w] = data[:h, :w]
 
 class Font:
-    def __init__(self, font_file_path: str, sdf_spread: int=16, atlas_size: int=2048):
+    def __init__(self, font_file_path: str, sdf_spread: int=16, atlas_size: int=1024,
+                 lazy: bool=False, charset: str=None, encoding: str='cp1252', gpu_sdf: bool=False,
+                 cache: bool=True):
+        """Rasterizes a font into an SDF atlas. The atlas is a texture array, glyphs that do
+        not fit go to a new page (layer).
+
+        Args:
+            font_file_path (str): Font file, anything FreeType reads
+            sdf_spread (int, optional): Distance field spread in pixels. Defaults to 16.
+            atlas_size (int, optional): Width and height of an atlas page. Defaults to 1024.
+            lazy (bool, optional): Rasterize only charset up front and add other glyphs the first time they are drawn. Defaults to False.
+            charset (str, optional): Glyphs to rasterize up front. Defaults to every character of encoding, or DEFAULT_CHARSET when lazy.
+            encoding (str, optional): Encoding whose characters make the default charset. Defaults to 'cp1252'.
+            gpu_sdf (bool, optional): Compute the distance field with the compute shader (GL 4.6) instead of on the CPU. Defaults to False.
+            cache (bool, optional): Load the finished atlas from the disk cache, or store it there after building, see font_cache. Defaults to True.
+        """
         self.default_height = 80
         self.face = ft.Face(font_file_path)
         self.face.set_pixel_sizes(0, self.default_height)
@@ -106,20 +134,30 @@ class Font:
         self.padding = int(self.spread * 1.5)
 
         self._rects = []
-
-        chars = get_all_chars('cp1252')
-        print(f'Processing {len(chars)} chars.')
-
-        self.line_height = 0
-        for char in chars:
-            char_obj = self._generate_single_char(char)
-            if not char_obj: continue
-            
-            self.line_height = max(self.line_height, char_obj.size[1])
-            self.characters[char_obj.char] = char_obj
-        self.line_height += 5
-
-        self._pack(atlas_size, atlas_size)
+        self.lazy = lazy
+        self.gpu_sdf = gpu_sdf
+        self.atlas_size = atlas_size
+        # one packer per atlas page
+        self._packers: List[SkylinePacker] = []
+        # characters without a glyph bitmap or too large for a page, not retried
+        self._missing = set()
+
+        # scanning a whole encoding takes seconds, a default charset is keyed on its name
+        options = {
+            'height': self.default_height, 'spread': float(sdf_spread), 'atlas_size': atlas_size,
+            'charset': None if charset is None else ''.join(charset), 'encoding': encoding, 'lazy': lazy,
+        }
+        cached = font_cache.read_cache(font_file_path, options) if cache else None
+        if cached is not None:
+            dat = self._restore(cached[0], cached[1])
+        else:
+            if charset is None:
+                charset = DEFAULT_CHARSET if lazy else get_all_chars(encoding)
+            # '?' and '_' stand in for missing glyphs
+            chars = list(dict.fromkeys([*charset, '?', '_']))
+            dat = self._build_atlas(chars, atlas_size, sdf_spread, gpu_sdf)
+            if cache:
+                font_cache.write_cache(font_file_path, options, self._cache_header(), dat)
 
         # make UVs
         for char in self.characters.values():
@@ -131,22 +169,12 @@ class Font:
             
             self.character_uvs[char.char] = (uvx1, 1.0-uvy1, uvx2, 1.0-uvy2)
 
-        # make atlas
-        atlas = BasicAtlas(atlas_size, atlas_size)
-        for char in self.characters.values():
-            atlas.blit(char.atlas_x, char.atlas_y, char.buffer, char.size[0], char.size[1])
-        
-        atlas.data = np.array(np.flipud(atlas.data))
-
-        if sdf_spread > 1.0:
-            dat = self._render_sdf(atlas.data, atlas_size, atlas_size, spread=float(sdf_spread))
-        else:
-            dat = atlas.data
+        # (pages, size, size), kept for lazy glyphs, rows as uploaded (bottom up)
+        self._atlas_pixels = np.asarray(dat, dtype=np.uint8).reshape((-1, atlas_size, atlas_size))
 
         # texture!
-        self.atlas = Texture2D(atlas_size, atlas_size, GL_R8)
-        self.atlas.update(dat, GL_RED, GL_UNSIGNED_BYTE)
-        self.atlas.generate_mipmaps()
+        self.atlas = None
+        self._upload_atlas()
 
         self.sample = Sampler()
         self.sample.filter()
@@ -155,9 +183,9 @@ class Font:
         # mesh!
         self._mesh = Mesh(VertexFormat.from_list([
             (3, False, GL_FLOAT), # POSITION
-            (2, False, GL_FLOAT), # UV
+            (3, False, GL_FLOAT), # UV, page
             (4, True, GL_FLOAT)   # COLOR
-        ]))
+        ]), GL_STREAM_DRAW)
         self._previous_text = ''
 
         # shader
@@ -211,12 +239,12 @@ class Font:
         self.sample.bind(0)
         self.atlas.bind(0)
         self._shader.set_uniform('uFont', 0)
-        self._shader.set_uniform('uProj', *proj_view.raw)
+        self._shader.set_uniform_vector('uProj', proj_view)
 
         for offset, count, xform, depthTest in self._draw_calls:
             if depthEnabled and not depthTest: glDisable(GL_DEPTH_TEST)
 
-            self._shader.set_uniform('uModel', *xform.raw)
+            self._shader.set_uniform_vector('uModel', xform)
             self._mesh.draw(count=count, offset=offset)
 
             if depthEnabled and not depthTest: glEnable(GL_DEPTH_TEST)
@@ -279,7 +307,7 @@ class Font:
         self._vertices.extend(verts)
         self._indices.extend([ i + self._start_index for i in inds ])
 
-        self._draw_calls.append((self._start_index, len(inds), Matrix4(), False))
+        self._draw_calls.append((self._start_index, len(inds), _identity, False))
 
         self._start_index += len(verts) // self._mesh.format.size
 
@@ -301,12 +329,14 @@ class Font:
         c.advance = math.floor(glyph.advance.x / 64)
         c.buffer = char_buff
         c.pack_rect = (0, 0, c.size[0] + self.padding * 2, c.size[1] + self.padding * 2)
+        c.page = 0
         c.atlas_x = 0
         c.atlas_y = 0
 
         return c
     
-    def _render_sdf(self, buff: npt.NDArray, buff_width: int, buff_height: int, spread: float=1.0):
+    @staticmethod
+    def _render_sdf(buff: npt.NDArray, buff_width: int, buff_height: int, spread: float=1.0):
         sdf_tex = Texture2D(buff_width, buff_height, GL_R8)
 
         sdf_shader = """
@@ -396,72 +426,182 @@ class Font:
 
         return imageData
 
-    def _pack(self, width: int, height: int):
-        class Rect:
-            x: int
-            y: int
-            w: int
-            h: int
-            def __init__(self, x, y, w, h):
-                self.x = x
-                self.y = y
-                self.w = w
-                self.h = h
-        spaces: List[Rect] = []
-
-        def create_space(x, y, w, h):
-            spaces.append(Rect(x, y, w, h))
-        
-        def create_rect(char: Character) -> Rect:
-            _, _, cw, ch = char.pack_rect
-
-            rec = Rect(0, 0, cw, ch)
-
-            for i in range(len(spaces)-1, -1, -1):
-                space = spaces[i]
-                if rec.w > space.w or rec.h > space.h: continue
-
-                rec.x = space.x
-                rec.y = space.y
-
-                if rec.w == space.w and rec.h == space.h:
-                    last = spaces.pop()
-                    if i < len(spaces): spaces[i] = last
-                elif rec.w == space.w:
-                    space.y += rec.h
-                    space.h -= rec.h
-                elif rec.h == space.h:
-                    space.x += rec.w
-                    space.w -= rec.w
-                else:
-                    # divide
-                    create_space(space.x + rec.w, space.y, space.w - rec.w, rec.h)
-                    space.y += rec.h
-                    space.h -= rec.h
-                break
-            
-            return rec
-
-        create_space(0, 0, width, height)
+    @property
+    def atlas_occupancy(self) -> float:
+        """Fraction of the atlas pages covered by glyph rectangles."""
+        if not self._packers: return 0.0
+        return sum(packer.used_area for packer in self._packers) / (len(self._packers) * self.atlas_size ** 2)
 
+    def _place(self, char: Character):
+        """Packs char into the first page with room, opening a new page if none has.
+        False when the glyph is larger than a page.
+        """
+        _, _, w, h = char.pack_rect
+        if w > self.atlas_size or h > self.atlas_size:
+            return False
+        for page, packer in enumerate(self._packers):
+            pos = packer.insert(w, h)
+            if pos is not None: break
+        else:
+            self._packers.append(SkylinePacker(self.atlas_size, self.atlas_size))
+            page = len(self._packers) - 1
+            pos = self._packers[page].insert(w, h)
+
+        x, y = pos
+        char.atlas_x = x + self.padding
+        char.atlas_y = y + self.padding
+        char.pack_rect = (x, y, w, h)
+        char.page = page
+        return True
+
+    def _pack(self):
+        """Packs every character, tallest first. Glyphs too large for a page are dropped."""
         char_list = list(self.characters.values())
-        char_list.sort(key=lambda a: a.size[1], reverse=True)
-
-        def npot(n):
-            n -= 1
-            while n & n-1: n = n & n - 1
-            return n << 1
+        char_list.sort(key=lambda a: a.pack_rect[3], reverse=True)
 
-        max_h = 0
         for char in char_list:
-            rec = create_rect(char)
-            char.atlas_x = rec.x + self.padding
-            char.atlas_y = rec.y + self.padding
-            char.pack_rect = (rec.x, rec.y, rec.w, rec.h)
+            if not self._place(char):
+                print(f'Glyph {char.char!r} is larger than the font atlas, skipped.')
+                del self.characters[char.char]
+                self._missing.add(char.char)
+
+    def _upload_atlas(self):
+        """(Re)creates the atlas texture array from _atlas_pixels."""
+        if self.atlas is not None:
+            self.atlas.discard()
+        size = self.atlas_size
+        self.atlas = Texture2DArray(size, size, len(self._atlas_pixels), GL_R8)
+        self.atlas.update(np.ascontiguousarray(self._atlas_pixels), GL_RED, GL_UNSIGNED_BYTE)
+
+    def _glyph(self, c: str):
+        """The Character of c, rasterized on first use by lazy fonts. None if the font has no
+        bitmap for it (whitespace, unsupported) or it is larger than an atlas page.
+        """
+        char = self.characters.get(c)
+        if char is None and self.lazy and c not in self._missing:
+            char = self._add_glyph(c)
+            if char is None:
+                self._missing.add(c)
+        return char
+
+    def _add_glyph(self, c: str):
+        char = self._generate_single_char(c)
+        if not char: return None
+
+        if not self._place(char):
+            print(f'Glyph {c!r} is larger than the font atlas, can not add it.')
+            return None
+        x, y, w, h = char.pack_rect
+
+        # flipped like the atlas
+        tile = np.flipud(self._glyph_tile(char))
+        if self.spread > 1.0:
+            tile = self._render_tile_sdf(tile)
+
+        size = self.atlas_size
+        if char.page == len(self._atlas_pixels):
+            # a new page, the texture array grows by a layer
+            self._atlas_pixels = np.concatenate([self._atlas_pixels, np.zeros((1, size, size), dtype=np.uint8)])
+            gy = size - y - h
+            self._atlas_pixels[char.page, gy:gy + h, x:x + w] = tile
+            self._upload_atlas()
+        else:
+            gy = size - y - h
+            self._atlas_pixels[char.page, gy:gy + h, x:x + w] = tile
+            self.atlas.update_subregion(np.ascontiguousarray(tile), x, gy, char.page, w, h, GL_RED, GL_UNSIGNED_BYTE)
+
+        self.character_uvs[c] = (x / size, 1.0 - y / size, (x + w) / size, 1.0 - (y + h) / size)
+        self.characters[c] = char
+        return char
+
+    def _build_atlas(self, chars: List[str], atlas_size: int, sdf_spread: float, gpu_sdf: bool):
+        """Rasterizes, packs and distance fields chars. Returns the (pages, size, size) atlas
+        pixels, rows bottom up.
+        """
+        print(f'Processing {len(chars)} chars.')
+
+        self.line_height = 0
+        for char in chars:
+            char_obj = self._generate_single_char(char)
+            if not char_obj: continue
+            
+            self.line_height = max(self.line_height, char_obj.size[1])
+            self.characters[char_obj.char] = char_obj
+        self.line_height += 5
+
+        # padded glyph tiles, turned into distance fields before packing so the work
+        # scales with the glyph area, not the atlas size
+        glyphs = list(self.characters.values())
+        tiles = [self._glyph_tile(char) for char in glyphs]
+        if sdf_spread > 1.0 and not gpu_sdf:
+            tiles = signed_distance_fields(tiles, float(self.spread))
 
-            max_h = max(rec.y + rec.h, max_h)
+        self._pack()
+
+        # make atlas
+        pages = [BasicAtlas(atlas_size, atlas_size) for _ in range(max(len(self._packers), 1))]
+        for char, tile in zip(glyphs, tiles):
+            if char.char in self.characters:
+                pages[char.page].blit(char.pack_rect[0], char.pack_rect[1], tile)
+
+        dat = np.stack([np.flipud(page.data) for page in pages])
+
+        if sdf_spread > 1.0 and gpu_sdf:
+            dat = np.stack([
+                np.asarray(self._render_sdf(page, atlas_size, atlas_size, spread=float(sdf_spread)), dtype=np.uint8).reshape((atlas_size, atlas_size))
+                for page in dat
+            ])
+
+        return dat
+
+    def _cache_header(self):
+        """What _restore needs besides the atlas pixels."""
+        return {
+            'line_height': self.line_height,
+            'characters': [
+                [char.char, list(char.size), list(char.bearing), char.advance, list(char.pack_rect), char.page]
+                for char in self.characters.values()
+            ],
+            'pages': [packer.state() for packer in self._packers],
+        }
 
-        return npot(max_h)
+    def _restore(self, header: dict, atlas: npt.NDArray):
+        """Sets up the glyphs of a cached atlas, see font_cache. Returns the atlas pixels."""
+        self.line_height = header['line_height']
+        for c, size, bearing, advance, pack_rect, page in header['characters']:
+            char = Character()
+            char.char = c
+            char.size = tuple(size)
+            char.bearing = tuple(bearing)
+            char.advance = advance
+            char.pack_rect = tuple(pack_rect)
+            char.page = page
+            char.atlas_x = pack_rect[0] + self.padding
+            char.atlas_y = pack_rect[1] + self.padding
+            # only needed while building the atlas
+            char.buffer = None
+            self.characters[c] = char
+        self._packers = [SkylinePacker.from_state(state) for state in header['pages']]
+        return atlas
+
+    def _glyph_tile(self, char: Character):
+        """The glyph bitmap with the SDF padding around it, pack_rect sized, rows top down."""
+        _, _, w, h = char.pack_rect
+        tile = np.zeros((h, w), dtype=np.uint8)
+        tile[self.padding:self.padding + char.size[1], self.padding:self.padding + char.size[0]] = char.buffer.T
+        return tile
+
+    def _render_tile_sdf(self, tile: npt.NDArray):
+        if not self.gpu_sdf:
+            return signed_distance_field(tile, float(self.spread))
+
+        # the compute shader works in 4x4 groups
+        h, w = tile.shape
+        ph, pw = -(-h // 4) * 4, -(-w // 4) * 4
+        padded = np.zeros((ph, pw), dtype=np.uint8)
+        padded[:h, :w] = tile
+        sdf = self._render_sdf(padded, pw, ph, spread=float(self.spread))
+        return np.asarray(sdf, dtype=np.uint8).reshape((ph, pw))[:h, :w]
 
     def _generate_char_vertices(
         self,
@@ -481,6 +621,7 @@ class Font:
         ypos = (y - char.bearing[1] * scale) + bearing_gap
 
         uvx1, uvy1, uvx2, uvy2 = uv
+        page = char.page
 
         top_h = 0 if not flip_y else h
         bot_h = h if not flip_y else 0
@@ -490,11 +631,11 @@ class Font:
 
         z = 1e-2 * (-1 if char_index % 2 == 0 else 1)
         vertices = [
-            # POSITION                  # UVs                           # COLOR
-            xpos,     ypos + top_h, z,  uvx1, uvy1,  color[0], color[1], color[2], color[3],
-            xpos + w, ypos + top_h, z,  uvx2, uvy1,  color[0], color[1], color[2], color[3],
-            xpos + w, ypos + bot_h, z,  uvx2, uvy2,  color[0], color[1], color[2], color[3],
-            xpos,     ypos + bot_h, z,  uvx1, uvy2,  color[0], color[1], color[2], color[3]
+            # POSITION                  # UVs, page                          # COLOR
+            xpos,     ypos + top_h, z,  uvx1, uvy1, page,  color[0], color[1], color[2], color[3],
+            xpos + w, ypos + top_h, z,  uvx2, uvy1, page,  color[0], color[1], color[2], color[3],
+            xpos + w, ypos + bot_h, z,  uvx2, uvy2, page,  color[0], color[1], color[2], color[3],
+            xpos,     ypos + bot_h, z,  uvx1, uvy2, page,  color[0], color[1], color[2], color[3]
         ]
         indices = [ i + start_index for i in [ 0, 1, 2, 2, 3, 0 ] ]
 
@@ -504,11 +645,7 @@ class Font:
         tx = 0
 
         for c in list(text):
-            char = None
-            if c not in self.characters:
-                char = self.characters['?']
-            else:
-                char = self.characters[c]
+            char = self._glyph(c) or self.characters['?']
 
             if c not in ['\n', '\r']:
                 tx += char.advance * scale
@@ -548,11 +685,7 @@ class Font:
 
             index = 0
             for c in list(line):
-                char = None
-                if c not in self.characters:
-                    char = self.characters['_']
-                else:
-                    char = self.characters[c]
+                char = self._glyph(c) or self.characters['_']
                 
                 if not c.isspace():
                     verts, inds = self._generate_char_vertices(char, index, tx - ox, ty, scale, color, start_offset, flip_y)
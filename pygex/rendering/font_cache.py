@@ -0,0 +1,102 @@
+"""Disk cache for finished Font atlases.
+
+A Font depends only on the font file contents and its build options (pixel size,
+spread, charset, atlas size), so both go into the key: the file name is a hash of
+the font's content hash and the options. The file holds the magic bytes, a little
+endian uint32 format version and header length, a JSON header with the options,
+glyph metrics and the state of every page's packer, then the raw atlas pages aligned
+to 16 bytes. Loading memory maps the atlas, which goes to the texture as is.
+
+Files live in cache_folder(): $PYGEX_CACHE_DIR, else pygex/fonts in the user cache
+folder ($XDG_CACHE_HOME or ~/.cache). A changed font gets a new key, old files are
+left behind and can be deleted at any time.
+"""
+import os, json, struct, hashlib, tempfile
+
+import numpy as np
+
+__all__ = ['CACHE_VERSION', 'cache_folder', 'cache_path', 'read_cache', 'write_cache']
+
+MAGIC = b'PGXFONT\x00'
+CACHE_VERSION = 2
+EXTENSION = '.fontcache'
+_PREAMBLE = struct.Struct('<II')
+_ALIGNMENT = 16
+
+def cache_folder():
+    folder = os.environ.get('PYGEX_CACHE_DIR')
+    if folder:
+        return folder
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pygex', 'fonts')
+
+def _hash_file(path: str):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path(source: str, options: dict, folder: str=None):
+    """Where the atlas of source built with options is stored."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(_hash_file(source).encode('ascii'))
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(folder or cache_folder(), f'{name}-{digest.hexdigest()}{EXTENSION}')
+
+def _align(offset: int):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def read_cache(source: str, options: dict, folder: str=None):
+    """Returns (header, atlas) with a copy on write memory mapped (pages, size, size) uint8 atlas,
+    or None when nothing is cached for source and options.
+    """
+    try:
+        path = cache_path(source, options, folder)
+        with open(path, 'rb') as fp:
+            if fp.read(len(MAGIC)) != MAGIC:
+                return None
+            version, length = _PREAMBLE.unpack(fp.read(_PREAMBLE.size))
+            if version != CACHE_VERSION:
+                return None
+            header = json.loads(fp.read(length).decode('utf-8'))
+    except (OSError, ValueError, struct.error):
+        return None
+    if header['options'] != options:
+        return None
+
+    size = options['atlas_size']
+    start = _align(len(MAGIC) + _PREAMBLE.size + length)
+    try:
+        # copy on write, lazy fonts keep drawing new glyphs into it
+        atlas = np.memmap(path, dtype=np.uint8, mode='c', offset=start, shape=(max(len(header['pages']), 1), size, size))
+    except (OSError, ValueError):
+        return None
+    return header, atlas
+
+def write_cache(source: str, options: dict, header: dict, atlas: np.ndarray, folder: str=None):
+    """Stores header (JSON serializable) and the atlas pixels. Returns False when the
+    cache can not be written.
+    """
+    try:
+        path = cache_path(source, options, folder)
+        encoded = json.dumps({ **header, 'options': options }).encode('utf-8')
+        data_start = _align(len(MAGIC) + _PREAMBLE.size + len(encoded))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp = tempfile.mkstemp(prefix='.fontcache-', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(MAGIC)
+                fp.write(_PREAMBLE.pack(CACHE_VERSION, len(encoded)))
+                fp.write(encoded)
+                fp.write(b'\0' * (data_start - fp.tell()))
+                fp.write(np.ascontiguousarray(atlas, dtype=np.uint8).tobytes())
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        return True
+    except OSError:
+        return False
@@ -1,14 +1,20 @@
 from typing import Dict, Tuple, List
 
-import ctypes, re, itertools
+import ctypes, bisect
 import numpy as np
 import numpy.typing as npt
 
 from OpenGL.GL import *
 
 from ..vmath import Vector2, Vector3
+from .wavefront import load_wavefront, stream_wavefront, compute_bounds, CHUNK_SIZE
+from .vertex_compression import encode_compact
+from .utils import Utils
 
 class VertexFormat:
+	# one 32 bit word per attribute, whatever the component count
+	_packed_types = (GL_INT_2_10_10_10_REV, GL_UNSIGNED_INT_2_10_10_10_REV, GL_UNSIGNED_INT_10F_11F_11F_REV)
+
 	def __init__(self):
 		self.fields = []
 
@@ -23,8 +29,14 @@ class VertexFormat:
 	def stride(self):
 		sum = 0
 		for size, _, type in self.fields:
-			sum += size * self._sizeofGLtype(type)
+			sum += self._field_bytes(size, type)
 		return sum
+
+	@classmethod
+	def _field_bytes(cls, size: int, type: GLenum):
+		if type in cls._packed_types:
+			return ctypes.sizeof(GLuint)
+		return size * cls._sizeofGLtype(type)
 	
 	@staticmethod
 	def _sizeofGLtype(type: GLenum):
@@ -55,7 +67,7 @@ class VertexFormat:
 			glEnableVertexArrayAttrib(vao, index)
 			glVertexArrayAttribBinding(vao, index, 0)
 			glVertexArrayAttribFormat(vao, index, size, type, GL_TRUE if normalized else GL_FALSE, offset)
-			offset += size * self._sizeofGLtype(type)
+			offset += self._field_bytes(size, type)
 			index += 1
 	
 	@staticmethod
@@ -67,21 +79,95 @@ class VertexFormat:
 
 
 class Buffer:
+	"""A GL buffer in one of three modes, given by its usage:
+
+	GL_STATIC_DRAW: immutable storage (glNamedBufferStorage) sized to the data. Updating
+		the whole buffer creates new storage under a new id, see update.
+	GL_DYNAMIC_DRAW, GL_STREAM_DRAW: mutable storage that grows geometrically. Whole buffer
+		updates orphan the old storage first, so they never wait for draws still reading it,
+		writes to part of the buffer keep the rest of its contents.
+	"""
+	_usages = (GL_STATIC_DRAW, GL_DYNAMIC_DRAW, GL_STREAM_DRAW)
+
 	def __init__(self, target: GLenum, usage: GLenum):
+		if usage not in self._usages:
+			raise ValueError('Buffer usage must be GL_STATIC_DRAW, GL_DYNAMIC_DRAW or GL_STREAM_DRAW')
 		self.target = target
 		self.usage = usage
 
 		self.id = GLuint()
 		glCreateBuffers(1, self.id)
 
-		self.data_length = 0
+		self.data_length = 0 # elements of the last update
+		self.capacity = 0 # allocated bytes
+		self.written = 0 # end of the written bytes since the storage was (re)specified
+		# immutable storage that can be written in place, see allocate
+		self._writable = False
 
-	def update(self, data: npt.NDArray, offset: int=0):
-		if self.data_length < data.size:
-			glNamedBufferData(self.id, data.size * data.itemsize, data, self.usage)
-			self.data_length = data.size
-		else:
-			glNamedBufferSubData(self.id, offset, data.size * data.itemsize, data)
+	@property
+	def static(self):
+		return self.usage == GL_STATIC_DRAW
+
+	def update(self, data: npt.NDArray, offset: int=0, orphan: bool=None):
+		"""Writes data at offset bytes. Returns True when the buffer got a new id (static
+		buffers replaced as a whole), anything referencing the old id must be updated.
+		orphan (dynamic and stream buffers) drops the old contents before writing, by
+		default only when data covers everything written so far.
+		"""
+		# sized in bytes, the element type may change between updates
+		nbytes = data.size * data.itemsize
+		self.data_length = data.size
+		if nbytes == 0:
+			return False
+
+		if self.static:
+			if self._writable:
+				if offset + nbytes > self.capacity:
+					raise ValueError('write past the end of the buffer storage')
+				glNamedBufferSubData(self.id, offset, nbytes, data)
+				return False
+			if offset != 0:
+				raise ValueError('static buffers are replaced as a whole, allocate them for partial writes')
+			return self._create_storage(nbytes, data, 0)
+
+		if orphan is None:
+			orphan = offset == 0 and nbytes >= self.written
+		if orphan:
+			if offset + nbytes > self.capacity:
+				self.capacity = max(offset + nbytes, self.capacity * 2)
+			# the driver hands out fresh memory while queued draws keep the old one
+			glNamedBufferData(self.id, self.capacity, None, self.usage)
+			self.written = 0
+		elif offset + nbytes > self.capacity:
+			raise ValueError('write past the end of the buffer storage')
+		glNamedBufferSubData(self.id, offset, nbytes, data)
+		self.written = max(self.written, offset + nbytes)
+		return False
+
+	def allocate(self, nbytes: int):
+		"""Reserves nbytes of uninitialized storage, the contents are written with update.
+		Static buffers get immutable storage that accepts in place writes.
+		Returns True when the buffer got a new id.
+		"""
+		self.data_length = 0
+		if self.static:
+			return self._create_storage(nbytes, None, GL_DYNAMIC_STORAGE_BIT)
+		glNamedBufferData(self.id, nbytes, None, self.usage)
+		self.capacity = nbytes
+		self.written = 0
+		return False
+
+	def _create_storage(self, nbytes: int, data, flags: GLbitfield):
+		# immutable storage can not be respecified, replace the buffer object
+		renamed = self.capacity > 0
+		if renamed:
+			glDeleteBuffers(1, self.id)
+			self.id = GLuint()
+			glCreateBuffers(1, self.id)
+		glNamedBufferStorage(self.id, nbytes, data, flags)
+		self.capacity = nbytes
+		self._writable = bool(flags & GL_DYNAMIC_STORAGE_BIT)
+		return renamed
 
 	def bind(self):
 		glBindBuffer(self.target, self.id)
@@ -112,192 +198,326 @@ class Vertex:
 
 
 class Mesh:
-	def __init__(self, format: VertexFormat):
+	_index_types = { 1: GL_UNSIGNED_BYTE, 2: GL_UNSIGNED_SHORT, 4: GL_UNSIGNED_INT }
+
+	def __init__(self, format: VertexFormat, usage: GLenum=GL_DYNAMIC_DRAW):
+		"""usage is the Buffer mode: GL_STATIC_DRAW for meshes uploaded once,
+		GL_DYNAMIC_DRAW for occasional updates, GL_STREAM_DRAW for per frame ones.
+		"""
 		self.format = format
 
-		self.vbo = Buffer(GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW)
-		self.ebo = Buffer(GL_ELEMENT_ARRAY_BUFFER, GL_DYNAMIC_DRAW)
+		self.vbo = Buffer(GL_ARRAY_BUFFER, usage)
+		self.ebo = Buffer(GL_ELEMENT_ARRAY_BUFFER, usage)
 		self.vao = GLuint()
 		glCreateVertexArrays(1, self.vao)
 
 		self.format.enable(self.vao)
 		glVertexArrayVertexBuffer(self.vao, 0, self.vbo.id, 0, self.format.stride)
 		glVertexArrayElementBuffer(self.vao, self.ebo.id)
+		self.index_type: GLenum = GL_UNSIGNED_INT
+		self.index_size = ctypes.sizeof(GLuint)
+
+		# CPU side copies for picking and bounds, None until vertices with a float3 position are uploaded
+		self.positions: npt.NDArray[np.float32] = None
+		self.indices: npt.NDArray[np.uint32] = None
+		self.aabb_min: Vector3 = None
+		self.aabb_max: Vector3 = None
+		self.bounding_center: Vector3 = None
+		self.bounding_radius: float = 0.0
+		# mesh_tools.CacheReport of an optimized import (see from_wavefront), else None
+		self.cache_report = None
 	
-	def update(self, vertices: npt.NDArray[np.float32], indices: npt.NDArray[np.uint32]):
-		self.vbo.update(vertices)
-		self.ebo.update(indices)
+	def update(self, vertices: npt.NDArray, indices: npt.NDArray, bounds: npt.NDArray[np.float32]=None):
+		"""Uploads the vertices and indices, indices may be uint8, uint16 or uint32.
+		Precomputed bounds (see wavefront.compute_bounds) skip the bounds pass, they are
+		the only source of bounds for vertices without a float3 position (see encode_compact).
+		Other integer indices are narrowed to uint32, see _index_array.
+		"""
+		indices = self._index_array(indices)
+		# the mesh is replaced as a whole, even by smaller data
+		if self.vbo.update(vertices, orphan=True):
+			glVertexArrayVertexBuffer(self.vao, 0, self.vbo.id, 0, self.format.stride)
+		if self.ebo.update(indices, orphan=True):
+			glVertexArrayElementBuffer(self.vao, self.ebo.id)
+		self.index_type = self._index_types[indices.dtype.itemsize]
+		self.index_size = indices.dtype.itemsize
+		self.indices = indices
+		self._update_bounds(vertices, bounds)
+
+	@staticmethod
+	def _index_array(indices: npt.NDArray) -> npt.NDArray:
+		"""indices as an uint8, uint16 or uint32 array. Other integer types (e.g. the int64
+		NumPy defaults to) are converted to uint32, raises ValueError for anything else.
+		"""
+		indices = np.asarray(indices)
+		if indices.dtype in (np.uint8, np.uint16, np.uint32):
+			return indices
+		if indices.dtype.kind not in 'iu':
+			raise ValueError(f'indices must be uint8, uint16 or uint32 (or integers that fit uint32), not {indices.dtype}')
+		if indices.size and (indices.min() < 0 or indices.max() > 0xFFFFFFFF):
+			raise ValueError(f'{indices.dtype} indices out of the uint32 range')
+		return indices.astype(np.uint32)
+
+	def _update_bounds(self, vertices: npt.NDArray, bounds: npt.NDArray[np.float32]=None):
+		self.positions = None
+		float_positions = self.format.fields and self.format.fields[0][0] == 3 and self.format.fields[0][2] == GL_FLOAT
+		if float_positions and self.format.stride % 4 == 0 and vertices.dtype == np.float32 and vertices.size:
+			self.positions = vertices.reshape((-1, self.format.stride // 4))[:, :3]
+			if bounds is None:
+				bounds = compute_bounds(self.positions)
+		if bounds is None:
+			return
+
+		self.aabb_min = Vector3(*bounds[0:3].tolist())
+		self.aabb_max = Vector3(*bounds[3:6].tolist())
+		self.bounding_center = Vector3(*bounds[6:9].tolist())
+		self.bounding_radius = float(bounds[9])
 
 	def draw(self, primitive: GLenum=GL_TRIANGLES, count: int=-1, offset: int=0):
 		count = self.ebo.data_length if count <= 0 else count
-		glBindVertexArray(self.vao)
-		glDrawElements(primitive, count, GL_UNSIGNED_INT, ctypes.c_void_p(offset * ctypes.sizeof(ctypes.c_uint)))
+		Utils.bind_vertex_array(self.vao)
+		glDrawElements(primitive, count, self.index_type, ctypes.c_void_p(offset * self.index_size))
 
 	@staticmethod
-	def from_wavefront(file_path: str):
-		lines = []
-		with open(file_path, 'r') as fp:
-			lines = fp.readlines()
-		
-		raw_meshes = []
-		raw_positions = {}
-		raw_normals = {}
-		raw_tex_coords = {}
-		raw_faces = {} # [(vi, ti, ni), ...]
-
-		tmp_last_position_id = 0
-		tmp_last_normal_id = 0
-		tmp_last_tex_coord_id = 0
-		last_position_id = 0
-		last_normal_id = 0
-		last_tex_coord_id = 0
-
-		current_mesh = 'mesh'
-		raw_meshes.append(current_mesh)
-
-		for line in lines:
-			line = line.strip()
-			tok = re.split(r'\s', line)
-
-			if not current_mesh in raw_positions:
-				raw_positions[current_mesh] = []
-				raw_normals[current_mesh] = []
-				raw_tex_coords[current_mesh] = []
-				raw_faces[current_mesh] = []
-
-			if tok[0] == 'v':
-				values = [float(v) for v in tok[1:]]
-				raw_positions[current_mesh].append(tuple(values))
-			elif tok[0] == 'vt':
-				values = [float(v) for v in tok[1:]]
-				raw_tex_coords[current_mesh].append(tuple(values))
-			elif tok[0] == 'vn':
-				values = [float(v) for v in tok[1:]]
-				raw_normals[current_mesh].append(tuple(values))
-			elif tok[0] == 'f':
-				face_defs = tok[1:]
-				
-				for fdef in face_defs:
-					fields = [int(v) if len(v) > 0 else None for v in fdef.split('/')]
-					
-					if len(fields) == 1: # pos pos pos ...
-						pos_id = fields[0]-1
-
-						raw_faces[current_mesh].append((pos_id-tmp_last_position_id, None, None))
-
-						tmp_last_position_id = max(tmp_last_position_id, pos_id)
-					elif len(fields) == 2: # pos/tex pos/tex pos/tex ...
-						pos_id = fields[0]-1
-						tex_id = fields[1]-1
-
-						raw_faces[current_mesh].append((pos_id-last_position_id, tex_id-last_tex_coord_id, None))
-
-						tmp_last_position_id = max(tmp_last_position_id, pos_id)
-						tmp_last_tex_coord_id = max(tmp_last_tex_coord_id, tex_id)
-					elif len(fields) == 3:
-						if fields[1] is None: # pos//norm pos//norm pos//norm ...
-							pos_id = fields[0]-1
-							norm_id = fields[2]-1
-							
-							raw_faces[current_mesh].append((pos_id-last_position_id, None, norm_id-last_normal_id))
-
-							tmp_last_position_id = max(tmp_last_position_id, pos_id)
-							tmp_last_normal_id = max(tmp_last_normal_id, norm_id)
-						else: # pos/tex/norm pos/tex/norm pos/tex/norm ...
-							pos_id = fields[0]-1
-							tex_id = fields[1]-1
-							norm_id = fields[2]-1
-
-							raw_faces[current_mesh].append((
-								pos_id-last_position_id,
-								tex_id-last_tex_coord_id,
-								norm_id-last_normal_id
-							))
-
-							tmp_last_position_id = max(tmp_last_position_id, pos_id)
-							tmp_last_tex_coord_id = max(tmp_last_tex_coord_id, tex_id)
-							tmp_last_normal_id = max(tmp_last_normal_id, norm_id)
-
-			elif tok[0] == 'o':
-				current_mesh = tok[1].strip()
-				raw_meshes.append(current_mesh)
-				last_position_id = tmp_last_position_id+1
-				last_tex_coord_id = tmp_last_tex_coord_id+1
-				last_normal_id = tmp_last_normal_id+1
-			else:
-				continue
-
-		def calculate_tangents(vertices: List[Vertex], i1: int, i2: int, i3: int):
-			v0 = vertices[i1].position
-			v1 = vertices[i2].position
-			v2 = vertices[i3].position
-
-			t0 = vertices[i1].tex_coords
-			t1 = vertices[i2].tex_coords
-			t2 = vertices[i3].tex_coords
-
-			e0 = v1 - v0
-			e1 = v2 - v0
-
-			dt1 = t1 - t0
-			dt2 = t2 - t0
-
-			dividend = dt1.x * dt2.y - dt1.y * dt2.x
-			f = 0.0 if abs(dividend) <= 1e-5 else 1.0 / dividend
-
-			tangent = Vector3(
-				x=(f * (dt2.y * e0.x - dt1.y * e1.x)),
-				y=(f * (dt2.y * e0.y - dt1.y * e1.y)),
-				z=(f * (dt2.y * e0.z - dt1.y * e1.z))
-			)
-
-			return tangent
-
-		def convert_mesh(raw_positions: list, raw_normals: list, raw_tex_coords: list, raw_faces: list):
-			vertices = []
-			indices = []
+	def from_wavefront(file_path: str, weld: bool=True, cache: bool=True, stream: bool=False, workers: int=1,
+			optimize: bool=False, compact: bool=False, pooled: bool=False):
+		"""Loads every object of an OBJ file, identical corners are shared unless weld is False.
+		With cache a binary copy is kept next to the file and memory mapped on later loads.
+		stream imports chunk by chunk instead (see stream_wavefront), without the cache.
+		workers > 1 (or None for all cores) converts the objects on a process pool, only the
+		uploads happen here. optimize reorders triangles and vertices for the GPU caches,
+		every mesh's cache_report then holds the ACMR and ATVR before and after.
+		compact uploads quantized vertices (see Mesh.from_object), no CPU positions are kept.
+		pooled suballocates the meshes in the shared GeometryPool of their format.
+		"""
+		if stream:
+			return dict(Mesh.stream_wavefront(file_path, weld, optimize=optimize, compact=compact, pooled=pooled))
 
-			vertex_data: List[Vertex] = []
-
-			i = 0
-			for v, vt, vn in raw_faces:
-				vert = Vertex()
-				vert.position = Vector3(*raw_positions[v])
-
-				if vn: vert.normal = Vector3(*raw_normals[vn])
-				if vt: vert.tex_coords = Vector2(*raw_tex_coords[vt])
+		meshes: Dict[str, Mesh] = {}
+		for obj in load_wavefront(file_path, weld, cache, workers, optimize):
+			meshes[obj.name] = Mesh.from_object(obj, compact, pooled)
 
-				indices.append(i)
-				i += 1
+		return meshes
 
-				vertex_data.append(vert)
+	@staticmethod
+	def from_object(obj, compact: bool=False, pooled: bool=False):
+		"""Uploads a wavefront.WavefrontObject. With compact the vertices are quantized by
+		encode_compact to about half the size, the format then depends on the mesh.
+		pooled places it in the shared GeometryPool of its format instead of own buffers.
+		"""
+		if compact:
+			fields, data, _ = encode_compact(obj.vertices, obj.bounds)
+			format, vertices = VertexFormat.from_list(fields), data.reshape(-1)
+		else:
+			format, vertices = Vertex.format, obj.vertices.reshape(-1)
 
-			# Calculate tangents
-			for i in range(0, len(indices), 3):
-				i1 = indices[i + 0]
-				i2 = indices[i + 1]
-				i3 = indices[i + 2]
-				vertex_data[i].tangent += calculate_tangents(vertex_data, i1, i2, i3)
+		if pooled:
+			mesh = GeometryPool.shared(format).allocate(vertices, obj.indices, obj.bounds)
+		else:
+			mesh = Mesh(format, GL_STATIC_DRAW)
+			mesh.update(vertices, obj.indices, obj.bounds)
+		mesh.cache_report = obj.cache_report
+		return mesh
 
-			# normalize tangents
-			for vert in vertex_data:
-				vert.tangent.normalize_self()
+	@staticmethod
+	def stream_wavefront(file_path: str, weld: bool=True, chunk_size: int=CHUNK_SIZE, optimize: bool=False,
+			compact: bool=False, pooled: bool=False):
+		"""Yields (name, Mesh) for every object of an OBJ or .obj.gz file as soon as it is read,
+		so memory stays bounded by the chunk size and the largest object, not the file.
+		"""
+		for obj in stream_wavefront(file_path, weld, chunk_size, optimize):
+			mesh = Mesh.from_object(obj, compact, pooled)
+			# keep just the positions, not the whole interleaved array
+			if mesh.positions is not None:
+				mesh.positions = np.ascontiguousarray(mesh.positions)
+			yield obj.name, mesh
+
+
+class RangeAllocator:
+	"""First fit free list allocator over [0, capacity), neighbouring free ranges merge."""
+
+	def __init__(self, capacity: int):
+		self.capacity = capacity
+		# sorted, non adjacent (offset, size) pairs
+		self._free: List[Tuple[int, int]] = [(0, capacity)] if capacity > 0 else []
 
-			raw_vertex_data = [ v.raw for v in vertex_data ]
-			vertices = [ item for sublist in raw_vertex_data for item in sublist ]
+	@property
+	def free_size(self):
+		return sum(size for _, size in self._free)
+
+	def allocate(self, size: int, alignment: int=1):
+		"""Returns the offset of size free units aligned to alignment, or None."""
+		for i, (offset, free) in enumerate(self._free):
+			start = (offset + alignment - 1) // alignment * alignment
+			if start + size > offset + free:
+				continue
 
-			mesh = Mesh(Vertex.format)
-			mesh.update(np.array(vertices, dtype=np.float32), np.array(indices, dtype=np.uint32))
+			pieces = []
+			if start > offset:
+				pieces.append((offset, start - offset))
+			if start + size < offset + free:
+				pieces.append((start + size, offset + free - start - size))
+			self._free[i:i + 1] = pieces
+			return start
+		return None
+
+	def free(self, offset: int, size: int):
+		if size <= 0:
+			return
+		i = bisect.bisect_left(self._free, (offset, size))
+		# merge with the previous and next free range when they touch
+		if i > 0 and sum(self._free[i - 1]) == offset:
+			i -= 1
+			offset, size = self._free[i][0], self._free[i][1] + size
+			del self._free[i]
+		if i < len(self._free) and offset + size == self._free[i][0]:
+			size += self._free[i][1]
+			del self._free[i]
+		self._free.insert(i, (offset, size))
+
+
+class _PoolPage:
+	def __init__(self, stride: int, vertex_capacity: int, index_capacity: int):
+		self.vbo = Buffer(GL_ARRAY_BUFFER, GL_STATIC_DRAW)
+		self.ebo = Buffer(GL_ELEMENT_ARRAY_BUFFER, GL_STATIC_DRAW)
+		self.vbo.allocate(vertex_capacity * stride)
+		self.ebo.allocate(index_capacity)
+		# vertices and index bytes
+		self.vertices = RangeAllocator(vertex_capacity)
+		self.indices = RangeAllocator(index_capacity)
+
+
+class GeometryPool:
+	"""Static geometry of many meshes suballocated in a few large buffers.
+
+	Every mesh is a range of a page: its vertices start at a base vertex, so its indices
+	stay local (and may stay 16 bit), and its indices at a byte offset. All pages share
+	one VAO, drawing pooled meshes of the same page back to back binds nothing.
+
+	Pages start small and every new page is twice the previous one, up to the max sizes,
+	so a pool costs about as much memory as the geometry in it. A mesh larger than that
+	gets a page of its own size. The class defaults apply to the shared pools.
+	"""
+	PAGE_VERTICES = 1 << 14
+	PAGE_INDEX_BYTES = 1 << 17
+	MAX_PAGE_VERTICES = 1 << 20
+	MAX_PAGE_INDEX_BYTES = 1 << 23
+
+	_shared: Dict[Tuple, 'GeometryPool'] = {}
+
+	def __init__(self, format: VertexFormat, page_vertices: int=None, page_index_bytes: int=None,
+			max_page_vertices: int=None, max_page_index_bytes: int=None):
+		self.format = format
+		# size of the next page
+		self.page_vertices = page_vertices or GeometryPool.PAGE_VERTICES
+		self.page_index_bytes = page_index_bytes or GeometryPool.PAGE_INDEX_BYTES
+		self.max_page_vertices = max_page_vertices or GeometryPool.MAX_PAGE_VERTICES
+		self.max_page_index_bytes = max_page_index_bytes or GeometryPool.MAX_PAGE_INDEX_BYTES
+		self.pages: List[_PoolPage] = []
 
-			return mesh
+		self.vao = GLuint()
+		glCreateVertexArrays(1, self.vao)
+		self.format.enable(self.vao)
+		self._page: _PoolPage = None
 
-		meshes: Dict[str, Mesh] = {}
-		for mesh in raw_meshes:
-			meshes[mesh] = convert_mesh(
-				raw_positions=raw_positions[mesh],
-				raw_normals=raw_normals[mesh] if mesh in raw_normals else [],
-				raw_tex_coords=raw_tex_coords[mesh] if mesh in raw_tex_coords else [],
-				raw_faces=raw_faces[mesh]
-			)
+	@staticmethod
+	def shared(format: VertexFormat):
+		"""The pool used by Mesh.from_object(pooled=True) for this format."""
+		key = tuple(format.fields)
+		if key not in GeometryPool._shared:
+			GeometryPool._shared[key] = GeometryPool(format)
+		return GeometryPool._shared[key]
+
+	def allocate(self, vertices: npt.NDArray, indices: npt.NDArray, bounds: npt.NDArray[np.float32]=None):
+		mesh = PooledMesh(self)
+		mesh.update(vertices, indices, bounds)
+		return mesh
+
+	def _reserve(self, vertex_count: int, index_bytes: int):
+		"""(page, base vertex, index byte offset) of a new range, pages are added as needed."""
+		for page in self.pages:
+			first = page.vertices.allocate(vertex_count)
+			if first is None:
+				continue
+			offset = page.indices.allocate(index_bytes, 4)
+			if offset is not None:
+				return page, first, offset
+			page.vertices.free(first, vertex_count)
+
+		# meshes larger than a page get a page of their own size
+		page = _PoolPage(self.format.stride, max(self.page_vertices, vertex_count), max(self.page_index_bytes, index_bytes))
+		self.pages.append(page)
+		self.page_vertices = min(self.page_vertices * 2, self.max_page_vertices)
+		self.page_index_bytes = min(self.page_index_bytes * 2, self.max_page_index_bytes)
+		return page, page.vertices.allocate(vertex_count), page.indices.allocate(index_bytes, 4)
+
+	def _release(self, page: _PoolPage, first: int, vertex_count: int, offset: int, index_bytes: int):
+		page.vertices.free(first, vertex_count)
+		page.indices.free(offset, index_bytes)
+
+	def bind(self, page: _PoolPage):
+		if self._page is not page:
+			glVertexArrayVertexBuffer(self.vao, 0, page.vbo.id, 0, self.format.stride)
+			glVertexArrayElementBuffer(self.vao, page.ebo.id)
+			self._page = page
+		Utils.bind_vertex_array(self.vao)
+
+
+class PooledMesh(Mesh):
+	"""A Mesh that is a range of a GeometryPool instead of owning buffers and a VAO."""
+
+	def __init__(self, pool: GeometryPool):
+		self.format = pool.format
+		self.pool = pool
+		self.page: _PoolPage = None
+		self.base_vertex = 0
+		self.vertex_count = 0
+		self.index_offset = 0 # bytes
+		self.index_count = 0
+		self.index_type: GLenum = GL_UNSIGNED_INT
+		self.index_size = ctypes.sizeof(GLuint)
+
+		self.positions: npt.NDArray[np.float32] = None
+		self.indices: npt.NDArray[np.uint32] = None
+		self.aabb_min: Vector3 = None
+		self.aabb_max: Vector3 = None
+		self.bounding_center: Vector3 = None
+		self.bounding_radius: float = 0.0
+		self.cache_report = None
+
+	def update(self, vertices: npt.NDArray, indices: npt.NDArray, bounds: npt.NDArray[np.float32]=None):
+		"""Moves the mesh to a range that fits the new data, see Mesh.update."""
+		indices = self._index_array(indices)
+		vertex_count = vertices.nbytes // self.format.stride
+		# uint8 indices are widened, index offsets are kept 4 byte aligned
+		if indices.dtype.itemsize == 1:
+			indices = indices.astype(np.uint16)
+		self.release()
+
+		self.page, self.base_vertex, self.index_offset = self.pool._reserve(vertex_count, indices.nbytes)
+		self.vertex_count = vertex_count
+		self.index_count = indices.size
+		self.page.vbo.update(vertices, self.base_vertex * self.format.stride)
+		self.page.ebo.update(indices, self.index_offset)
+
+		self.index_type = self._index_types[indices.dtype.itemsize]
+		self.index_size = indices.dtype.itemsize
+		self.indices = indices
+		self._update_bounds(vertices, bounds)
+
+	def release(self):
+		"""Returns the range to the pool, the mesh draws nothing until the next update."""
+		if self.page is not None:
+			self.pool._release(self.page, self.base_vertex, self.vertex_count, self.index_offset, self.index_count * self.index_size)
+			self.page = None
+			self.index_count = 0
 
-		return meshes
+	def draw(self, primitive: GLenum=GL_TRIANGLES, count: int=-1, offset: int=0):
+		if self.page is None:
+			return
+		count = self.index_count if count <= 0 else count
+		self.pool.bind(self.page)
+		glDrawElementsBaseVertex(
+			primitive, count, self.index_type,
+			ctypes.c_void_p(self.index_offset + offset * self.index_size), self.base_vertex
+		)
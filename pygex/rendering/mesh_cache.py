@@ -0,0 +1,136 @@
+"""Binary cache for imported meshes, stored next to the source file.
+
+Layout: the magic bytes, a little endian uint32 format version and header length, a
+JSON header, then the raw arrays each aligned to 16 bytes. The header records the
+source size, mtime and content hash, the import options and, per sub-object, its
+name, bounds, optimizer report and the byte ranges of its vertices and indices. Loading memory maps
+the file, so the arrays go to the GPU without a parse step or an extra copy.
+"""
+import os, json, struct, hashlib, tempfile
+
+import numpy as np
+
+from .mesh_tools import CacheReport
+
+__all__ = ['CACHE_VERSION', 'cache_path', 'read_cache', 'write_cache']
+
+MAGIC = b'PGXMESH\x00'
+CACHE_VERSION = 3
+EXTENSION = '.meshcache'
+_PREAMBLE = struct.Struct('<II')
+_ALIGNMENT = 16
+
+def cache_path(source: str):
+    return source + EXTENSION
+
+def _hash_file(path: str):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _align(offset: int):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def _read_header(path: str):
+    with open(path, 'rb') as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            return None
+        version, length = _PREAMBLE.unpack(fp.read(_PREAMBLE.size))
+        if version != CACHE_VERSION:
+            return None
+        header = json.loads(fp.read(length).decode('utf-8'))
+        header['data_start'] = _align(len(MAGIC) + _PREAMBLE.size + length)
+        return header
+
+def read_cache(source: str, options: dict):
+    """Returns [(name, vertices, indices, corner_count, bounds, cache_report)] with memory mapped arrays,
+    or None when there is no cache or it does not match the source file and options.
+    """
+    path = cache_path(source)
+    try:
+        header = _read_header(path)
+        stat = os.stat(source)
+    except (OSError, ValueError, struct.error):
+        return None
+    if header is None or header['options'] != options:
+        return None
+
+    key = header['source']
+    if key['size'] != stat.st_size:
+        return None
+    # a touched or checked out file keeps its cache as long as the contents match
+    if key['mtime_ns'] != stat.st_mtime_ns and key['hash'] != _hash_file(source):
+        return None
+
+    try:
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+    except (OSError, ValueError):
+        return None
+    objects = []
+    for entry in header['objects']:
+        arrays = []
+        for block in (entry['vertices'], entry['indices']):
+            dtype = np.dtype(block['dtype'])
+            count = int(np.prod(block['shape']))
+            start = header['data_start'] + block['offset']
+            end = start + count * dtype.itemsize
+            # a truncated or partly written file, re-import
+            if end > data.size:
+                return None
+            arrays.append(data[start:end].view(dtype).reshape(block['shape']))
+        report = entry['cache_report']
+        objects.append((
+            entry['name'], arrays[0], arrays[1], entry['corner_count'], np.array(entry['bounds'], dtype=np.float32),
+            None if report is None else CacheReport(*report)
+        ))
+    return objects
+
+def write_cache(source: str, options: dict, objects):
+    """Stores objects (with name, vertices, indices, corner_count, bounds and cache_report attributes).
+    Returns False when the cache can not be written, e.g. a read only asset folder.
+    """
+    try:
+        stat = os.stat(source)
+        header = {
+            'source': { 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': _hash_file(source) },
+            'options': options,
+            'objects': [],
+        }
+
+        # offsets are relative to the aligned end of the header
+        arrays = []
+        offset = 0
+        for obj in objects:
+            report = obj.cache_report
+            entry = {
+                'name': obj.name, 'corner_count': int(obj.corner_count), 'bounds': [float(v) for v in obj.bounds],
+                'cache_report': None if report is None else [report.acmr_before, report.atvr_before, report.acmr_after, report.atvr_after],
+            }
+            for key in ('vertices', 'indices'):
+                array = np.ascontiguousarray(getattr(obj, key))
+                entry[key] = { 'offset': offset, 'shape': list(array.shape), 'dtype': array.dtype.str }
+                arrays.append((offset, array))
+                offset = _align(offset + array.nbytes)
+            header['objects'].append(entry)
+        encoded = json.dumps(header).encode('utf-8')
+        data_start = _align(len(MAGIC) + _PREAMBLE.size + len(encoded))
+
+        folder = os.path.dirname(os.path.abspath(source))
+        fd, temp = tempfile.mkstemp(prefix='.meshcache-', dir=folder)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(MAGIC)
+                fp.write(_PREAMBLE.pack(CACHE_VERSION, len(encoded)))
+                fp.write(encoded)
+                for offset, array in arrays:
+                    fp.write(b'\0' * (data_start + offset - fp.tell()))
+                    fp.write(array.tobytes())
+            os.replace(temp, cache_path(source))
+        except BaseException:
+            os.unlink(temp)
+            raise
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,269 @@
+"""Vectorized helpers working on plain NumPy mesh arrays, usable for imported and
+procedurally generated meshes alike.
+"""
+import numpy as np
+
+__all__ = [
+    'generate_tangents', 'fill_tangents', 'CacheReport', 'vertex_cache_stats',
+    'optimize_vertex_cache', 'optimize_overdraw', 'optimize_vertex_fetch', 'optimize_mesh',
+]
+
+# post-transform cache size assumed by the optimizer, a FIFO of this many vertices
+CACHE_SIZE = 16
+
+def _normalize_rows(v: np.ndarray):
+    length = np.linalg.norm(v, axis=1)
+    ok = length > 1e-12
+    v[ok] /= length[ok, None]
+    return ok
+
+def _perpendicular(n: np.ndarray):
+    """Any unit vectors perpendicular to the rows of n."""
+    axis = np.zeros_like(n)
+    # cross with the axis n is least aligned with
+    axis[np.arange(len(n)), np.argmin(np.abs(n), axis=1)] = 1.0
+    p = np.cross(n, axis)
+    if not _normalize_rows(p).all():
+        p[np.linalg.norm(p, axis=1) <= 1e-12] = (1.0, 0.0, 0.0)
+    return p
+
+def generate_tangents(positions: np.ndarray, tex_coords: np.ndarray, normals: np.ndarray, indices: np.ndarray):
+    """Per vertex tangents and bitangents for an indexed triangle list.
+
+    Triangle tangents (from the position and uv edges) are summed on every vertex
+    they touch with np.add.at, so vertices shared by several triangles get a smooth
+    basis. The sums are then Gram-Schmidt orthogonalized against the normal. The
+    bitangent is cross(normal, tangent), flipped where the uvs are mirrored.
+
+    positions (n, 3), tex_coords (n, 2), normals (n, 3) and indices (m * 3) in,
+    tangents and bitangents (n, 3) float32 out.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape((-1, 3))
+    tex_coords = np.asarray(tex_coords, dtype=np.float64).reshape((-1, 2))
+    normals = np.asarray(normals, dtype=np.float64).reshape((-1, 3))
+    triangles = np.asarray(indices, dtype=np.int64).reshape((-1, 3))
+    count = len(positions)
+
+    p = positions[triangles]
+    t = tex_coords[triangles]
+    e1 = p[:, 1] - p[:, 0]
+    e2 = p[:, 2] - p[:, 0]
+    d1 = t[:, 1] - t[:, 0]
+    d2 = t[:, 2] - t[:, 0]
+
+    det = d1[:, 0] * d2[:, 1] - d2[:, 0] * d1[:, 1]
+    valid = np.abs(det) > 1e-12
+    r = np.where(valid, 1.0 / np.where(valid, det, 1.0), 0.0)[:, None]
+    face_tangents = (e1 * d2[:, 1, None] - e2 * d1[:, 1, None]) * r
+    face_bitangents = (e2 * d1[:, 0, None] - e1 * d2[:, 0, None]) * r
+
+    corners = triangles.ravel()
+    tangents = np.zeros((count, 3), dtype=np.float64)
+    bitangents = np.zeros((count, 3), dtype=np.float64)
+    np.add.at(tangents, corners, np.repeat(face_tangents, 3, axis=0))
+    np.add.at(bitangents, corners, np.repeat(face_bitangents, 3, axis=0))
+
+    # Gram-Schmidt: t' = normalize(t - n * dot(n, t))
+    n = normals.copy()
+    has_normal = _normalize_rows(n)
+    n_dot_t = np.einsum('ij,ij->i', n, tangents)
+    tangents -= n * n_dot_t[:, None]
+    ok = _normalize_rows(tangents)
+
+    # no usable uvs (or a tangent parallel to the normal): any vector in the tangent plane
+    missing = ~ok & has_normal
+    if missing.any():
+        tangents[missing] = _perpendicular(n[missing])
+    tangents[~ok & ~has_normal] = (1.0, 0.0, 0.0)
+
+    handedness = np.where(np.einsum('ij,ij->i', np.cross(n, tangents), bitangents) < 0.0, -1.0, 1.0)
+    out_bitangents = np.cross(n, tangents) * handedness[:, None]
+    # without a normal keep the accumulated direction
+    no_normal = ~has_normal
+    if no_normal.any():
+        fallback = bitangents[no_normal]
+        _normalize_rows(fallback)
+        out_bitangents[no_normal] = fallback
+
+    return tangents.astype(np.float32), out_bitangents.astype(np.float32)
+
+def fill_tangents(vertices: np.ndarray, indices: np.ndarray, stride: int=11,
+        position: int=0, normal: int=3, tex_coords: int=6, tangent: int=8):
+    """Writes tangents into an interleaved float32 vertex array in place. The defaults
+    match Vertex.format (position, normal, tex coords, tangent), offsets are in floats.
+    Returns the bitangents.
+    """
+    view = vertices.reshape((-1, stride))
+    tangents, bitangents = generate_tangents(
+        view[:, position:position + 3],
+        view[:, tex_coords:tex_coords + 2],
+        view[:, normal:normal + 3],
+        indices
+    )
+    view[:, tangent:tangent + 3] = tangents
+    return bitangents
+
+
+class CacheReport:
+    """ACMR (transformed vertices per triangle, 0.5 at best, 3 at worst) and ATVR
+    (transformed vertices per vertex, 1 at best) before and after optimize_mesh.
+    """
+
+    def __init__(self, acmr_before: float, atvr_before: float, acmr_after: float, atvr_after: float):
+        self.acmr_before = acmr_before
+        self.atvr_before = atvr_before
+        self.acmr_after = acmr_after
+        self.atvr_after = atvr_after
+
+    def __repr__(self):
+        return 'ACMR {:.3f} -> {:.3f}, ATVR {:.3f} -> {:.3f}'.format(
+            self.acmr_before, self.acmr_after, self.atvr_before, self.atvr_after
+        )
+
+
+def vertex_cache_stats(indices: np.ndarray, vertex_count: int=None, cache_size: int=CACHE_SIZE):
+    """Simulates a FIFO post-transform cache over a triangle list, returns (ACMR, ATVR)."""
+    indices = np.asarray(indices).ravel()
+    if not len(indices):
+        return 0.0, 0.0
+    if vertex_count is None:
+        vertex_count = int(indices.max()) + 1
+
+    # a vertex is cached while fewer than cache_size misses happened since it was loaded
+    loaded = [-cache_size] * vertex_count
+    misses = 0
+    for v in indices.tolist():
+        if misses - loaded[v] >= cache_size:
+            loaded[v] = misses
+            misses += 1
+    used = len(np.unique(indices))
+    return misses / (len(indices) // 3), misses / used
+
+def _adjacency(triangles: np.ndarray, vertex_count: int):
+    """CSR vertex to triangle adjacency: (offsets, triangle ids)."""
+    corners = triangles.ravel()
+    order = np.argsort(corners, kind='stable')
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(corners, minlength=vertex_count), out=offsets[1:])
+    return offsets, order // 3
+
+def optimize_vertex_cache(indices: np.ndarray, vertex_count: int=None, cache_size: int=CACHE_SIZE):
+    """Reorders triangles for the post-transform cache with Tipsify (Sander, Nehab and
+    Barczak 2007).
+
+    Returns (indices, clusters): the reordered triangle list and the first triangle of
+    every cluster. A cluster ends where the walk hits a dead end and jumps elsewhere,
+    the cache is cold at those points so clusters can be reordered freely
+    (see optimize_overdraw).
+    """
+    indices = np.asarray(indices)
+    triangles = indices.reshape((-1, 3))
+    if vertex_count is None:
+        vertex_count = int(indices.max()) + 1 if len(indices) else 0
+    offsets, adjacent = _adjacency(triangles, vertex_count)
+    offsets = offsets.tolist()
+    adjacent = adjacent.tolist()
+    corners = triangles.tolist()
+
+    live = np.bincount(triangles.ravel(), minlength=vertex_count).tolist()
+    stamp = [0] * vertex_count
+    emitted = [False] * len(corners)
+    dead_ends = []
+    order = []
+    clusters = [0]
+    time = cache_size + 1
+    cursor = 0
+    fan = 0 if vertex_count else -1
+
+    while fan >= 0:
+        candidates = []
+        for t in adjacent[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            order.append(t)
+            for v in corners[t]:
+                dead_ends.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - stamp[v] > cache_size:
+                    stamp[v] = time
+                    time += 1
+
+        # the candidate that is still in the cache after its remaining fan, oldest first
+        fan, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = time - stamp[v] if time - stamp[v] + 2 * live[v] <= cache_size else 0
+                if priority > best:
+                    fan, best = v, priority
+
+        if fan < 0:
+            # dead end: the most recent vertex with triangles left, else the next in input order
+            while dead_ends:
+                v = dead_ends.pop()
+                if live[v] > 0:
+                    fan = v
+                    break
+            else:
+                while cursor < vertex_count and live[cursor] <= 0:
+                    cursor += 1
+                fan = cursor if cursor < vertex_count else -1
+            if fan >= 0 and len(order) > clusters[-1]:
+                clusters.append(len(order))
+
+    order = np.array(order, dtype=np.int64)
+    return triangles[order].ravel().astype(indices.dtype), np.array(clusters, dtype=np.int64)
+
+def optimize_overdraw(positions: np.ndarray, indices: np.ndarray, clusters: np.ndarray):
+    """Sorts the clusters of optimize_vertex_cache so that the ones facing away from the
+    mesh center, which are likely to occlude the rest, draw first (Nehab, Barczak and
+    Sander's linear-speed approximation). Triangle order inside each cluster is kept.
+    """
+    triangles = np.asarray(indices).reshape((-1, 3))
+    if len(clusters) < 2:
+        return np.asarray(indices)
+    p = np.asarray(positions, dtype=np.float64).reshape((-1, 3))[triangles]
+    # area weighted normals and centroids
+    normals = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    areas = np.linalg.norm(normals, axis=1)
+    centroids = p.mean(axis=1)
+
+    total = max(areas.sum(), 1e-30)
+    center = (centroids * areas[:, None]).sum(axis=0) / total
+    cluster_normals = np.add.reduceat(normals, clusters, axis=0)
+    cluster_areas = np.maximum(np.add.reduceat(areas, clusters), 1e-30)
+    cluster_centroids = np.add.reduceat(centroids * areas[:, None], clusters, axis=0) / cluster_areas[:, None]
+    _normalize_rows(cluster_normals)
+
+    score = np.einsum('ij,ij->i', cluster_centroids - center, cluster_normals)
+    ranked = np.argsort(-score, kind='stable')
+    ends = np.append(clusters[1:], len(triangles))
+    order = np.concatenate([np.arange(clusters[c], ends[c]) for c in ranked])
+    return triangles[order].ravel()
+
+def optimize_vertex_fetch(vertices: np.ndarray, indices: np.ndarray):
+    """Renumbers vertices in order of first use so fetches walk the buffer linearly,
+    unreferenced vertices are dropped. Returns (vertices, indices).
+    """
+    indices = np.asarray(indices)
+    if not len(indices):
+        return vertices[:0], indices
+    used, first, inverse = np.unique(indices, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return vertices[used[order]], rank[inverse.ravel()].astype(indices.dtype)
+
+def optimize_mesh(vertices: np.ndarray, indices: np.ndarray, position: int=0, cache_size: int=CACHE_SIZE, overdraw: bool=True):
+    """Runs the vertex cache, overdraw and vertex fetch passes on an (n, stride) vertex
+    array whose positions start at column `position`. Returns (vertices, indices, CacheReport).
+    """
+    count = len(vertices)
+    before = vertex_cache_stats(indices, count, cache_size)
+    optimized, clusters = optimize_vertex_cache(indices, count, cache_size)
+    if overdraw:
+        optimized = optimize_overdraw(vertices[:, position:position + 3], optimized, clusters)
+    vertices, optimized = optimize_vertex_fetch(vertices, optimized)
+    after = vertex_cache_stats(optimized, len(vertices), cache_size)
+    return vertices, optimized, CacheReport(before[0], before[1], after[0], after[1])
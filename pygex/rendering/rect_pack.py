@@ -0,0 +1,109 @@
+"""Rectangle packing for texture atlases.
+
+SkylinePacker is the skyline bottom-left packer from Jylänki's "A Thousand Ways to
+Pack the Bin": the packed area is described by its top outline, a list of horizontal
+segments, and every rectangle goes where its top ends lowest. Rectangles can be
+inserted one at a time and are never moved, so an atlas can grow while in use.
+"""
+from typing import List, Optional, Tuple
+
+__all__ = ['SkylinePacker']
+
+
+class SkylinePacker:
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        # [x, y, width] segments of the outline, left to right, covering the whole width
+        self.skyline: List[List[int]] = [[0, 0, width]]
+        self.used_area = 0
+        self.count = 0
+
+    @property
+    def top(self):
+        """Height of the packed area."""
+        return max(y for _, y, _ in self.skyline)
+
+    @property
+    def occupancy(self):
+        """Fraction of the packed area (width x top) covered by rectangles."""
+        top = self.top
+        return self.used_area / (self.width * top) if top else 0.0
+
+    @property
+    def fill(self):
+        """Fraction of the whole bin covered by rectangles."""
+        return self.used_area / (self.width * self.height)
+
+    def _fit(self, index: int, w: int, h: int):
+        """y of a w x h rectangle whose left edge is at segment index, None if it does not fit."""
+        x = self.skyline[index][0]
+        if x + w > self.width:
+            return None
+        y = 0
+        remaining = w
+        while remaining > 0:
+            _, sy, sw = self.skyline[index]
+            y = max(y, sy)
+            if y + h > self.height:
+                return None
+            remaining -= sw
+            index += 1
+        return y
+
+    def insert(self, w: int, h: int) -> Optional[Tuple[int, int]]:
+        """Places a w x h rectangle, returns its (x, y) or None when the bin has no room."""
+        best = None
+        for i, (x, _, sw) in enumerate(self.skyline):
+            y = self._fit(i, w, h)
+            if y is None:
+                continue
+            # lowest top first, then the narrowest segment, which leaves the least gap
+            score = (y + h, sw)
+            if best is None or score < best[0]:
+                best = (score, i, x, y)
+        if best is None:
+            return None
+
+        _, i, x, y = best
+        self._raise(i, x, y + h, w)
+        self.used_area += w * h
+        self.count += 1
+        return x, y
+
+    def _raise(self, index: int, x: int, y: int, w: int):
+        """Puts a segment at height y over [x, x + w) starting at segment index."""
+        skyline = self.skyline
+        skyline.insert(index, [x, y, w])
+        end = x + w
+        i = index + 1
+        # cut the segments the new one covers
+        while i < len(skyline) and skyline[i][0] < end:
+            segment = skyline[i]
+            right = segment[0] + segment[2]
+            if right <= end:
+                del skyline[i]
+                continue
+            segment[2] = right - end
+            segment[0] = end
+            break
+        # merge neighbours of equal height
+        i = max(index - 1, 0)
+        while i < len(skyline) - 1:
+            if skyline[i][1] == skyline[i + 1][1]:
+                skyline[i][2] += skyline[i + 1][2]
+                del skyline[i + 1]
+            else:
+                i += 1
+
+    def state(self):
+        """JSON serializable state, see from_state."""
+        return { 'width': self.width, 'height': self.height, 'skyline': self.skyline, 'used_area': self.used_area, 'count': self.count }
+
+    @staticmethod
+    def from_state(state: dict):
+        packer = SkylinePacker(state['width'], state['height'])
+        packer.skyline = [list(segment) for segment in state['skyline']]
+        packer.used_area = state['used_area']
+        packer.count = state['count']
+        return packer
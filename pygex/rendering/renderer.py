@@ -1,12 +1,13 @@
 from typing import List
 
 from .geometry import Mesh
-from ..vmath import Matrix4, Transform, Vector4, Vector3
+from ..vmath import Matrix4, Transform, Vector4, Vector3, Frustum
 from ..rendering import Shader
 
 from OpenGL.GL import GLenum, GL_TRIANGLES
 
 import math
+import numpy as np
 
 class Material:
     def on_apply(self, shader: Shader):
@@ -82,15 +83,68 @@ class Renderer:
         self.view_width = view_width
         self.view_height = view_height
 
+        self.frustum_culling = True
+        self.frustum = Frustum()
+        self.visible_count = 0
+        self.culled_count = 0
+        self._visible_models: List[Model] = []
+        self._view_projection = Matrix4()
+
+    @property
+    def visible_models(self):
+        return self._visible_models
+
     def submit(self, model: Model):
         self._models.append(model)
 
     def submit_light(self, light: Light):
         self._lights.append(light)
 
+    def cull(self):
+        """Tests the bounding spheres of all submitted models against the camera frustum
+        in one batch, fills visible_models and the visible/culled counters.
+        Models whose mesh has no bounds are always kept.
+        """
+        models = self._models
+        if not self.frustum_culling or not models:
+            self._visible_models = list(models)
+            self.visible_count = len(models)
+            self.culled_count = 0
+            return self._visible_models
+
+        Matrix4.mul_into(self.projection_matrix, self.view_matrix.inverse(), self._view_projection)
+        self.frustum = Frustum.from_matrix(self._view_projection)
+
+        count = len(models)
+        centers = np.zeros((count, 4), dtype=np.float32)
+        centers[:, 3] = 1.0
+        radii = np.zeros(count, dtype=np.float32)
+        bounded = np.zeros(count, dtype=bool)
+        for i, model in enumerate(models):
+            center = model.mesh.bounding_center
+            if center is not None:
+                centers[i, 0] = center.x
+                centers[i, 1] = center.y
+                centers[i, 2] = center.z
+                radii[i] = model.mesh.bounding_radius
+                bounded[i] = True
+
+        # column major storage: world = p @ M
+        matrices = np.stack([model.transform.buffer for model in models]).reshape((count, 4, 4))
+        world_centers = np.einsum('ni,nij->nj', centers, matrices)[:, :3]
+        scales = np.sqrt(np.max(np.sum(matrices[:, :3, :3] ** 2, axis=2), axis=1))
+
+        visible = self.frustum.cull_spheres(world_centers, radii * scales) | ~bounded
+
+        self._visible_models = [model for model, keep in zip(models, visible) if keep]
+        self.visible_count = len(self._visible_models)
+        self.culled_count = count - self.visible_count
+        return self._visible_models
+
     def flush(self):
         self._models = []
         self._lights = []
+        self._visible_models = []
 
     def render(self):
         pass
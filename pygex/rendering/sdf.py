@@ -0,0 +1,133 @@
+"""Signed distance fields on the CPU.
+
+The distance transform is the exact linear time algorithm of Felzenszwalb and
+Huttenlocher ("Distance Transforms of Sampled Functions"): a 1D lower envelope of
+parabolas along every column and then every row. The 1D pass runs on all lines of
+the image at once, so the Python loop is over one axis only.
+"""
+from typing import List
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import numpy.typing as npt
+
+__all__ = ['distance_transform', 'signed_distance_field', 'signed_distance_fields']
+
+# "no feature here", large but finite so the envelope arithmetic stays finite
+_FAR = 1e20
+
+def _envelope_rows(f: npt.NDArray[np.float64]):
+    """1D squared distance transform along the last axis of f, for every row at once."""
+    rows, n = f.shape
+    if n == 1:
+        return f.copy()
+    # flat indexing, the (row, k) element of an (rows, width) array is row * width + k
+    fv = f.ravel()
+    f_base = np.arange(rows) * n
+    z_base = np.arange(rows) * (n + 1)
+    q2 = np.arange(n, dtype=np.float64) ** 2
+    # parabola vertices and the boundaries between them, per row
+    v = np.zeros(rows * n, dtype=np.int64)
+    z = np.empty((rows, n + 1), dtype=np.float64)
+    z[:, 0] = -np.inf
+    z[:, 1] = np.inf
+    z = z.ravel()
+    k = np.zeros(rows, dtype=np.int64)
+
+    for q in range(1, n):
+        fq = f[:, q] + q2[q]
+        vk = v[f_base + k]
+        s = (fq - (fv[f_base + vk] + q2[vk])) / (2.0 * (q - vk))
+        drop = s <= z[z_base + k]
+        while drop.any():
+            # the new parabola hides the last one of these rows
+            k[drop] -= 1
+            vk = v[f_base + k]
+            s = np.where(drop, (fq - (fv[f_base + vk] + q2[vk])) / (2.0 * (q - vk)), s)
+            drop &= s <= z[z_base + k]
+        k += 1
+        v[f_base + k] = q
+        z[z_base + k] = s
+        z[z_base + k + 1] = np.inf
+
+    d = np.empty_like(f)
+    k[:] = 0
+    for q in range(n):
+        step = z[z_base + k + 1] < q
+        while step.any():
+            k += step
+            step &= z[z_base + k + 1] < q
+        vk = v[f_base + k]
+        d[:, q] = (q - vk) ** 2 + fv[f_base + vk]
+    return d
+
+def _column_distances(features: npt.NDArray[np.bool_]):
+    """Squared distance to the nearest feature in the same column, the first pass of the
+    transform. For a mask it is the distance to the closest feature above or below.
+    """
+    h = features.shape[-2]
+    y = np.arange(h).reshape((h, 1))
+    big = 2 * h + 1
+    above = np.maximum.accumulate(np.where(features, y, -big), axis=-2)
+    below = np.flip(np.minimum.accumulate(np.flip(np.where(features, y, 2 * big), axis=-2), axis=-2), axis=-2)
+    d = np.minimum(y - above, below - y).astype(np.float64)
+    return np.where(d > h, _FAR, d * d)
+
+def _squared_distances(features: npt.NDArray[np.bool_]):
+    """Squared distance transform of a (batch, height, width) stack of masks."""
+    batch, h, w = features.shape
+    d = _column_distances(features)
+    return _envelope_rows(d.reshape((batch * h, w))).reshape((batch, h, w))
+
+def distance_transform(features: npt.NDArray[np.bool_]):
+    """Exact Euclidean distance from every pixel to the nearest True pixel of a 2D mask.
+    Pixels are far away (about 1e10) when the mask has no True pixel.
+    """
+    return np.sqrt(_squared_distances(np.asarray(features, dtype=bool)[None])[0])
+
+def _signed_distance_batch(bitmaps: List[npt.NDArray[np.uint8]], spread: float):
+    """signed_distance_field of several bitmaps with one envelope pass. Rows are padded
+    with featureless columns to a common width, which does not change their distances.
+    """
+    width = max(bitmap.shape[1] for bitmap in bitmaps)
+    rows = []
+    for bitmap in bitmaps:
+        inside = np.asarray(bitmap) > 127
+        # both signs: distance to the outside (for inside pixels) and to the inside
+        for features in (~inside, inside):
+            d = np.full((inside.shape[0], width), _FAR)
+            d[:, :inside.shape[1]] = _column_distances(features)
+            rows.append(d)
+    distances = np.sqrt(_envelope_rows(np.concatenate(rows)))
+
+    fields = []
+    start = 0
+    for bitmap in bitmaps:
+        h, w = bitmap.shape
+        inside = np.asarray(bitmap) > 127
+        to_outside = distances[start:start + h, :w]
+        to_inside = distances[start + h:start + 2 * h, :w]
+        start += 2 * h
+        distance = np.clip(np.where(inside, to_outside, -to_inside), -spread, spread)
+        fields.append(np.rint((distance / spread * 0.5 + 0.5) * 255.0).astype(np.uint8))
+    return fields
+
+def signed_distance_field(bitmap: npt.NDArray[np.uint8], spread: float):
+    """8 bit SDF of a coverage bitmap, 128 is the edge and distances saturate at spread
+    pixels, matching the compute shader Font used: inside pixels (> 127) store their
+    distance to the nearest outside pixel, outside pixels the negated distance to the
+    nearest inside one.
+    """
+    return _signed_distance_batch([bitmap], spread)[0]
+
+def signed_distance_fields(bitmaps: List[npt.NDArray[np.uint8]], spread: float, workers: int=None, batch: int=64):
+    """signed_distance_field of many bitmaps (glyph tiles). They are transformed batch at
+    a time on a thread pool, NumPy drops the GIL in the array work so batches overlap.
+    """
+    batches = [bitmaps[i:i + batch] for i in range(0, len(bitmaps), batch)]
+    if len(batches) < 2 or workers == 1:
+        results = [_signed_distance_batch(part, spread) for part in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda part: _signed_distance_batch(part, spread), batches))
+    return [field for part in results for field in part]
@@ -4,7 +4,7 @@ import OpenGL.GL
 from OpenGL.GL import *
 from OpenGL.GL.shaders import compileShader, compileProgram
 
-from pygex.vmath import Vector2, Vector3, Vector4, Matrix4
+from pygex.vmath import Vector2, Vector3, Vector4, Matrix4, Matrix4Array
 
 class Shader:
 	def __init__(self):
@@ -30,6 +30,7 @@ class Shader:
 	
 	def link(self):
 		self.program = compileProgram(*self._shaders, validate=False)
+		self._uniforms = {}
 		self._linked = True
 	
 	def discard(self):
@@ -39,14 +40,13 @@ class Shader:
 		glUseProgram(self.program)
 	
 	def get_uniform_location(self, name: str):
-		loc = glGetUniformLocation(self.program, name)
-		if loc != -1:
+		loc = self._uniforms.get(name)
+		if loc is None:
+			loc = glGetUniformLocation(self.program, name)
 			self._uniforms[name] = loc
-		else:
-			return None
-		return self._uniforms[name]
+		return loc if loc != -1 else None
 
-	def set_uniform_vector(self, name: str, v: Vector2 | Vector3 | Vector4 | Matrix4):
+	def set_uniform_vector(self, name: str, v: Vector2 | Vector3 | Vector4 | Matrix4 | Matrix4Array):
 		loc = self.get_uniform_location(name)
 		if loc is None: return
 
@@ -57,7 +57,9 @@ class Shader:
 		elif isinstance(v, Vector4):
 			glUniform4f(loc, v.x, v.y, v.z, v.w)
 		elif isinstance(v, Matrix4):
-			glUniformMatrix4fv(loc, 1, False, v.raw)
+			glUniformMatrix4fv(loc, 1, False, v.buffer)
+		elif isinstance(v, Matrix4Array):
+			glUniformMatrix4fv(loc, len(v), False, v.buffer)
 		else:
 			return
 
@@ -90,6 +90,24 @@ class Texture2D(Texture):
 
         return tex
 
+class Texture2DArray(Texture):
+    def __init__(self, width: int, height: int, layers: int, internalFormat: GLenum):
+        super().__init__(3, GL_TEXTURE_2D_ARRAY, internalFormat)
+        self.size[0] = width
+        self.size[1] = height
+        self.size[2] = layers
+        self.setup()
+
+    def setup(self):
+        glTextureStorage3D(self.id, 1, self.internalFormat, self.size[0], self.size[1], self.size[2])
+
+    def update(self, data: npt.NDArray, format: GLenum, type: GLenum):
+        """Updates every layer, data is (layers, height, width[, channels])."""
+        glTextureSubImage3D(self.id, 0, 0, 0, 0, self.size[0], self.size[1], self.size[2], format, type, data)
+
+    def update_subregion(self, data: npt.NDArray, x: int, y: int, layer: int, width: int, height: int, format: GLenum, type: GLenum):
+        glTextureSubImage3D(self.id, 0, x, y, layer, width, height, 1, format, type, data)
+
 class TextureCubeMap(Texture):
     POSITIVE_X = 0
     NEGATIVE_X = 1
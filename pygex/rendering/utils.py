@@ -118,6 +118,21 @@ class Utils:
     enabled_gl_state: List[GLenum] = []
     disabled_gl_state: List[GLenum] = []
     dummmy_vao: GLuint = None
+    bound_vao: int = -1
+
+    @staticmethod
+    def bind_vertex_array(vao: GLuint | int):
+        """Binds vao unless it is bound already. VAOs bound with glBindVertexArray directly
+        must be followed by reset_vertex_array, or the next bind may be skipped.
+        """
+        value = vao.value if isinstance(vao, GLuint) else int(vao)
+        if Utils.bound_vao != value:
+            glBindVertexArray(value)
+            Utils.bound_vao = value
+
+    @staticmethod
+    def reset_vertex_array():
+        Utils.bound_vao = -1
 
     @staticmethod
     def get_dummy_vao():
@@ -135,7 +150,7 @@ class Utils:
             shd.link()
             Utils.cube_shader = shd
 
-        glBindVertexArray(Utils.get_dummy_vao())
+        Utils.bind_vertex_array(Utils.get_dummy_vao())
         Utils.cube_shader.use()
 
         texture.bind(0)
@@ -154,7 +169,7 @@ class Utils:
             shd.link()
             Utils.quad_shader = shd
 
-        glBindVertexArray(Utils.get_dummy_vao())
+        Utils.bind_vertex_array(Utils.get_dummy_vao())
 
         Utils.quad_shader.use()
         texture.bind(0)
@@ -0,0 +1,171 @@
+"""Quantized vertex layouts for Vertex.format data.
+
+encode_compact turns the 11 float (44 byte) position, normal, tex coord, tangent
+vertices into packed ones that existing shaders read unchanged:
+
+    position    half float x4 (w = 1) when the bounds allow it, else float x3
+    normal      GL_INT_2_10_10_10_REV, normalized
+    tex coords  normalized uint16 x2 when they stay in [0, 1], else half or float x2
+    tangent     GL_INT_2_10_10_10_REV, normalized
+
+Nothing here needs a GL context, only the enums.
+"""
+import numpy as np
+
+from OpenGL.GL import GL_FLOAT, GL_HALF_FLOAT, GL_UNSIGNED_SHORT, GL_INT_2_10_10_10_REV
+
+__all__ = [
+    'pack_snorm_2_10_10_10', 'unpack_snorm_2_10_10_10', 'quantize_unorm16',
+    'half_float_error', 'CompactReport', 'encode_compact',
+]
+
+# position error allowed for half floats, relative to the bounding radius
+POSITION_TOLERANCE = 1.0 / 1024.0
+# tex coord error allowed for half floats, half a texel of a 1024 texture
+TEX_COORD_TOLERANCE = 1.0 / 2048.0
+
+def pack_snorm_2_10_10_10(vectors: np.ndarray):
+    """Packs (n, 3) or (n, 4) values in [-1, 1] into uint32 GL_INT_2_10_10_10_REV words,
+    x in the low bits. A missing w is 0.
+    """
+    vectors = np.clip(np.asarray(vectors, dtype=np.float64), -1.0, 1.0)
+    xyz = np.rint(vectors[:, :3] * 511.0).astype(np.int64) & 0x3FF
+    w = np.rint(vectors[:, 3]).astype(np.int64) & 0x3 if vectors.shape[1] > 3 else 0
+    return (xyz[:, 0] | (xyz[:, 1] << 10) | (xyz[:, 2] << 20) | (w << 30)).astype(np.uint32)
+
+def unpack_snorm_2_10_10_10(words: np.ndarray):
+    """Decodes packed words to (n, 4) float32 the way GL 4.2+ does, max(c / 511, -1)."""
+    words = np.asarray(words, dtype=np.int64)
+    out = np.empty((len(words), 4), dtype=np.float32)
+    for i, (shift, bits) in enumerate(((0, 10), (10, 10), (20, 10), (30, 2))):
+        c = (words >> shift) & ((1 << bits) - 1)
+        c = np.where(c >= 1 << (bits - 1), c - (1 << bits), c)
+        out[:, i] = np.maximum(c / float((1 << (bits - 1)) - 1), -1.0)
+    return out
+
+def quantize_unorm16(values: np.ndarray):
+    return np.rint(np.clip(values, 0.0, 1.0) * 65535.0).astype(np.uint16)
+
+def half_float_error(max_abs: float):
+    """Worst rounding error of half floats for magnitudes up to max_abs (11 bit mantissa)."""
+    if max_abs >= 65504.0:
+        return float('inf')
+    if max_abs < 2.0 ** -14:
+        return 2.0 ** -25
+    return 2.0 ** (np.floor(np.log2(max_abs)) - 11)
+
+def _angle_error(a: np.ndarray, b: np.ndarray):
+    """Largest angle in degrees between the rows of a and b, zero rows are skipped."""
+    la = np.linalg.norm(a, axis=1)
+    lb = np.linalg.norm(b, axis=1)
+    ok = (la > 1e-6) & (lb > 1e-6)
+    if not ok.any():
+        return 0.0
+    cos = np.einsum('ij,ij->i', a[ok], b[ok]) / (la[ok] * lb[ok])
+    return float(np.degrees(np.arccos(np.clip(cos, -1.0, 1.0))).max())
+
+
+class CompactReport:
+    """Sizes and the measured worst case error of an encode_compact result."""
+
+    def __init__(self, stride_before: int, stride_after: int, position_error: float, normal_error: float,
+            tangent_error: float, tex_coord_error: float, layout: list):
+        self.stride_before = stride_before
+        self.stride_after = stride_after
+        self.position_error = position_error
+        self.normal_error = normal_error
+        self.tangent_error = tangent_error
+        self.tex_coord_error = tex_coord_error
+        self.layout = layout
+
+    @property
+    def ratio(self):
+        return self.stride_after / self.stride_before
+
+    def __repr__(self):
+        return '{} -> {} bytes/vertex ({}), max error: position {:.3g}, normal {:.3g} deg, tangent {:.3g} deg, uv {:.3g}'.format(
+            self.stride_before, self.stride_after, ', '.join(self.layout), self.position_error,
+            self.normal_error, self.tangent_error, self.tex_coord_error
+        )
+
+
+def encode_compact(vertices: np.ndarray, bounds: np.ndarray=None, position_tolerance: float=POSITION_TOLERANCE,
+        tex_coord_tolerance: float=TEX_COORD_TOLERANCE):
+    """Quantizes (n, 11) Vertex.format float32 vertices.
+
+    Half float positions are used when their worst rounding error, which depends on the
+    largest coordinate in bounds (see wavefront.compute_bounds), stays under
+    position_tolerance times the bounding radius. Tex coords outside [0, 1] (tiling)
+    fall back to half floats, or floats when those would lose more than tex_coord_tolerance.
+
+    Returns (fields, data, report): VertexFormat.from_list fields in Vertex.format
+    attribute order, the interleaved (n, stride) uint8 data and a CompactReport.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32).reshape((-1, 11))
+    positions, normals = vertices[:, 0:3], vertices[:, 3:6]
+    tex_coords, tangents = vertices[:, 6:8], vertices[:, 8:11]
+    if bounds is None:
+        lo, hi = positions.min(axis=0, initial=0.0), positions.max(axis=0, initial=0.0)
+        radius = float(np.linalg.norm(hi - lo)) * 0.5
+    else:
+        lo, hi, radius = bounds[0:3], bounds[3:6], float(bounds[9])
+
+    fields, dtype, layout = [], [], []
+    # positions
+    max_abs = float(max(np.abs(lo).max(), np.abs(hi).max()))
+    half_positions = half_float_error(max_abs) <= position_tolerance * max(radius, 1e-30)
+    if half_positions:
+        fields.append((4, False, GL_HALF_FLOAT))
+        dtype.append(('position', np.float16, 4))
+        layout.append('position half4')
+    else:
+        fields.append((3, False, GL_FLOAT))
+        dtype.append(('position', np.float32, 3))
+        layout.append('position float3')
+    fields.append((4, True, GL_INT_2_10_10_10_REV))
+    dtype.append(('normal', np.uint32))
+    layout.append('normal 2_10_10_10')
+    # tex coords
+    if len(tex_coords) == 0 or (tex_coords.min() >= 0.0 and tex_coords.max() <= 1.0):
+        uv_kind = 'unorm16'
+        fields.append((2, True, GL_UNSIGNED_SHORT))
+        dtype.append(('tex_coords', np.uint16, 2))
+    elif half_float_error(float(np.abs(tex_coords).max())) <= tex_coord_tolerance:
+        uv_kind = 'half'
+        fields.append((2, False, GL_HALF_FLOAT))
+        dtype.append(('tex_coords', np.float16, 2))
+    else:
+        uv_kind = 'float'
+        fields.append((2, False, GL_FLOAT))
+        dtype.append(('tex_coords', np.float32, 2))
+    layout.append('tex coords ' + uv_kind)
+    fields.append((4, True, GL_INT_2_10_10_10_REV))
+    dtype.append(('tangent', np.uint32))
+    layout.append('tangent 2_10_10_10')
+
+    packed = np.zeros(len(vertices), dtype=np.dtype(dtype))
+    if half_positions:
+        packed['position'][:, :3] = positions
+        packed['position'][:, 3] = 1.0
+        decoded_positions = packed['position'][:, :3].astype(np.float32)
+    else:
+        packed['position'] = positions
+        decoded_positions = positions
+    packed['normal'] = pack_snorm_2_10_10_10(normals)
+    packed['tangent'] = pack_snorm_2_10_10_10(tangents)
+    if uv_kind == 'unorm16':
+        packed['tex_coords'] = quantize_unorm16(tex_coords)
+        decoded_uvs = packed['tex_coords'] / np.float32(65535.0)
+    else:
+        packed['tex_coords'] = tex_coords
+        decoded_uvs = packed['tex_coords'].astype(np.float32)
+
+    report = CompactReport(
+        vertices.shape[1] * 4, packed.dtype.itemsize,
+        float(np.abs(decoded_positions - positions).max(initial=0.0)),
+        _angle_error(normals, unpack_snorm_2_10_10_10(packed['normal'])[:, :3]),
+        _angle_error(tangents, unpack_snorm_2_10_10_10(packed['tangent'])[:, :3]),
+        float(np.abs(decoded_uvs - tex_coords).max(initial=0.0)),
+        layout
+    )
+    return fields, packed.view(np.uint8).reshape((len(vertices), packed.dtype.itemsize)), report
@@ -0,0 +1,536 @@
+"""Wavefront OBJ import into NumPy arrays.
+
+Records are sorted by type in one pass over the lines and converted in bulk, so no
+Python object is created per vertex. Nothing here touches OpenGL, Mesh.from_wavefront
+uploads the result.
+"""
+import os, re, gzip
+from typing import List
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from . import mesh_cache
+from .mesh_tools import CacheReport, fill_tangents, optimize_mesh
+
+__all__ = [
+    'WavefrontData', 'WavefrontObject', 'parse_wavefront', 'weld_corners', 'index_dtype',
+    'compute_bounds', 'build_object', 'load_wavefront', 'stream_wavefront',
+    'load_wavefront_parallel',
+]
+
+# position (3), normal (3), tex coords (2), tangent (3), matches Vertex.format
+VERTEX_SIZE = 11
+# characters read per step by stream_wavefront
+CHUNK_SIZE = 1 << 22
+
+class WavefrontData:
+    """Raw OBJ contents. Attribute arrays are shared by all objects, `objects` holds
+    (name, corners) where corners is an (n, 3) array of 0 based (position, tex coord,
+    normal) indices, three per triangle, -1 when the face has no such attribute.
+    """
+
+    def __init__(self, positions: np.ndarray, tex_coords: np.ndarray, normals: np.ndarray, objects: list):
+        self.positions = positions
+        self.tex_coords = tex_coords
+        self.normals = normals
+        self.objects = objects
+
+
+class WavefrontObject:
+    """Interleaved Vertex.format vertices and triangle indices of one object.
+    corner_count is the number of face corners, the vertex count before welding.
+    cache_report is the mesh_tools.CacheReport of an optimized import, else None.
+    """
+
+    def __init__(self, name: str, vertices: np.ndarray, indices: np.ndarray, corner_count: int=None, bounds: np.ndarray=None,
+            cache_report: CacheReport=None):
+        self.name = name
+        self.vertices = vertices
+        self.indices = indices
+        self.corner_count = len(vertices) if corner_count is None else corner_count
+        # see compute_bounds
+        self.bounds = compute_bounds(vertices[:, 0:3]) if bounds is None else bounds
+        self.cache_report = cache_report
+
+    @property
+    def vertex_count(self):
+        return len(self.vertices)
+
+    @property
+    def nbytes(self):
+        return self.vertices.nbytes + self.indices.nbytes
+
+    @property
+    def unwelded_nbytes(self):
+        # one float32 vertex and one uint32 index per corner
+        return self.corner_count * (VERTEX_SIZE * 4 + 4)
+
+    def report(self):
+        text = '{}: {} -> {} vertices, {} -> {} bytes ({} indices)'.format(
+            self.name, self.corner_count, self.vertex_count,
+            self.unwelded_nbytes, self.nbytes, self.indices.dtype.name
+        )
+        if self.cache_report is not None:
+            text += ', ' + repr(self.cache_report)
+        return text
+
+
+class _GrowableArray:
+    """Row array with amortized O(1) appends, for attributes read chunk by chunk."""
+
+    def __init__(self, width: int, dtype=np.float32):
+        self._data = np.zeros((0, width), dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, rows: np.ndarray):
+        end = self._size + len(rows)
+        if end > len(self._data):
+            grown = np.zeros((max(end, len(self._data) * 2, 1024), self._data.shape[1]), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:end] = rows
+        self._size = end
+
+    def view(self):
+        return self._data[:self._size]
+
+
+def compute_bounds(positions: np.ndarray):
+    """AABB and bounding sphere of (n, 3) positions packed as
+    [min x, y, z, max x, y, z, center x, y, z, radius] float32.
+    """
+    bounds = np.zeros(10, dtype=np.float32)
+    if len(positions):
+        lo = positions.min(axis=0)
+        hi = positions.max(axis=0)
+        center = (lo + hi) * 0.5
+        bounds[0:3] = lo
+        bounds[3:6] = hi
+        bounds[6:9] = center
+        bounds[9] = np.sqrt(np.max(np.sum((positions - center) ** 2, axis=1)))
+    return bounds
+
+def _parse_floats(records: List[str], width: int):
+    """Converts the values of 'v 1 2 3' style records (the text after the keyword) to an
+    (n, width) array, extra components are dropped and missing ones are 0.
+    """
+    if not records:
+        return np.zeros((0, width), dtype=np.float32)
+    counts = np.fromiter(map(len, map(str.split, records)), dtype=np.int64, count=len(records))
+    if (counts == width).all():
+        return np.array(' '.join(records).split(), dtype=np.float32).reshape((-1, width))
+    # mixed component counts (v x y z w, vt u, vertex colors...), fill row by row
+    out = np.zeros((len(records), width), dtype=np.float32)
+    for i, record in enumerate(records):
+        row = record.split()[:width]
+        out[i, :len(row)] = np.array(row, dtype=np.float32)
+    return out
+
+def _parse_corners(corners: List[str]):
+    """Converts face corner tokens ('v', 'v/t', 'v//n', 'v/t/n') to an (n, 3) array of
+    1 based indices, 0 where the attribute is missing.
+    """
+    first = corners[0]
+    slashes = first.count('/')
+    doubles = first.count('//')
+    layout = {0: (0,), 1: (0, 1), 2: (0, 2) if doubles else (0, 1, 2)}.get(slashes)
+    joined = ' '.join(corners)
+    # the fast path needs every corner laid out like the first ('v//n' and 'v/t' have
+    # the same number of values)
+    if layout is not None and joined.count('/') == slashes * len(corners) and joined.count('//') == doubles * len(corners):
+        text = joined.replace('//', '/').replace('/', ' ')
+        values = np.array(text.split(), dtype=np.int64)
+        if values.size == len(corners) * len(layout):
+            out = np.zeros((len(corners), 3), dtype=np.int64)
+            out[:, layout] = values.reshape((-1, len(layout)))
+            return out
+
+    # mixed layouts within the file
+    out = np.zeros((len(corners), 3), dtype=np.int64)
+    for i, corner in enumerate(corners):
+        for j, field in enumerate(corner.split('/')[:3]):
+            if field:
+                out[i, j] = int(field)
+    return out
+
+def _triangulate(counts: np.ndarray):
+    """Corner offsets of a triangle fan over faces with `counts` corners each."""
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    triangles = np.maximum(counts - 2, 0)
+    face = np.repeat(np.arange(len(counts)), triangles)
+    k = np.arange(int(triangles.sum())) - np.repeat(np.cumsum(triangles) - triangles, triangles)
+    first = starts[face]
+    return np.stack((first, first + k + 1, first + k + 2), axis=1).ravel()
+
+def _attribute_counts(lines: List[str]):
+    """Number of v, vt and vn records seen before each face, to resolve relative indices."""
+    counts = []
+    v = vt = vn = 0
+    for line in lines:
+        head = line.split(None, 1)[:1]
+        if head == ['v']:
+            v += 1
+        elif head == ['f']:
+            counts.append((v, vt, vn))
+        elif head == ['vt']:
+            vt += 1
+        elif head == ['vn']:
+            vn += 1
+    return np.array(counts, dtype=np.int64).reshape((-1, 3))
+
+def _parse_block(lines: List[str], base=(0, 0, 0)):
+    """Sorts and converts one run of OBJ lines. base is the number of v, vt and vn records
+    before the run, for relative indices.
+
+    Returns (positions, tex coords, normals, sections), sections being [(name, corners)]
+    split at 'o' records. The first section has the name None, it holds the faces that
+    continue whatever object was open before the run. Sections may be empty.
+    """
+    positions, tex_coords, normals, faces = [], [], [], []
+    # face index at which each section starts
+    objects = [(None, 0)]
+
+    # keyword and the rest of the record, any leading or separating whitespace
+    for line in lines:
+        parts = line.split(None, 1)
+        if not parts:
+            continue
+        head = parts[0]
+        rest = parts[1] if len(parts) > 1 else ''
+        if head == 'v':
+            positions.append(rest)
+        elif head == 'f':
+            faces.append(rest)
+        elif head == 'vt':
+            tex_coords.append(rest)
+        elif head == 'vn':
+            normals.append(rest)
+        elif head == 'o':
+            objects.append((rest.strip(), len(faces)))
+
+    face_tokens = [line.split() for line in faces]
+    counts = np.fromiter((len(tokens) for tokens in face_tokens), dtype=np.int64, count=len(face_tokens))
+    corners = _parse_corners([corner for tokens in face_tokens for corner in tokens]) if faces \
+        else np.zeros((0, 3), dtype=np.int64)
+
+    # 1 based to 0 based, missing attributes become -1
+    indices = corners - 1
+    negative = corners < 0
+    if negative.any():
+        totals = np.repeat(_attribute_counts(lines) + np.asarray(base, dtype=np.int64), counts, axis=0)
+        indices[negative] = (totals + corners)[negative]
+
+    fan = _triangulate(counts)
+    # first fan corner of every face, to split the corners by object
+    triangle_counts = np.maximum(counts - 2, 0)
+    first_corner = np.concatenate(([0], np.cumsum(triangle_counts) * 3))
+
+    sections = []
+    for i, (name, begin) in enumerate(objects):
+        end = objects[i + 1][1] if i + 1 < len(objects) else len(faces)
+        sections.append((name, indices[fan[first_corner[begin]:first_corner[end]]]))
+
+    return (
+        _parse_floats(positions, 3),
+        _parse_floats(tex_coords, 2),
+        _parse_floats(normals, 3),
+        sections
+    )
+
+def parse_wavefront(text: str):
+    """Parses OBJ text. Faces before the first 'o' record belong to the object 'mesh'."""
+    positions, tex_coords, normals, sections = _parse_block(text.splitlines())
+    objects = [(name or 'mesh', corners) for name, corners in sections if len(corners)]
+    return WavefrontData(positions, tex_coords, normals, objects)
+
+def weld_corners(corners: np.ndarray):
+    """Shares identical (position, tex coord, normal) corners.
+
+    Returns (unique, indices): the unique corners in order of first use and, for every
+    input corner, its index into them.
+    """
+    if not len(corners):
+        return corners, np.zeros(0, dtype=np.int64)
+
+    # pack each triple into one integer key when it fits, it is much faster than a row unique
+    shifted = corners + 1
+    ranges = shifted.max(axis=0) + 1
+    if float(ranges[0]) * float(ranges[1]) * float(ranges[2]) < 2.0 ** 62:
+        keys = (shifted[:, 0] * ranges[1] + shifted[:, 1]) * ranges[2] + shifted[:, 2]
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(corners, axis=0, return_index=True, return_inverse=True)
+
+    # renumber by first use so the vertex order follows the faces
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return corners[first[order]], rank[inverse.ravel()]
+
+def index_dtype(vertex_count: int):
+    """Smallest index type addressing vertex_count vertices, uint16 or uint32."""
+    return np.uint16 if vertex_count <= 0xFFFF + 1 else np.uint32
+
+def build_object(data: WavefrontData, name: str, corners: np.ndarray, weld: bool=True, optimize: bool=False):
+    """Interleaves one object's corners into a Vertex.format buffer. With weld identical
+    corners share a vertex, otherwise every corner gets its own. optimize reorders the
+    triangles and vertices for the GPU caches, see mesh_tools.optimize_mesh.
+    """
+    corner_count = len(corners)
+    if weld:
+        corners, indices = weld_corners(corners)
+    else:
+        indices = np.arange(corner_count)
+
+    count = len(corners)
+    vertices = np.zeros((count, VERTEX_SIZE), dtype=np.float32)
+
+    vertices[:, 0:3] = data.positions[corners[:, 0]]
+    if len(data.normals):
+        has = corners[:, 2] >= 0
+        vertices[has, 3:6] = data.normals[corners[has, 2]]
+    if len(data.tex_coords):
+        has = corners[:, 1] >= 0
+        vertices[has, 6:8] = data.tex_coords[corners[has, 1]]
+
+    fill_tangents(vertices, indices)
+    cache_report = None
+    if optimize:
+        vertices, indices, cache_report = optimize_mesh(vertices, indices)
+
+    return WavefrontObject(name, vertices, indices.astype(index_dtype(count)), corner_count, cache_report=cache_report)
+
+def _open_text(file_path: str):
+    """Opens an OBJ file for reading, .gz files are decompressed on the fly."""
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, 'rt')
+    return open(file_path, 'r')
+
+def _read_lines(fp, chunk_size: int):
+    """Yields the lines of fp in lists of about chunk_size characters."""
+    rest = ''
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split('\n')
+        # the last line may continue in the next chunk
+        rest = lines.pop()
+        yield lines
+    if rest:
+        yield [rest]
+
+def stream_wavefront(file_path: str, weld: bool=True, chunk_size: int=CHUNK_SIZE, optimize: bool=False):
+    """Imports an OBJ (or .obj.gz) file chunk by chunk, yielding every WavefrontObject as
+    soon as its 'o' section ends.
+
+    Only the current chunk, the current object's corners and the v/vt/vn arrays are held.
+    The attributes have to stay because OBJ indices are global to the file, but they are
+    kept as packed float32 arrays, a fraction of the size of the text.
+    """
+    positions = _GrowableArray(3)
+    tex_coords = _GrowableArray(2)
+    normals = _GrowableArray(3)
+    name, parts = 'mesh', []
+
+    def finish():
+        corners = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        data = WavefrontData(positions.view(), tex_coords.view(), normals.view(), [])
+        return build_object(data, name, corners, weld, optimize)
+
+    with _open_text(file_path) as fp:
+        for lines in _read_lines(fp, chunk_size):
+            base = (len(positions), len(tex_coords), len(normals))
+            v, vt, vn, sections = _parse_block(lines, base)
+            positions.extend(v)
+            tex_coords.extend(vt)
+            normals.extend(vn)
+
+            for section_name, corners in sections:
+                if section_name is not None:
+                    if parts:
+                        yield finish()
+                    name, parts = section_name, []
+                if len(corners):
+                    parts.append(corners)
+
+    if parts:
+        yield finish()
+
+# records may be indented and tab separated
+_OBJECT_RE = re.compile(r'^[ \t]*o[ \t]', re.M)
+_ATTRIBUTE_RE = re.compile(r'^[ \t]*(v|vt|vn)[ \t]', re.M)
+
+def _share(array: np.ndarray):
+    """Copies array into a new shared memory block, returns its (name, shape, dtype)."""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    block.close()
+    return block.name, array.shape, array.dtype.str
+
+def _attach(shared):
+    """Opens a block made by _share, returns (block, array view)."""
+    name, shape, dtype = shared
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+def _take(shared):
+    """Copies a shared array out and frees its block."""
+    block, view = _attach(shared)
+    array = view.copy()
+    del view
+    block.close()
+    block.unlink()
+    return array
+
+def _release(shared):
+    block = shared_memory.SharedMemory(name=shared[0])
+    block.close()
+    block.unlink()
+
+def _parse_section(text: str, base):
+    """Worker: parses the lines of one 'o' section into shared v, vt, vn and corner arrays."""
+    positions, tex_coords, normals, sections = _parse_block(text.splitlines(), base)
+    corners = np.concatenate([corners for _, corners in sections])
+    return _share(positions), _share(tex_coords), _share(normals), _share(corners)
+
+def _build_section(attributes, name: str, corners, weld: bool, optimize: bool):
+    """Worker: builds one object from the file wide attributes, results are shared arrays."""
+    opened = [_attach(shared) for shared in (*attributes, corners)]
+    blocks = [block for block, _ in opened]
+    arrays = [array for _, array in opened]
+    del opened
+    try:
+        obj = build_object(WavefrontData(*arrays[:3], []), name, arrays[3], weld, optimize)
+        return _share(obj.vertices), _share(obj.indices), obj.corner_count, obj.bounds, obj.cache_report
+    finally:
+        # the views have to go before their blocks can close
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+def _gather(futures: list, blocks, live: dict):
+    """Waits for every future and records the shared blocks (blocks(result)) of the ones
+    that succeeded in live, so they are freed even when another one failed. Returns the
+    results, or raises the first failure once all are done.
+    """
+    wait(futures)
+    results, error = [], None
+    for future in futures:
+        try:
+            result = future.result()
+        except BaseException as e:
+            error = error or e
+            continue
+        for shared in blocks(result):
+            live[shared[0]] = shared
+        results.append(result)
+    if error is not None:
+        raise error
+    return results
+
+def _split_objects(text: str):
+    """Splits OBJ text at 'o' records into [(name, text, base)], base being the number of
+    v, vt and vn records before the section.
+    """
+    starts = [0] + [match.start() for match in _OBJECT_RE.finditer(text)] + [len(text)]
+    sections = []
+    base = np.zeros(3, dtype=np.int64)
+    kinds = { 'v': 0, 'vt': 1, 'vn': 2 }
+    for begin, end in zip(starts[:-1], starts[1:]):
+        if begin == end:
+            continue
+        chunk = text[begin:end]
+        name = 'mesh'
+        line_end = chunk.find('\n')
+        first = chunk[:line_end if line_end >= 0 else len(chunk)].split(None, 1)
+        if first[:1] == ['o']:
+            name = first[1].strip() if len(first) > 1 else ''
+        sections.append((name, chunk, tuple(base.tolist())))
+        for kind in _ATTRIBUTE_RE.findall(chunk):
+            base[kinds[kind]] += 1
+    return sections
+
+def load_wavefront_parallel(file_path: str, weld: bool=True, workers: int=None, optimize: bool=False):
+    """Imports the objects of an OBJ file on a process pool, one task per 'o' section.
+
+    The sections are parsed in parallel, the main process joins their v, vt and vn into
+    the file wide arrays (indices are global to the file), then the objects are built in
+    parallel against those. Arrays travel through shared memory, not pickles.
+    """
+    with _open_text(file_path) as fp:
+        sections = _split_objects(fp.read())
+
+    if os.name == 'posix':
+        # workers share our tracker only if it runs before they fork, otherwise each
+        # one starts its own and reports the blocks we free as leaked
+        resource_tracker.ensure_running()
+
+    # every shared block handed out and not taken yet, whatever is left is freed at the end
+    live = {}
+
+    def own(shared):
+        live[shared[0]] = shared
+        return shared
+
+    def take(shared):
+        array = _take(shared)
+        del live[shared[0]]
+        return array
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            parsed = _gather([pool.submit(_parse_section, text, base) for _, text, base in sections], lambda result: result, live)
+
+            attributes = [own(_share(np.concatenate([take(result[k]) for result in parsed]))) for k in range(3)]
+
+            names, jobs = [], []
+            for (name, _, _), (_, _, _, corners) in zip(sections, parsed):
+                _, shape, _ = corners
+                if shape[0] == 0:
+                    continue
+                names.append(name)
+                jobs.append(pool.submit(_build_section, attributes, name, corners, weld, optimize))
+            built = _gather(jobs, lambda result: result[:2], live)
+
+            objects = []
+            for name, (vertices, indices, corner_count, bounds, cache_report) in zip(names, built):
+                objects.append(WavefrontObject(name, take(vertices), take(indices), corner_count, bounds, cache_report))
+    finally:
+        # the attributes, the corners and anything left behind by a failure
+        for shared in live.values():
+            try:
+                _release(shared)
+            except FileNotFoundError:
+                pass
+
+    return objects
+
+def load_wavefront(file_path: str, weld: bool=True, cache: bool=True, workers: int=1, optimize: bool=False):
+    """Imports every object of an OBJ file. With cache the result is stored in a binary
+    file next to the source and memory mapped on later loads, see mesh_cache. With more
+    than one worker (None for one per core) the objects are imported on a process pool,
+    see load_wavefront_parallel. optimize runs mesh_tools.optimize_mesh on every object.
+    """
+    options = { 'weld': weld, 'optimize': optimize }
+    if cache:
+        cached = mesh_cache.read_cache(file_path, options)
+        if cached is not None:
+            return [WavefrontObject(*entry) for entry in cached]
+
+    if workers is None or workers > 1:
+        objects = load_wavefront_parallel(file_path, weld, workers, optimize)
+    else:
+        with _open_text(file_path) as fp:
+            data = parse_wavefront(fp.read())
+        objects = [build_object(data, name, corners, weld, optimize) for name, corners in data.objects]
+
+    if cache:
+        mesh_cache.write_cache(file_path, options, objects)
+    return objects
@@ -1,9 +1,12 @@
 import math
 from typing import Any
 
+import numpy as np
+
 __all__ = [
     'Vector3', 'Matrix4', 'Quaternion', 'Transform',
     'Vector2', 'Vector4', 'Ray',
+    'Vector3Array', 'QuaternionArray', 'Matrix4Array', 'Frustum',
 ]
 
 def scalar_lerp(a, b, t):
@@ -91,6 +94,52 @@ class Vector3(object):
     def __neg__(self):
         return Vector3(-self.x, -self.y, -self.z)
 
+    def set(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+        return self
+
+    def copy_from(self, other):
+        self.x = other.x
+        self.y = other.y
+        self.z = other.z
+        return self
+
+    @staticmethod
+    def add_into(a, b, out):
+        out.x = a.x + b.x
+        out.y = a.y + b.y
+        out.z = a.z + b.z
+        return out
+
+    @staticmethod
+    def sub_into(a, b, out):
+        out.x = a.x - b.x
+        out.y = a.y - b.y
+        out.z = a.z - b.z
+        return out
+
+    @staticmethod
+    def scale_into(a, n, out):
+        out.x = a.x * n
+        out.y = a.y * n
+        out.z = a.z * n
+        return out
+
+    @staticmethod
+    def cross_into(a, b, out):
+        ax = a.x
+        ay = a.y
+        az = a.z
+        bx = b.x
+        by = b.y
+        bz = b.z
+        out.x = ay * bz - az * by
+        out.y = az * bx - ax * bz
+        out.z = ax * by - ay * bx
+        return out
+
     def __copy__(self):
         return Vector3(self.x, self.y, self.z)
 
@@ -103,12 +152,22 @@ class Vector3(object):
     def raw(self):
         return [self.x, self.y, self.z]
 
+    @property
+    def buffer(self):
+        # vectors are mutated through their fields, so this is not cached like Matrix4.buffer
+        return np.array((self.x, self.y, self.z), dtype=np.float32)
+
 class Matrix4(object):
     """Column major matrix4.
     m00, m01, m02, m03 is the first column.
+
+    Every method that modifies the matrix in place bumps `version`, which is what the
+    inverse and `buffer` caches are keyed on. Call invalidate() after writing to the
+    mNN fields directly.
     """
     __slots__ = ('m00', 'm01', 'm02', 'm03', 'm10', 'm11', 'm12', 'm13',
-                 'm20', 'm21', 'm22', 'm23', 'm30', 'm31', 'm32', 'm33')
+                 'm20', 'm21', 'm22', 'm23', 'm30', 'm31', 'm32', 'm33',
+                 '_version', '_inverse', '_buffer', '_buffer_version')
 
     def __init__(self,
                  m00=1.0, m01=0.0, m02=0.0, m03=0.0, m10=0.0, m11=1.0, m12=0.0, m13=0.0,
@@ -129,6 +188,16 @@ class Matrix4(object):
         self.m31 = m31
         self.m32 = m32
         self.m33 = m33
+        self._version = 0
+        self._inverse = None
+        self._buffer = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def invalidate(self):
+        self._version += 1
 
     def transform_point(self, p):
         # ignore last row
@@ -160,9 +229,173 @@ class Matrix4(object):
         nw = self.m03 * x + self.m13 * y + self.m23 * z + self.m33
         return Vector3(nx, ny, nz) * (1.0 / nw)
 
-    def inverse(self):
-        # TODO TRS only for now
-        return self.to_transform().inverse().to_matrix4()
+    def is_affine(self):
+        return self.m03 == 0.0 and self.m13 == 0.0 and self.m23 == 0.0 and self.m33 == 1.0
+
+    def inverse(self, cache=True):
+        """Inverse of this matrix, using the affine path when the last row is (0, 0, 0, 1).
+        With cache=True the result is kept until this matrix changes, so it is shared
+        between callers and must not be modified.
+        """
+        if cache:
+            cached = self._inverse
+            if cached is not None and cached[0] == self._version and cached[1]._version == cached[2]:
+                return cached[1]
+        if self.is_affine():
+            inv = self.affine_inverse()
+        else:
+            inv = self.general_inverse()
+        if cache:
+            self._inverse = (self._version, inv, inv._version)
+        return inv
+
+    def rigid_inverse(self, out=None):
+        """Inverse of a rotation + translation matrix (no scale or shear)."""
+        m00 = self.m00
+        m01 = self.m01
+        m02 = self.m02
+        m10 = self.m10
+        m11 = self.m11
+        m12 = self.m12
+        m20 = self.m20
+        m21 = self.m21
+        m22 = self.m22
+        tx = self.m30
+        ty = self.m31
+        tz = self.m32
+        if out is None:
+            out = Matrix4()
+        out.m00 = m00
+        out.m01 = m10
+        out.m02 = m20
+        out.m03 = 0.0
+        out.m10 = m01
+        out.m11 = m11
+        out.m12 = m21
+        out.m13 = 0.0
+        out.m20 = m02
+        out.m21 = m12
+        out.m22 = m22
+        out.m23 = 0.0
+        out.m30 = -(m00 * tx + m01 * ty + m02 * tz)
+        out.m31 = -(m10 * tx + m11 * ty + m12 * tz)
+        out.m32 = -(m20 * tx + m21 * ty + m22 * tz)
+        out.m33 = 1.0
+        out._version += 1
+        return out
+
+    def affine_inverse(self, out=None):
+        """Inverse of a matrix whose last row is (0, 0, 0, 1), scale and shear are fine."""
+        a00 = self.m00
+        a01 = self.m01
+        a02 = self.m02
+        a10 = self.m10
+        a11 = self.m11
+        a12 = self.m12
+        a20 = self.m20
+        a21 = self.m21
+        a22 = self.m22
+        tx = self.m30
+        ty = self.m31
+        tz = self.m32
+
+        b01 = a22 * a11 - a12 * a21
+        b11 = -a22 * a10 + a12 * a20
+        b21 = a21 * a10 - a11 * a20
+
+        det = a00 * b01 + a01 * b11 + a02 * b21
+        if det == 0.0:
+            raise ValueError('Matrix4 is singular and cannot be inverted.')
+        det = 1.0 / det
+
+        i00 = b01 * det
+        i01 = (-a22 * a01 + a02 * a21) * det
+        i02 = (a12 * a01 - a02 * a11) * det
+        i10 = b11 * det
+        i11 = (a22 * a00 - a02 * a20) * det
+        i12 = (-a12 * a00 + a02 * a10) * det
+        i20 = b21 * det
+        i21 = (-a21 * a00 + a01 * a20) * det
+        i22 = (a11 * a00 - a01 * a10) * det
+
+        if out is None:
+            out = Matrix4()
+        out.m00 = i00
+        out.m01 = i01
+        out.m02 = i02
+        out.m03 = 0.0
+        out.m10 = i10
+        out.m11 = i11
+        out.m12 = i12
+        out.m13 = 0.0
+        out.m20 = i20
+        out.m21 = i21
+        out.m22 = i22
+        out.m23 = 0.0
+        out.m30 = -(i00 * tx + i10 * ty + i20 * tz)
+        out.m31 = -(i01 * tx + i11 * ty + i21 * tz)
+        out.m32 = -(i02 * tx + i12 * ty + i22 * tz)
+        out.m33 = 1.0
+        out._version += 1
+        return out
+
+    def general_inverse(self, out=None):
+        """Full 4x4 inverse, works for projection matrices too."""
+        a00 = self.m00
+        a01 = self.m01
+        a02 = self.m02
+        a03 = self.m03
+        a10 = self.m10
+        a11 = self.m11
+        a12 = self.m12
+        a13 = self.m13
+        a20 = self.m20
+        a21 = self.m21
+        a22 = self.m22
+        a23 = self.m23
+        a30 = self.m30
+        a31 = self.m31
+        a32 = self.m32
+        a33 = self.m33
+
+        b00 = a00 * a11 - a01 * a10
+        b01 = a00 * a12 - a02 * a10
+        b02 = a00 * a13 - a03 * a10
+        b03 = a01 * a12 - a02 * a11
+        b04 = a01 * a13 - a03 * a11
+        b05 = a02 * a13 - a03 * a12
+        b06 = a20 * a31 - a21 * a30
+        b07 = a20 * a32 - a22 * a30
+        b08 = a20 * a33 - a23 * a30
+        b09 = a21 * a32 - a22 * a31
+        b10 = a21 * a33 - a23 * a31
+        b11 = a22 * a33 - a23 * a32
+
+        det = b00 * b11 - b01 * b10 + b02 * b09 + b03 * b08 - b04 * b07 + b05 * b06
+        if det == 0.0:
+            raise ValueError('Matrix4 is singular and cannot be inverted.')
+        det = 1.0 / det
+
+        if out is None:
+            out = Matrix4()
+        out.m00 = (a11 * b11 - a12 * b10 + a13 * b09) * det
+        out.m01 = (a02 * b10 - a01 * b11 - a03 * b09) * det
+        out.m02 = (a31 * b05 - a32 * b04 + a33 * b03) * det
+        out.m03 = (a22 * b04 - a21 * b05 - a23 * b03) * det
+        out.m10 = (a12 * b08 - a10 * b11 - a13 * b07) * det
+        out.m11 = (a00 * b11 - a02 * b08 + a03 * b07) * det
+        out.m12 = (a32 * b02 - a30 * b05 - a33 * b01) * det
+        out.m13 = (a20 * b05 - a22 * b02 + a23 * b01) * det
+        out.m20 = (a10 * b10 - a11 * b08 + a13 * b06) * det
+        out.m21 = (a01 * b08 - a00 * b10 - a03 * b06) * det
+        out.m22 = (a30 * b04 - a31 * b02 + a33 * b00) * det
+        out.m23 = (a21 * b02 - a20 * b04 - a23 * b00) * det
+        out.m30 = (a11 * b07 - a10 * b09 - a12 * b06) * det
+        out.m31 = (a00 * b09 - a01 * b07 + a02 * b06) * det
+        out.m32 = (a31 * b01 - a30 * b03 - a32 * b00) * det
+        out.m33 = (a20 * b03 - a21 * b01 + a22 * b00) * det
+        out._version += 1
+        return out
 
     def transpose(self):
         m00 = self.m00
@@ -284,6 +517,8 @@ class Matrix4(object):
         self.m31 += other.m31
         self.m32 += other.m32
         self.m33 += other.m33
+        self._version += 1
+        return self
 
     def __sub__(self, other):
         return Matrix4(
@@ -313,6 +548,109 @@ class Matrix4(object):
         self.m31 -= other.m31
         self.m32 -= other.m32
         self.m33 -= other.m33
+        self._version += 1
+        return self
+
+    @staticmethod
+    def mul_into(a, b, out):
+        """out = a * b without allocating, out may be a or b."""
+        am00 = a.m00
+        am01 = a.m01
+        am02 = a.m02
+        am03 = a.m03
+        am10 = a.m10
+        am11 = a.m11
+        am12 = a.m12
+        am13 = a.m13
+        am20 = a.m20
+        am21 = a.m21
+        am22 = a.m22
+        am23 = a.m23
+        am30 = a.m30
+        am31 = a.m31
+        am32 = a.m32
+        am33 = a.m33
+
+        bm00 = b.m00
+        bm01 = b.m01
+        bm02 = b.m02
+        bm03 = b.m03
+        bm10 = b.m10
+        bm11 = b.m11
+        bm12 = b.m12
+        bm13 = b.m13
+        bm20 = b.m20
+        bm21 = b.m21
+        bm22 = b.m22
+        bm23 = b.m23
+        bm30 = b.m30
+        bm31 = b.m31
+        bm32 = b.m32
+        bm33 = b.m33
+
+        out.m00 = am00 * bm00 + am10 * bm01 + am20 * bm02 + am30 * bm03
+        out.m01 = am01 * bm00 + am11 * bm01 + am21 * bm02 + am31 * bm03
+        out.m02 = am02 * bm00 + am12 * bm01 + am22 * bm02 + am32 * bm03
+        out.m03 = am03 * bm00 + am13 * bm01 + am23 * bm02 + am33 * bm03
+
+        out.m10 = am00 * bm10 + am10 * bm11 + am20 * bm12 + am30 * bm13
+        out.m11 = am01 * bm10 + am11 * bm11 + am21 * bm12 + am31 * bm13
+        out.m12 = am02 * bm10 + am12 * bm11 + am22 * bm12 + am32 * bm13
+        out.m13 = am03 * bm10 + am13 * bm11 + am23 * bm12 + am33 * bm13
+
+        out.m20 = am00 * bm20 + am10 * bm21 + am20 * bm22 + am30 * bm23
+        out.m21 = am01 * bm20 + am11 * bm21 + am21 * bm22 + am31 * bm23
+        out.m22 = am02 * bm20 + am12 * bm21 + am22 * bm22 + am32 * bm23
+        out.m23 = am03 * bm20 + am13 * bm21 + am23 * bm22 + am33 * bm23
+
+        out.m30 = am00 * bm30 + am10 * bm31 + am20 * bm32 + am30 * bm33
+        out.m31 = am01 * bm30 + am11 * bm31 + am21 * bm32 + am31 * bm33
+        out.m32 = am02 * bm30 + am12 * bm31 + am22 * bm32 + am32 * bm33
+        out.m33 = am03 * bm30 + am13 * bm31 + am23 * bm32 + am33 * bm33
+        out._version += 1
+        return out
+
+    @staticmethod
+    def add_into(a, b, out):
+        out.m00 = a.m00 + b.m00
+        out.m01 = a.m01 + b.m01
+        out.m02 = a.m02 + b.m02
+        out.m03 = a.m03 + b.m03
+        out.m10 = a.m10 + b.m10
+        out.m11 = a.m11 + b.m11
+        out.m12 = a.m12 + b.m12
+        out.m13 = a.m13 + b.m13
+        out.m20 = a.m20 + b.m20
+        out.m21 = a.m21 + b.m21
+        out.m22 = a.m22 + b.m22
+        out.m23 = a.m23 + b.m23
+        out.m30 = a.m30 + b.m30
+        out.m31 = a.m31 + b.m31
+        out.m32 = a.m32 + b.m32
+        out.m33 = a.m33 + b.m33
+        out._version += 1
+        return out
+
+    @staticmethod
+    def sub_into(a, b, out):
+        out.m00 = a.m00 - b.m00
+        out.m01 = a.m01 - b.m01
+        out.m02 = a.m02 - b.m02
+        out.m03 = a.m03 - b.m03
+        out.m10 = a.m10 - b.m10
+        out.m11 = a.m11 - b.m11
+        out.m12 = a.m12 - b.m12
+        out.m13 = a.m13 - b.m13
+        out.m20 = a.m20 - b.m20
+        out.m21 = a.m21 - b.m21
+        out.m22 = a.m22 - b.m22
+        out.m23 = a.m23 - b.m23
+        out.m30 = a.m30 - b.m30
+        out.m31 = a.m31 - b.m31
+        out.m32 = a.m32 - b.m32
+        out.m33 = a.m33 - b.m33
+        out._version += 1
+        return out
 
     def mul_scalar(self, s):
         return Matrix4(
@@ -353,6 +691,95 @@ class Matrix4(object):
 
     copy = __copy__
 
+    def copy_from(self, other):
+        self.m00 = other.m00
+        self.m01 = other.m01
+        self.m02 = other.m02
+        self.m03 = other.m03
+        self.m10 = other.m10
+        self.m11 = other.m11
+        self.m12 = other.m12
+        self.m13 = other.m13
+        self.m20 = other.m20
+        self.m21 = other.m21
+        self.m22 = other.m22
+        self.m23 = other.m23
+        self.m30 = other.m30
+        self.m31 = other.m31
+        self.m32 = other.m32
+        self.m33 = other.m33
+        self._version += 1
+        return self
+
+    def set_identity(self):
+        self.m00 = 1.0
+        self.m01 = 0.0
+        self.m02 = 0.0
+        self.m03 = 0.0
+        self.m10 = 0.0
+        self.m11 = 1.0
+        self.m12 = 0.0
+        self.m13 = 0.0
+        self.m20 = 0.0
+        self.m21 = 0.0
+        self.m22 = 1.0
+        self.m23 = 0.0
+        self.m30 = 0.0
+        self.m31 = 0.0
+        self.m32 = 0.0
+        self.m33 = 1.0
+        self._version += 1
+        return self
+
+    def set_from_rotation(self, rotation):
+        """Same as rotation.to_matrix4(), written into self."""
+        return self.set_from_trs(0.0, 0.0, 0.0, rotation, 1.0, 1.0, 1.0)
+
+    def set_from_transform(self, transform):
+        """Same as transform.to_matrix4(), written into self."""
+        t = transform.translation
+        s = transform.scale
+        return self.set_from_trs(t.x, t.y, t.z, transform.rotation, s.x, s.y, s.z)
+
+    def set_from_trs(self, tx, ty, tz, rotation, sx, sy, sz):
+        # T * R * S
+        x = rotation.x
+        y = rotation.y
+        z = rotation.z
+        w = rotation.w
+
+        qxx = x * x
+        qyy = y * y
+        qzz = z * z
+        qxz = x * z
+        qxy = x * y
+        qyz = y * z
+        qwx = w * x
+        qwy = w * y
+        qwz = w * z
+
+        self.m00 = (1.0 - 2.0 * (qyy + qzz)) * sx
+        self.m01 = 2.0 * (qxy + qwz) * sx
+        self.m02 = 2.0 * (qxz - qwy) * sx
+        self.m03 = 0.0
+
+        self.m10 = 2.0 * (qxy - qwz) * sy
+        self.m11 = (1.0 - 2.0 * (qxx + qzz)) * sy
+        self.m12 = 2.0 * (qyz + qwx) * sy
+        self.m13 = 0.0
+
+        self.m20 = 2.0 * (qxz + qwy) * sz
+        self.m21 = 2.0 * (qyz - qwx) * sz
+        self.m22 = (1.0 - 2.0 * (qxx + qyy)) * sz
+        self.m23 = 0.0
+
+        self.m30 = tx
+        self.m31 = ty
+        self.m32 = tz
+        self.m33 = 1.0
+        self._version += 1
+        return self
+
     def __repr__(self):
         return 'Matrix4({:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f}, {:0.4f})'.format(
             self.m00, self.m01, self.m02, self.m03, self.m10, self.m11, self.m12, self.m13,
@@ -363,6 +790,7 @@ class Matrix4(object):
         self.m30 = translation.x
         self.m31 = translation.y
         self.m32 = translation.z
+        self._version += 1
 
     def set_look_rotation(self, forward, up):
         # forward becomes negative z, reset scale
@@ -378,6 +806,7 @@ class Matrix4(object):
         self.m20 = axis_z.x
         self.m21 = axis_z.y
         self.m22 = axis_z.z
+        self._version += 1
 
     @staticmethod
     def from_translation(translation):
@@ -425,6 +854,20 @@ class Matrix4(object):
             self.m30, self.m31, self.m32, self.m33
         ]
 
+    @property
+    def buffer(self):
+        """Contiguous float32 copy of raw, ready for glUniformMatrix4fv.
+        The array is allocated once and only refreshed when the matrix version changes.
+        """
+        buf = self._buffer
+        if buf is None:
+            buf = self._buffer = np.empty(16, dtype=np.float32)
+        elif self._buffer_version == self._version:
+            return buf
+        buf[:] = self.raw
+        self._buffer_version = self._version
+        return buf
+
 class Quaternion(object):
     __slots__ = ('w', 'x', 'y', 'z')
 
@@ -554,9 +997,7 @@ class Quaternion(object):
         return (axis_x, axis_y, axis_z)
 
     def to_matrix4(self):
-        axis_x, axis_y, axis_z = self.to_matrix3()
-        return Matrix4(axis_x.x, axis_x.y, axis_x.z, 0.0, axis_y.x, axis_y.y, axis_y.z, 0.0,
-            axis_z.x, axis_z.y, axis_z.z, 0.0, 0.0, 0.0, 0.0, 1.0)
+        return Matrix4().set_from_rotation(self)
 
     @staticmethod
     def from_angle_axis(angle, axis):
@@ -688,18 +1129,37 @@ class Quaternion(object):
         return res
 
     def __imul__(self, other):
-        px = self.x
-        py = self.y
-        pz = self.z
-        pw = self.w
-        qx = other.x
-        qy = other.y
-        qz = other.z
-        qw = other.w
-        self.w = pw * qw - px * qx - py * qy - pz * qz
-        self.x = pw * qx + px * qw + py * qz - pz * qy
-        self.y = pw * qy + py * qw + pz * qx - px * qz
-        self.z = pw * qz + pz * qw + px * qy - py * qx
+        return Quaternion.mul_into(self, other, self)
+
+    @staticmethod
+    def mul_into(a, b, out):
+        """out = a * b without allocating, out may be a or b."""
+        px = a.x
+        py = a.y
+        pz = a.z
+        pw = a.w
+        qx = b.x
+        qy = b.y
+        qz = b.z
+        qw = b.w
+        out.w = pw * qw - px * qx - py * qy - pz * qz
+        out.x = pw * qx + px * qw + py * qz - pz * qy
+        out.y = pw * qy + py * qw + pz * qx - px * qz
+        out.z = pw * qz + pz * qw + px * qy - py * qx
+        return out
+
+    def set(self, w, x, y, z):
+        self.w = w
+        self.x = x
+        self.y = y
+        self.z = z
+        return self
+
+    def copy_from(self, other):
+        self.w = other.w
+        self.x = other.x
+        self.y = other.y
+        self.z = other.z
         return self
 
     def __copy__(self):
@@ -710,28 +1170,80 @@ class Quaternion(object):
     def __repr__(self):
         return 'Quaternion({:0.4f}, {:0.4f}, {:0.4f}, {:0.4f})'.format(self.w, self.x, self.y, self.z)
 
+class _TrackedVector3(Vector3):
+    """Vector3 owned by a Transform, every field write bumps its version."""
+    __slots__ = ('_version',)
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        object.__setattr__(self, '_version', 0)
+        super().__init__(x, y, z)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_version', self._version + 1)
+
+class _TrackedQuaternion(Quaternion):
+    """Quaternion owned by a Transform, every field write bumps its version."""
+    __slots__ = ('_version',)
+
+    def __init__(self, w=1.0, x=0.0, y=0.0, z=0.0):
+        object.__setattr__(self, '_version', 0)
+        super().__init__(w, x, y, z)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_version', self._version + 1)
+
 class Transform(object):
-    __slots__ = ('translation', 'rotation', 'scale', '_old_translation', '_old_rotation', '_old_scale')
+    """Translation, rotation and scale.
+    The three components are owned by the transform: assigning to them copies the values in,
+    and any change, including `transform.translation.x = 1.0`, bumps `version`.
+    """
+    __slots__ = ('_translation', '_rotation', '_scale', '_matrix', '_polled_version')
     def __init__(self, translation=Vector3(0.0, 0.0, 0.0), rotation=Quaternion(), scale=Vector3(1.0, 1.0, 1.0)):
-        self.translation: Vector3 = translation.copy()
-        self.rotation: Quaternion = rotation.copy()
-        self.scale: Vector3 = scale.copy()
+        self._translation = _TrackedVector3(translation.x, translation.y, translation.z)
+        self._rotation = _TrackedQuaternion(rotation.w, rotation.x, rotation.y, rotation.z)
+        self._scale = _TrackedVector3(scale.x, scale.y, scale.z)
+
+        self._matrix = None
+        self._polled_version = self.version
+
+    @property
+    def translation(self) -> Vector3:
+        return self._translation
+
+    @translation.setter
+    def translation(self, v: Vector3):
+        self._translation.copy_from(v)
+
+    @property
+    def rotation(self) -> Quaternion:
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, q: Quaternion):
+        self._rotation.copy_from(q)
 
-        self._old_translation: Vector3 = translation.copy()
-        self._old_rotation: Vector3 = rotation.copy()
-        self._old_scale: Vector3 = scale.copy()
+    @property
+    def scale(self) -> Vector3:
+        return self._scale
+
+    @scale.setter
+    def scale(self, v: Vector3):
+        self._scale.copy_from(v)
+
+    @property
+    def version(self):
+        """Monotonically increasing, changes whenever translation, rotation or scale change."""
+        return self._translation._version + self._rotation._version + self._scale._version
 
     def has_changed(self):
-        changed = False
-        if self.translation != self._old_translation:
-            changed = True
-            self._old_translation = self.translation.copy()
-        if self.scale != self._old_scale:
-            changed = True
-            self._old_scale = self.scale.copy()
-        if self.rotation != self._old_rotation:
-            changed = True
-            self._old_rotation = self.rotation.copy()
+        """Whether the transform changed since the last call.
+        This consumes the change, compare `version` instead when more than one party is interested.
+        """
+        version = self.version
+        changed = version != self._polled_version
+        self._polled_version = version
         return changed
 
     def transform_point(self, p):
@@ -751,14 +1263,16 @@ class Transform(object):
         return inv_m.to_transform()
 
     def to_matrix4(self):
-        # T * R * S
-        axis_x, axis_y, axis_z = self.rotation.to_matrix3()
-        axis_x *= self.scale.x
-        axis_y *= self.scale.y
-        axis_z *= self.scale.z
-        translation = self.translation
-        return Matrix4(axis_x.x, axis_x.y, axis_x.z, 0.0, axis_y.x, axis_y.y, axis_y.z, 0.0,
-            axis_z.x, axis_z.y, axis_z.z, 0.0, translation.x, translation.y, translation.z, 1.0)
+        """T * R * S matrix, cached until the transform changes.
+        The cached matrix is shared, copy it before modifying it.
+        """
+        version = self.version
+        cached = self._matrix
+        if cached is not None and cached[0] == version and cached[1]._version == cached[2]:
+            return cached[1]
+        m = Matrix4().set_from_transform(self)
+        self._matrix = (version, m, m._version)
+        return m
 
     def __mul__(self, other):
         t1 = self.translation
@@ -860,6 +1374,10 @@ class Vector2:
     def raw(self):
         return [self.x, self.y]
 
+    @property
+    def buffer(self):
+        return np.array((self.x, self.y), dtype=np.float32)
+
 class Vector4:
     __slots__ = ('x', 'y', 'z', 'w')
     def __init__(self, x=0.0, y=0.0, z=0.0, w=0.0):
@@ -938,6 +1456,14 @@ class Vector4:
     def __repr__(self):
         return 'Vector4({:0.4f}, {:0.4f}, {:0.4f}, {:0.4f})'.format(self.x, self.y, self.z, self.w)
 
+    @property
+    def raw(self):
+        return [self.x, self.y, self.z, self.w]
+
+    @property
+    def buffer(self):
+        return np.array((self.x, self.y, self.z, self.w), dtype=np.float32)
+
 class Ray:
     __slots__ = ('position', 'direction')
     def __init__(self, position=Vector3(0.0, 0.0, 0.0), direction=Vector3(0.0, 0.0, 1.0)):
@@ -951,3 +1477,422 @@ class Ray:
 
     def __repr__(self):
         return 'Ray({}, {})'.format(self.position, self.direction)
+
+def _vector3_data(v):
+    if isinstance(v, Vector3Array):
+        return v.data
+    if isinstance(v, Vector3):
+        return np.array((v.x, v.y, v.z), dtype=np.float32)
+    return np.asarray(v, dtype=np.float32)
+
+def _quaternion_data(q):
+    if isinstance(q, QuaternionArray):
+        return q.data
+    if isinstance(q, Quaternion):
+        return np.array((q.w, q.x, q.y, q.z), dtype=np.float32)
+    return np.asarray(q, dtype=np.float32)
+
+def _matrix4_data(m):
+    if isinstance(m, Matrix4Array):
+        return m.data
+    if isinstance(m, Matrix4):
+        return np.array(m.raw, dtype=np.float32).reshape((1, 4, 4))
+    return np.asarray(m, dtype=np.float32).reshape((-1, 4, 4))
+
+class Vector3Array(object):
+    """Contiguous float32 array of 3D vectors with shape (n, 3).
+    The batched counterpart of Vector3, `data` can be uploaded to GL as is.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data=()):
+        self.data = np.ascontiguousarray(np.asarray(data, dtype=np.float32).reshape((-1, 3)))
+
+    @staticmethod
+    def zeros(count):
+        return Vector3Array(np.zeros((count, 3), dtype=np.float32))
+
+    @staticmethod
+    def from_vectors(vectors):
+        return Vector3Array([(v.x, v.y, v.z) for v in vectors])
+
+    def to_vectors(self):
+        return [Vector3(x, y, z) for x, y, z in self.data.tolist()]
+
+    def length(self):
+        return np.sqrt(self.length_squared())
+
+    def length_squared(self):
+        return np.einsum('ij,ij->i', self.data, self.data)
+
+    def dot(self, other):
+        b = _vector3_data(other)
+        return np.sum(self.data * b, axis=-1)
+
+    def cross(self, other):
+        return Vector3Array(np.cross(self.data, _vector3_data(other)))
+
+    def normalize_self(self):
+        l = self.length()
+        zero = l == 0.0
+        self.data /= np.where(zero, 1.0, l)[:, None]
+        # same convention as Vector3.normalize_self
+        self.data[zero] = (1.0, 0.0, 0.0)
+
+    def normalize(self):
+        v = self.copy()
+        v.normalize_self()
+        return v
+
+    def lerp(self, other, factor):
+        factor = np.asarray(factor, dtype=np.float32)
+        if factor.ndim == 1:
+            factor = factor[:, None]
+        return Vector3Array(scalar_lerp(self.data, _vector3_data(other), factor))
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Vector3Array(self.data[index])
+        x, y, z = self.data[index].tolist()
+        return Vector3(x, y, z)
+
+    def __setitem__(self, index, v):
+        self.data[index] = _vector3_data(v)
+
+    def __add__(self, other):
+        return Vector3Array(self.data + _vector3_data(other))
+
+    def __iadd__(self, other):
+        self.data += _vector3_data(other)
+        return self
+
+    def __sub__(self, other):
+        return Vector3Array(self.data - _vector3_data(other))
+
+    def __isub__(self, other):
+        self.data -= _vector3_data(other)
+        return self
+
+    def __mul__(self, n):
+        n = np.asarray(n, dtype=np.float32)
+        return Vector3Array(self.data * (n[:, None] if n.ndim == 1 else n))
+
+    def __imul__(self, n):
+        n = np.asarray(n, dtype=np.float32)
+        self.data *= n[:, None] if n.ndim == 1 else n
+        return self
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Vector3Array(-self.data)
+
+    def __copy__(self):
+        return Vector3Array(self.data.copy())
+
+    copy = __copy__
+
+    def __repr__(self):
+        return 'Vector3Array({})'.format(len(self))
+
+    @property
+    def buffer(self):
+        return self.data
+
+class QuaternionArray(object):
+    """Contiguous float32 array of quaternions with shape (n, 4), stored as (w, x, y, z)
+    like the Quaternion constructor.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data=()):
+        self.data = np.ascontiguousarray(np.asarray(data, dtype=np.float32).reshape((-1, 4)))
+
+    @staticmethod
+    def identity(count):
+        data = np.zeros((count, 4), dtype=np.float32)
+        data[:, 0] = 1.0
+        return QuaternionArray(data)
+
+    @staticmethod
+    def from_quaternions(quaternions):
+        return QuaternionArray([(q.w, q.x, q.y, q.z) for q in quaternions])
+
+    def to_quaternions(self):
+        return [Quaternion(w, x, y, z) for w, x, y, z in self.data.tolist()]
+
+    @staticmethod
+    def from_angle_axis(angles, axes):
+        ha = np.asarray(angles, dtype=np.float32) * 0.5
+        s = np.sin(ha)[:, None]
+        data = np.empty((ha.shape[0], 4), dtype=np.float32)
+        data[:, 0] = np.cos(ha)
+        data[:, 1:] = _vector3_data(axes) * s
+        return QuaternionArray(data)
+
+    def length(self):
+        return np.sqrt(np.einsum('ij,ij->i', self.data, self.data))
+
+    def dot(self, other):
+        return np.sum(self.data * _quaternion_data(other), axis=-1)
+
+    def normalize_self(self):
+        l = self.length()
+        zero = l == 0.0
+        self.data /= np.where(zero, 1.0, l)[:, None]
+        self.data[zero] = (1.0, 0.0, 0.0, 0.0)
+
+    def normalize(self):
+        q = self.copy()
+        q.normalize_self()
+        return q
+
+    def conjugate(self):
+        data = -self.data
+        data[:, 0] = self.data[:, 0]
+        return QuaternionArray(data)
+
+    def slerp(self, other, t):
+        p = self.data
+        q = np.array(np.broadcast_to(_quaternion_data(other), p.shape))
+        t = np.asarray(t, dtype=np.float32)
+        if t.ndim == 1:
+            t = t[:, None]
+        cos_theta = np.sum(p * q, axis=-1)
+        flip = cos_theta < 0.0
+        q[flip] = -q[flip]
+        cos_theta = np.abs(cos_theta)[:, None]
+        near = cos_theta > 0.999999
+        angle = np.arccos(np.where(near, 0.0, cos_theta))
+        norm = 1.0 / np.where(near, 1.0, np.sin(angle))
+        t0 = np.where(near, 1.0 - t, np.sin((1.0 - t) * angle) * norm)
+        t1 = np.where(near, t, np.sin(t * angle) * norm)
+        return QuaternionArray(p * t0 + q * t1)
+
+    def transform_point(self, p):
+        return self.transform_vector(p)
+
+    def transform_vector(self, v):
+        # v' = v + 2w(u x v) + 2u x (u x v), with u = (x, y, z)
+        v = _vector3_data(v)
+        w = self.data[:, 0:1]
+        u = self.data[:, 1:]
+        uv = np.cross(u, v)
+        return Vector3Array(v + 2.0 * (w * uv + np.cross(u, uv)))
+
+    def to_matrix4(self):
+        w, x, y, z = self.data.T
+        m = np.zeros((len(self), 4, 4), dtype=np.float32)
+        m[:, 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+        m[:, 0, 1] = 2.0 * (x * y + w * z)
+        m[:, 0, 2] = 2.0 * (x * z - w * y)
+        m[:, 1, 0] = 2.0 * (x * y - w * z)
+        m[:, 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+        m[:, 1, 2] = 2.0 * (y * z + w * x)
+        m[:, 2, 0] = 2.0 * (x * z + w * y)
+        m[:, 2, 1] = 2.0 * (y * z - w * x)
+        m[:, 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+        m[:, 3, 3] = 1.0
+        return Matrix4Array(m)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return QuaternionArray(self.data[index])
+        w, x, y, z = self.data[index].tolist()
+        return Quaternion(w, x, y, z)
+
+    def __setitem__(self, index, q):
+        self.data[index] = _quaternion_data(q)
+
+    def __mul__(self, other):
+        p = self.data
+        q = _quaternion_data(other)
+        pw, px, py, pz = p[..., 0], p[..., 1], p[..., 2], p[..., 3]
+        qw, qx, qy, qz = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+        return QuaternionArray(np.stack((
+            pw * qw - px * qx - py * qy - pz * qz,
+            pw * qx + px * qw + py * qz - pz * qy,
+            pw * qy + py * qw + pz * qx - px * qz,
+            pw * qz + pz * qw + px * qy - py * qx
+        ), axis=-1))
+
+    def __copy__(self):
+        return QuaternionArray(self.data.copy())
+
+    copy = __copy__
+
+    def __repr__(self):
+        return 'QuaternionArray({})'.format(len(self))
+
+    @property
+    def buffer(self):
+        return self.data
+
+class Matrix4Array(object):
+    """Contiguous float32 array of column major matrices with shape (n, 4, 4).
+    data[i] has the same memory layout as Matrix4.raw, so data[i, 0] is the first column
+    and the whole array can be passed to glUniformMatrix4fv/SSBOs without transposing.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data=()):
+        self.data = np.ascontiguousarray(np.asarray(data, dtype=np.float32).reshape((-1, 4, 4)))
+
+    @staticmethod
+    def identity(count):
+        return Matrix4Array(np.broadcast_to(np.identity(4, dtype=np.float32), (count, 4, 4)))
+
+    @staticmethod
+    def from_matrices(matrices):
+        return Matrix4Array([m.raw for m in matrices])
+
+    def to_matrices(self):
+        return [Matrix4(*m) for m in self.data.reshape((-1, 16)).tolist()]
+
+    @staticmethod
+    def from_translations(translations):
+        t = _vector3_data(translations)
+        m = np.array(np.broadcast_to(np.identity(4, dtype=np.float32), (t.shape[0], 4, 4)))
+        m[:, 3, :3] = t
+        return Matrix4Array(m)
+
+    @staticmethod
+    def from_scales(scales):
+        s = _vector3_data(scales)
+        m = np.zeros((s.shape[0], 4, 4), dtype=np.float32)
+        m[:, 0, 0] = s[:, 0]
+        m[:, 1, 1] = s[:, 1]
+        m[:, 2, 2] = s[:, 2]
+        m[:, 3, 3] = 1.0
+        return Matrix4Array(m)
+
+    @staticmethod
+    def from_trs(translations, rotations, scales):
+        """Batched Transform.to_matrix4 (T * R * S)."""
+        m = QuaternionArray(_quaternion_data(rotations)).to_matrix4().data
+        m[:, :3, :3] *= _vector3_data(scales)[:, :, None]
+        m[:, 3, :3] = _vector3_data(translations)
+        return Matrix4Array(m)
+
+    def transform_point(self, p):
+        # a single point is broadcast against every matrix
+        p = _vector3_data(p).reshape((-1, 3))
+        p4 = np.empty(p.shape[:-1] + (4,), dtype=np.float32)
+        p4[:, :3] = p
+        p4[:, 3] = 1.0
+        # row vector times column major storage is the same as matrix times column vector
+        return Vector3Array(np.matmul(p4[:, None, :], self.data)[:, 0, :3])
+
+    def transform_vector(self, v):
+        v = _vector3_data(v).reshape((-1, 3))
+        return Vector3Array(np.matmul(v[:, None, :], self.data[:, :3, :3])[:, 0, :])
+
+    def transpose(self):
+        return Matrix4Array(self.data.transpose((0, 2, 1)))
+
+    def inverse(self):
+        # the inverse of the transposed storage is the transposed inverse
+        return Matrix4Array(np.linalg.inv(self.data))
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Matrix4Array(self.data[index])
+        return Matrix4(*self.data[index].ravel().tolist())
+
+    def __setitem__(self, index, m):
+        self.data[index] = _matrix4_data(m)
+
+    def get_into(self, index, out):
+        """Same as self[index], written into an existing Matrix4."""
+        (out.m00, out.m01, out.m02, out.m03,
+         out.m10, out.m11, out.m12, out.m13,
+         out.m20, out.m21, out.m22, out.m23,
+         out.m30, out.m31, out.m32, out.m33) = self.data[index].ravel().tolist()
+        out._version += 1
+        return out
+
+    def __mul__(self, other):
+        # (A * B) stored column major is B_storage @ A_storage
+        return Matrix4Array(np.matmul(_matrix4_data(other), self.data))
+
+    def __copy__(self):
+        return Matrix4Array(self.data.copy())
+
+    copy = __copy__
+
+    def __repr__(self):
+        return 'Matrix4Array({})'.format(len(self))
+
+    @property
+    def buffer(self):
+        return self.data
+
+class Frustum(object):
+    """Six normalized planes (a, b, c, d) extracted from a projection * view matrix,
+    a point is inside a plane when a*x + b*y + c*z + d >= 0.
+    Order: left, right, bottom, top, near, far.
+    """
+    __slots__ = ('planes',)
+
+    def __init__(self, planes=None):
+        if planes is None:
+            planes = np.zeros((6, 4), dtype=np.float32)
+            planes[:, 3] = 1.0
+        self.planes = np.asarray(planes, dtype=np.float32).reshape((6, 4))
+
+    @staticmethod
+    def from_matrix(proj_view):
+        # rows of the column major matrix
+        rows = np.array(proj_view.raw, dtype=np.float64).reshape((4, 4)).T
+        planes = np.array((
+            rows[3] + rows[0],
+            rows[3] - rows[0],
+            rows[3] + rows[1],
+            rows[3] - rows[1],
+            rows[3] + rows[2],
+            rows[3] - rows[2],
+        ))
+        planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+        return Frustum(planes)
+
+    def contains_point(self, p):
+        return bool(np.all(self.planes[:, :3] @ (p.x, p.y, p.z) + self.planes[:, 3] >= 0.0))
+
+    def intersects_sphere(self, center, radius):
+        return bool(np.all(self.planes[:, :3] @ (center.x, center.y, center.z) + self.planes[:, 3] >= -radius))
+
+    def intersects_aabb(self, aabb_min, aabb_max):
+        return bool(self.cull_aabbs(_vector3_data(aabb_min), _vector3_data(aabb_max))[0])
+
+    def cull_spheres(self, centers, radii):
+        """Visibility mask for n spheres, centers (n, 3) and radii (n,)."""
+        centers = _vector3_data(centers).reshape((-1, 3))
+        distances = centers @ self.planes[:, :3].T + self.planes[:, 3]
+        return np.all(distances >= -np.asarray(radii, dtype=np.float32).reshape((-1, 1)), axis=1)
+
+    def cull_aabbs(self, mins, maxs):
+        """Visibility mask for n boxes, mins and maxs (n, 3). Conservative near the corners."""
+        mins = _vector3_data(mins).reshape((-1, 3))
+        maxs = _vector3_data(maxs).reshape((-1, 3))
+        normals = self.planes[:, :3]
+        # the box corner furthest along each plane normal
+        positive = np.where(normals[None, :, :] >= 0.0, maxs[:, None, :], mins[:, None, :])
+        distances = np.einsum('npi,pi->np', positive, normals) + self.planes[:, 3]
+        return np.all(distances >= 0.0, axis=1)
+
+    def __copy__(self):
+        return Frustum(self.planes.copy())
+
+    copy = __copy__
+
+    def __repr__(self):
+        return 'Frustum({})'.format(self.planes.tolist())
@@ -0,0 +1,27 @@
+import os, sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pygex.core import GameObject
+
+def test_world_transform_stats_per_frame():
+    root = GameObject()
+    child = GameObject()
+    root.add_child(child)
+    GameObject.end_frame()
+
+    root.update_world_transforms()
+    GameObject.end_frame()
+    assert (GameObject.last_frame_recomputed, GameObject.last_frame_reused) == (2, 0)
+    assert (GameObject.world_transforms_recomputed, GameObject.world_transforms_reused) == (0, 0)
+
+    # counts do not pile up over frames
+    for _ in range(3):
+        root.update_world_transforms()
+        GameObject.end_frame()
+    assert (GameObject.last_frame_recomputed, GameObject.last_frame_reused) == (0, 2)
+
+    child.transform.translation.x += 1.0
+    root.update_world_transforms()
+    GameObject.end_frame()
+    assert (GameObject.last_frame_recomputed, GameObject.last_frame_reused) == (1, 1)
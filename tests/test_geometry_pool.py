@@ -0,0 +1,159 @@
+import os, sys, subprocess, textwrap
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from pygex.rendering.geometry import Mesh, RangeAllocator
+
+# exit code of the smoke script when no GL context can be made
+NO_CONTEXT = 77
+
+def test_range_allocator_reuses_and_merges():
+    ranges = RangeAllocator(16)
+    a, b, c = ranges.allocate(4), ranges.allocate(4), ranges.allocate(4)
+    assert (a, b, c) == (0, 4, 8)
+    ranges.free(b, 4)
+    assert ranges.allocate(2) == 4
+    ranges.free(4, 2)
+    ranges.free(a, 4)
+    ranges.free(c, 4)
+    assert ranges._free == [(0, 16)]
+    assert ranges.allocate(3, 4) == 0 and ranges.allocate(1, 4) == 4
+
+def test_index_array_dtypes():
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        indices = np.arange(3, dtype=dtype)
+        assert Mesh._index_array(indices) is indices
+    assert Mesh._index_array(np.arange(3)).dtype == np.uint32
+    assert Mesh._index_array(np.arange(3, dtype=np.int16)).dtype == np.uint32
+    with pytest.raises(ValueError, match='uint8, uint16 or uint32'):
+        Mesh._index_array(np.arange(3, dtype=np.float32))
+    with pytest.raises(ValueError, match='out of the uint32 range'):
+        Mesh._index_array(np.array([0, -1, 2]))
+    with pytest.raises(ValueError, match='out of the uint32 range'):
+        Mesh._index_array(np.array([0, 1 << 32]))
+
+# Draws pooled meshes through glDrawElementsBaseVertex into an offscreen framebuffer
+# (headless EGL, e.g. Mesa's llvmpipe). PyOpenGL picks its platform on import, so it
+# runs in its own process.
+SMOKE = textwrap.dedent('''
+    import os, sys, ctypes
+    os.environ['PYOPENGL_PLATFORM'] = 'egl'
+    sys.path.insert(0, sys.argv[1])
+    import numpy as np
+    try:
+        from OpenGL import EGL
+        from OpenGL.GL import *
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        assert EGL.eglInitialize(display, None, None)
+        config, count = EGL.EGLConfig(), EGL.EGLint()
+        attributes = (EGL.EGLint * 3)(EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE)
+        EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count))
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        version = (EGL.EGLint * 7)(
+            EGL.EGL_CONTEXT_MAJOR_VERSION, 4, EGL.EGL_CONTEXT_MINOR_VERSION, 5,
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT, EGL.EGL_NONE
+        )
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, version)
+        assert context and EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context)
+    except Exception as e:
+        print('no GL context:', e)
+        sys.exit(77)
+
+    from pygex.rendering.geometry import Buffer, GeometryPool, Mesh, Vertex
+    from pygex.rendering.shader import Shader
+
+    def contents(buffer, count):
+        data = np.zeros(count, np.float32)
+        glGetNamedBufferSubData(buffer.id, 0, data.nbytes, data)
+        return data.tolist()
+
+    # partial writes keep the rest of a dynamic buffer, whole writes orphan it
+    for usage in (GL_DYNAMIC_DRAW, GL_STREAM_DRAW):
+        buffer = Buffer(GL_ARRAY_BUFFER, usage)
+        buffer.allocate(16)
+        buffer.update(np.array([3, 4], np.float32), 8)
+        buffer.update(np.array([1, 2], np.float32))
+        assert contents(buffer, 4) == [1, 2, 3, 4]
+        buffer.update(np.array([5, 6, 7, 8], np.float32))
+        buffer.update(np.array([9], np.float32), 4)
+        assert contents(buffer, 4) == [5, 9, 7, 8]
+        buffer.update(np.array([0, 0, 0, 0, 1], np.float32))
+        assert buffer.capacity == 32 and contents(buffer, 5) == [0, 0, 0, 0, 1]
+
+    SIZE = 64
+    framebuffer = glGenFramebuffers(1)
+    glBindFramebuffer(GL_FRAMEBUFFER, framebuffer)
+    color = glGenRenderbuffers(1)
+    glBindRenderbuffer(GL_RENDERBUFFER, color)
+    glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, SIZE, SIZE)
+    glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+    assert glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+    glViewport(0, 0, SIZE, SIZE)
+
+    shader = Shader()
+    shader.add_shader("""#version 330 core
+    layout (location=0) in vec3 vPos;
+    void main() { gl_Position = vec4(vPos, 1.0); }
+    """, GL_VERTEX_SHADER)
+    shader.add_shader("""#version 330 core
+    out vec4 fragColor;
+    void main() { fragColor = vec4(1.0); }
+    """, GL_FRAGMENT_SHADER)
+    shader.link()
+    shader.use()
+
+    def quad(x0, y0, x1, y1):
+        vertices = np.zeros((4, 11), dtype=np.float32)
+        vertices[:, 0:2] = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        return vertices.reshape(-1)
+
+    INDICES = [0, 1, 2, 2, 3, 0]
+    # quadrants in NDC and the pixel at their center
+    QUADRANTS = {
+        'bottom left': ((-1, -1, 0, 0), (16, 16)), 'bottom right': ((0, -1, 1, 0), (16, 48)),
+        'top left': ((-1, 0, 0, 1), (48, 16)), 'top right': ((0, 0, 1, 1), (48, 48)),
+    }
+
+    def render(meshes):
+        glClearColor(0, 0, 0, 0)
+        glClear(GL_COLOR_BUFFER_BIT)
+        for mesh in meshes:
+            mesh.draw()
+        pixels = np.frombuffer(glReadPixels(0, 0, SIZE, SIZE, GL_RGBA, GL_UNSIGNED_BYTE), np.uint8).reshape((SIZE, SIZE, 4))
+        return { name: bool(pixels[row, column, 0]) for name, (_, (row, column)) in QUADRANTS.items() }
+
+    # two quads per page, the third one opens a second page
+    pool = GeometryPool(Vertex.format, page_vertices=8, page_index_bytes=64, max_page_vertices=8, max_page_index_bytes=64)
+    a = pool.allocate(quad(*QUADRANTS['bottom left'][0]), np.array(INDICES, dtype=np.uint8))
+    b = pool.allocate(quad(*QUADRANTS['bottom right'][0]), np.array(INDICES, dtype=np.uint16))
+    c = pool.allocate(quad(*QUADRANTS['top left'][0]), np.array(INDICES, dtype=np.uint32))
+    assert len(pool.pages) == 2 and a.page is b.page and c.page is not a.page
+    assert (a.base_vertex, b.base_vertex, c.base_vertex) == (0, 4, 0)
+    assert render([a, b, c]) == {'bottom left': True, 'bottom right': True, 'top left': True, 'top right': False}
+
+    # a released range draws nothing and is reused by the next mesh
+    b.release()
+    assert render([a, b, c]) == {'bottom left': True, 'bottom right': False, 'top left': True, 'top right': False}
+    # NumPy's default int64 indices are narrowed to uint32
+    d = pool.allocate(quad(*QUADRANTS['top right'][0]), np.array(INDICES))
+    assert d.page is a.page and d.base_vertex == 4 and d.index_type == GL_UNSIGNED_INT
+    assert render([c, d, a]) == {'bottom left': True, 'bottom right': False, 'top left': True, 'top right': True}
+
+    mesh = Mesh(Vertex.format)
+    mesh.update(quad(*QUADRANTS['bottom right'][0]), np.array(INDICES))
+    assert mesh.index_type == GL_UNSIGNED_INT and mesh.indices.dtype == np.uint32
+    assert render([mesh]) == {'bottom left': False, 'bottom right': True, 'top left': False, 'top right': False}
+    assert glGetError() == GL_NO_ERROR
+    print('ok')
+''')
+
+def test_pooled_meshes_draw():
+    env = dict(os.environ, EGL_PLATFORM=os.environ.get('EGL_PLATFORM', 'surfaceless'))
+    result = subprocess.run([sys.executable, '-c', SMOKE, ROOT], capture_output=True, text=True, env=env, timeout=120)
+    if result.returncode == NO_CONTEXT:
+        pytest.skip(result.stdout.strip())
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,36 @@
+import os, sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pygex.core import GameObject, FlatScene
+
+def _hierarchy():
+    """r -> {a, b}, b -> c, with a moved to x=10."""
+    r, a, b, c = GameObject(), GameObject(), GameObject(), GameObject()
+    r.add_child(a)
+    r.add_child(b)
+    b.add_child(c)
+    a.transform.translation.x = 10.0
+    b.transform.translation.y = 3.0
+    c.transform.translation.z = 1.0
+    return r, a, b, c
+
+def test_reparent_matches_game_objects():
+    scene_objects = _hierarchy()
+    plain_objects = _hierarchy()
+    scene = FlatScene()
+    scene.add(scene_objects[0])
+    scene.update_world_transforms()
+
+    for r, a, b, c in (scene_objects, plain_objects):
+        c.set_parent(a)
+    scene.update_world_transforms()
+
+    r, a, b, c = scene_objects
+    assert len(scene) == 4
+    assert scene.parents[c._scene_index] == a._scene_index
+    for in_scene, plain in zip(scene_objects, plain_objects):
+        np.testing.assert_allclose(in_scene.own_transform.raw, plain.own_transform.raw)
+    np.testing.assert_allclose(c.own_transform.raw[12:15], [10.0, 0.0, 1.0])
@@ -0,0 +1,70 @@
+import os, sys, math
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pygex.vmath import Vector3, Quaternion, Transform, Vector3Array, QuaternionArray, Matrix4Array
+
+def _vec(v):
+    return [v.x, v.y, v.z]
+
+def _quat(q):
+    return [q.w, q.x, q.y, q.z]
+
+def _sample(count=5):
+    rng = np.random.default_rng(7)
+    points = rng.uniform(-4.0, 4.0, (count, 3)).astype(np.float32)
+    angles = rng.uniform(-math.pi, math.pi, count).astype(np.float32)
+    axes = Vector3Array(rng.normal(size=(count, 3))).normalize().data
+    scales = rng.uniform(0.5, 2.0, (count, 3)).astype(np.float32)
+    return points, angles, axes, scales
+
+def test_vector3_array_matches_vector3():
+    a, _, _, b = _sample()
+    va, vb = Vector3Array(a), Vector3Array(b)
+    for i in range(len(a)):
+        sa, sb = Vector3(*a[i].tolist()), Vector3(*b[i].tolist())
+        assert va.length()[i] == pytest.approx(sa.length(), rel=1e-5)
+        assert va.dot(vb)[i] == pytest.approx(sa.dot(sb), rel=1e-5)
+        np.testing.assert_allclose(va.cross(vb).data[i], _vec(sa.cross(sb)), rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(va.normalize().data[i], _vec(sa.normalize()), rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(va.lerp(vb, 0.25).data[i], _vec(sa.lerp(sb, 0.25)), rtol=1e-5, atol=1e-6)
+
+def test_quaternion_array_matches_quaternion():
+    points, angles, axes, _ = _sample()
+    q = QuaternionArray.from_angle_axis(angles, axes)
+    r = QuaternionArray.from_angle_axis(angles[::-1].copy(), axes[::-1].copy())
+    single = Vector3(1.0, 2.0, 3.0)
+    for i in range(len(angles)):
+        sq = Quaternion.from_angle_axis(float(angles[i]), Vector3(*axes[i].tolist()))
+        sr = Quaternion.from_angle_axis(float(angles[::-1][i]), Vector3(*axes[::-1][i].tolist()))
+        np.testing.assert_allclose(q.data[i], _quat(sq), rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose((q * r).data[i], _quat(sq * sr), rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(q.slerp(r, 0.3).data[i], _quat(sq.slerp(sr, 0.3)), rtol=1e-4, atol=1e-5)
+        p = Vector3(*points[i].tolist())
+        np.testing.assert_allclose(q.transform_vector(points).data[i], _vec(sq.transform_vector(p)), rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose(q.transform_point(single).data[i], _vec(sq.transform_point(single)), rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose(q.to_matrix4().data[i].ravel(), sq.to_matrix4().raw, rtol=1e-5, atol=1e-6)
+
+@pytest.mark.parametrize('count', [1, 3, 5])
+def test_matrix4_array_matches_matrix4(count):
+    points, angles, axes, scales = _sample(count)
+    rotations = QuaternionArray.from_angle_axis(angles, axes)
+    m = Matrix4Array.from_trs(points, rotations, scales)
+    single = Vector3(1.0, 2.0, 3.0)
+
+    # a single point or vector is transformed by every matrix
+    assert len(m.transform_point(single)) == count
+    assert len(m.transform_vector(single)) == count
+    for i in range(count):
+        transform = Transform(Vector3(*points[i].tolist()), rotations[i], Vector3(*scales[i].tolist()))
+        sm = transform.to_matrix4()
+        np.testing.assert_allclose(m.data[i].ravel(), sm.raw, rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(m.transform_point(single).data[i], _vec(sm.transform_point(single)), rtol=1e-5, atol=1e-4)
+        np.testing.assert_allclose(m.transform_vector(single).data[i], _vec(sm.transform_vector(single)), rtol=1e-5, atol=1e-4)
+        p = Vector3(*points[::-1][i].tolist())
+        np.testing.assert_allclose(m.transform_point(points[::-1]).data[i], _vec(sm.transform_point(p)), rtol=1e-5, atol=1e-4)
+        np.testing.assert_allclose(m.inverse().data[i].ravel(), sm.inverse().raw, rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose((m * m).data[i].ravel(), (sm * sm).raw, rtol=1e-4, atol=1e-4)
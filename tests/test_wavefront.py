@@ -0,0 +1,109 @@
+import os, sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pygex.rendering.wavefront import parse_wavefront, load_wavefront
+
+SPACED = """\
+v 0 0 0
+  v 1 0 0
+v\t0 1 0
+v 1 1 0
+\tv 5 5 5
+f 1 2 3
+  f\t2 4 3
+f 3 4 5
+"""
+
+def test_indented_and_tab_separated_records():
+    data = parse_wavefront(SPACED)
+    assert data.positions.tolist() == [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [5, 5, 5]]
+    (name, corners), = data.objects
+    assert name == 'mesh'
+    assert corners[:, 0].tolist() == [0, 1, 2, 1, 3, 2, 2, 3, 4]
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_indented_objects_load(tmp_path, workers):
+    path = tmp_path / 'spaced.obj'
+    path.write_text(SPACED + '  o\tsecond\nv 2 2 2\nf 1 5 6\n')
+    objects = load_wavefront(str(path), cache=False, workers=workers)
+    assert [obj.name for obj in objects] == ['mesh', 'second']
+    assert objects[1].vertices[:, 0:3].tolist() == [[0, 0, 0], [5, 5, 5], [2, 2, 2]]
+
+def test_mixed_corner_layouts():
+    data = parse_wavefront("""\
+v 0 0 0
+v 1 0 0
+v 0 1 0
+vt 0 0
+vt 1 1
+vn 0 0 1
+f 1//1 2//1 3//1
+f 1/1 2/2 3/2
+""")
+    (_, corners), = data.objects
+    assert corners.tolist() == [
+        [0, -1, 0], [1, -1, 0], [2, -1, 0],
+        [0, 0, -1], [1, 1, -1], [2, 1, -1],
+    ]
+
+def test_short_tex_coords_are_padded():
+    data = parse_wavefront("""\
+v 0 0 0
+v 1 0 0
+v 0 1 0
+vt 0.5
+vt 0.25 0.75
+vt 1 1 0
+f 1/1 2/2 3/3
+""")
+    assert data.tex_coords.tolist() == [[0.5, 0.0], [0.25, 0.75], [1.0, 1.0]]
+
+def _shared_blocks():
+    return {name for name in os.listdir('/dev/shm') if name.startswith('psm_')}
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='needs POSIX shared memory in /dev/shm')
+@pytest.mark.parametrize('broken', [
+    # fails while parsing the second section
+    'o broken\nv x 0 0\nf 1 2 3\n',
+    # parses, fails while building (index out of range)
+    'o broken\nv 0 0 1\nf 1 2 9\n',
+])
+def test_parallel_failure_frees_shared_memory(tmp_path, broken):
+    path = tmp_path / 'broken.obj'
+    path.write_text('o good\nv 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n' + broken + 'o last\nf 1 2 3\n')
+    before = _shared_blocks()
+    with pytest.raises((ValueError, IndexError)):
+        load_wavefront(str(path), cache=False, workers=2)
+    assert _shared_blocks() <= before
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_optimize_keeps_cache_report(tmp_path, workers):
+    path = tmp_path / 'grid.obj'
+    n = 8
+    lines = [f'v {x} {y} 0' for y in range(n) for x in range(n)]
+    lines += [f'f {y * n + x + 1} {y * n + x + 2} {(y + 1) * n + x + 2} {(y + 1) * n + x + 1}' for y in range(n - 1) for x in range(n - 1)]
+    path.write_text('\n'.join(lines) + '\n')
+
+    obj, = load_wavefront(str(path), cache=False, workers=workers, optimize=True)
+    assert obj.cache_report is not None
+    assert obj.cache_report.acmr_after <= obj.cache_report.acmr_before
+    # the report survives the binary cache
+    load_wavefront(str(path), optimize=True)
+    cached, = load_wavefront(str(path), optimize=True)
+    assert repr(cached.cache_report) == repr(obj.cache_report)
+    assert load_wavefront(str(path), cache=False)[0].cache_report is None
+
+def test_truncated_cache_is_reimported(tmp_path):
+    path = tmp_path / 'quad.obj'
+    path.write_text('v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nf 1 2 3 4\n')
+    expected, = load_wavefront(str(path))
+    cache = str(path) + '.meshcache'
+    with open(cache, 'r+b') as fp:
+        fp.truncate(os.path.getsize(cache) - 8)
+
+    obj, = load_wavefront(str(path))
+    assert obj.vertices.tolist() == expected.vertices.tolist()
+    assert obj.indices.tolist() == expected.indices.tolist()